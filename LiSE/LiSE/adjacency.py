@@ -0,0 +1,353 @@
+# This file is part of LiSE, a framework for life simulation games.
+# Copyright (c) Zachary Spector, public@zacharyspector.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Characters' portals as arrays, for analytics
+
+:meth:`LiSE.character.Character.adjacency_snapshot` returns an
+:class:`AdjacencySnapshot` of the portals at the current time, in
+compressed sparse row form, which vectorized algorithms can work on
+directly, or put into ``scipy.sparse.csr_array``.
+
+Behind the snapshots is a :class:`PortalIndex`, an integer-indexed copy
+of the character's portals that catches up with the changes made since
+it last looked, rather than reading the whole character again.
+
+"""
+
+from functools import partial
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+from .allegedb import Key
+from .allegedb.window import update_backward_window, update_window
+
+
+class PortalIndex:
+    """An integer-indexed copy of one character's portals
+
+    :param character: the :class:`LiSE.character.Character` to copy.
+    :param weight: name of the portal stat to keep for each portal, or
+        ``None`` to keep only whether it's there. Portals without the stat
+        get 1, as in NetworkX.
+
+    Catching up to some other time than the last in the same branch
+    only applies the changes to portals made in between. Anywhere else,
+    it starts over.
+
+    """
+
+    def __init__(self, character, weight: Key = None):
+        self.character = character
+        self.engine = character.engine
+        self.weight = weight
+        self.stats = {"rebuilds": 0, "updates": 0}
+        self._time: Optional[Tuple[str, int, int]] = None
+        self._index: Dict[Key, int] = {}
+        self._names: List[Key] = []
+        self._succ: List[Dict[int, float]] = []
+        self._pred: List[Dict[int, float]] = []
+
+    def _length(self, portal) -> float:
+        if self.weight is None:
+            return 1
+        length = portal.get(self.weight)
+        if length is None:
+            return 1
+        return length
+
+    def _portal_changed(
+        self, i: int, j: int, old: Optional[float], new: Optional[float]
+    ) -> None:
+        """Called when the portal from ``i`` to ``j`` changed in an update
+
+        ``old`` is ``None`` if the portal is new, and ``new`` is ``None``
+        if it's gone.
+
+        """
+
+    def _add_node(self, name: Key) -> int:
+        if name in self._index:
+            return self._index[name]
+        i = self._index[name] = len(self._names)
+        self._names.append(name)
+        self._succ.append({})
+        self._pred.append({})
+        return i
+
+    def _remove_node(self, name: Key) -> None:
+        i = self._index.pop(name, None)
+        if i is None:
+            return
+        self._names[i] = None
+        for j in self._succ[i]:
+            del self._pred[j][i]
+        for j in self._pred[i]:
+            del self._succ[j][i]
+        self._succ[i] = {}
+        self._pred[i] = {}
+
+    def _rebuild(self) -> None:
+        self.stats["rebuilds"] += 1
+        self._index = {}
+        self._names = []
+        self._succ = []
+        self._pred = []
+        add_node = self._add_node
+        for name in self.character.node:
+            add_node(name)
+        index = self._index
+        succ = self._succ
+        pred = self._pred
+        for orig, dests in self.character.adj.items():
+            i = index[orig]
+            for dest, portal in dests.items():
+                j = index[dest]
+                succ[i][j] = pred[j][i] = self._length(portal)
+
+    def _update(self, time_from: Tuple[str, int, int], time_to: Tuple[str, int, int]):
+        """Apply the changes to my character's portals between these times"""
+        self.stats["updates"] += 1
+        engine = self.engine
+        name = self.character.name
+        weight = self.weight
+        _, turn_from, tick_from = time_from
+        branch, turn_to, tick_to = time_to
+        if (turn_to, tick_to) > (turn_from, tick_from):
+            updater = partial(update_window, turn_from, tick_from, turn_to, tick_to)
+            attribute = "settings"
+        else:
+            updater = partial(
+                update_backward_window, turn_from, tick_from, turn_to, tick_to
+            )
+            attribute = "presettings"
+        nodes = set()
+        portals = set()
+
+        def updnode(graph, node, _):
+            if graph == name:
+                nodes.add(node)
+
+        def updportal(graph, orig, dest, *_):
+            if graph == name:
+                portals.add((orig, dest))
+
+        def updportalval(graph, orig, dest, idx, key, _):
+            if graph == name and key == weight:
+                portals.add((orig, dest))
+
+        for cache, upd in (
+            (engine._nodes_cache, updnode),
+            (engine._edges_cache, updportal),
+            (engine._edge_val_cache, updportalval),
+        ):
+            branchd = getattr(cache, attribute)
+            if branch in branchd:
+                updater(upd, branchd[branch])
+        node_map = self.character.node
+        for node in nodes:
+            if node in node_map:
+                self._add_node(node)
+            else:
+                self._remove_node(node)
+        adj = self.character.adj
+        index = self._index
+        succ = self._succ
+        pred = self._pred
+        for orig, dest in portals:
+            if orig not in index or dest not in index:
+                continue
+            i = index[orig]
+            j = index[dest]
+            old = succ[i].get(j)
+            if orig in adj and dest in adj[orig]:
+                new = self._length(adj[orig][dest])
+                self._portal_changed(i, j, old, new)
+                succ[i][j] = pred[j][i] = new
+            elif old is not None:
+                self._portal_changed(i, j, old, None)
+                del succ[i][j]
+                del pred[j][i]
+
+    def _catch_up(self) -> None:
+        engine = self.engine
+        now = engine._btt()
+        then = self._time
+        if then == now:
+            return
+        if (
+            then is None
+            or then[0] != now[0]
+            or not engine._time_is_loaded(*then)
+            or not engine._time_is_loaded(*now)
+        ):
+            self._rebuild()
+        else:
+            self._update(then, now)
+        self._time = now
+
+
+class AdjacencySnapshot:
+    """A character's portals at one time, in compressed sparse row form
+
+    The destinations of the portals out of the node in row ``r`` are the
+    nodes in rows ``indices[indptr[r]:indptr[r+1]]``, in ascending order,
+    and ``weights`` holds the weight stat of each portal in the same
+    positions, if a stat was asked for.
+
+    ``nodes[r]`` is the name of the node in row ``r``, and ``index`` maps
+    each name back to its row. None of these may be modified, since
+    later snapshots share them when they can.
+
+    """
+
+    __slots__ = ("time", "nodes", "index", "indptr", "indices", "weights")
+
+    def __init__(
+        self,
+        time: Tuple[str, int, int],
+        nodes: Tuple[Key, ...],
+        index: Mapping[Key, int],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        weights: Optional[np.ndarray],
+    ):
+        self.time = time
+        self.nodes = nodes
+        self.index = index
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return (
+            f"<AdjacencySnapshot of {len(self.nodes)} nodes and "
+            f"{len(self.indices)} portals at {self.time}>"
+        )
+
+
+class Adjacency(PortalIndex):
+    """Takes :class:`AdjacencySnapshot` of one character
+
+    Snapshots get made again only when portals or nodes came or went since
+    the last one. If only the weights changed, the new snapshot gets a
+    patched copy of the old weights, and the rest of the old arrays. If
+    nothing changed, it's the old snapshot, with the new time.
+
+    """
+
+    def __init__(self, character, weight: Key = None):
+        super().__init__(character, weight)
+        self.stats["snapshots"] = 0
+        self.stats["reweighs"] = 0
+        self._snapshot: Optional[AdjacencySnapshot] = None
+        self._rows: Dict[int, int] = {}
+        self._restructured = True
+        self._reweighed: Set[Tuple[int, int]] = set()
+
+    def _portal_changed(
+        self, i: int, j: int, old: Optional[float], new: Optional[float]
+    ) -> None:
+        if old is None or new is None:
+            self._restructured = True
+        elif old != new:
+            self._reweighed.add((i, j))
+
+    def _add_node(self, name: Key) -> int:
+        if name not in self._index:
+            self._restructured = True
+        return super()._add_node(name)
+
+    def _remove_node(self, name: Key) -> None:
+        if name in self._index:
+            self._restructured = True
+        super()._remove_node(name)
+
+    def _rebuild(self) -> None:
+        super()._rebuild()
+        self._restructured = True
+
+    def _build(self) -> AdjacencySnapshot:
+        self.stats["snapshots"] += 1
+        names = self._names
+        extant = [i for (i, name) in enumerate(names) if name is not None]
+        rows = self._rows = {i: row for (row, i) in enumerate(extant)}
+        indptr = np.zeros(len(extant) + 1, dtype=np.intp)
+        indices = []
+        weights = []
+        for row, i in enumerate(extant):
+            succ = self._succ[i]
+            # rows are in the same order as the indices they're made from
+            for j in sorted(succ):
+                indices.append(rows[j])
+                weights.append(succ[j])
+            indptr[row + 1] = len(indices)
+        indices = np.array(indices, dtype=np.intp)
+        if self.weight is None:
+            weights = None
+        else:
+            weights = np.array(weights, dtype=float)
+            weights.flags.writeable = False
+        indptr.flags.writeable = indices.flags.writeable = False
+        nodes = tuple(names[i] for i in extant)
+        return AdjacencySnapshot(
+            self._time,
+            nodes,
+            MappingProxyType({name: row for (row, name) in enumerate(nodes)}),
+            indptr,
+            indices,
+            weights,
+        )
+
+    def _reweigh(self, snap: AdjacencySnapshot) -> AdjacencySnapshot:
+        self.stats["reweighs"] += 1
+        rows = self._rows
+        indptr = snap.indptr
+        indices = snap.indices
+        weights = snap.weights.copy()
+        for i, j in self._reweighed:
+            row = rows[i]
+            start = indptr[row]
+            start += np.searchsorted(indices[start : indptr[row + 1]], rows[j])
+            weights[start] = self._succ[i][j]
+        weights.flags.writeable = False
+        return AdjacencySnapshot(
+            self._time, snap.nodes, snap.index, indptr, indices, weights
+        )
+
+    def snapshot(self) -> AdjacencySnapshot:
+        """Return an :class:`AdjacencySnapshot` of my character, now"""
+        self._catch_up()
+        snap = self._snapshot
+        if snap is None or self._restructured:
+            snap = self._build()
+        elif self._reweighed:
+            snap = self._reweigh(snap)
+        elif snap.time != self._time:
+            snap = AdjacencySnapshot(
+                self._time,
+                snap.nodes,
+                snap.index,
+                snap.indptr,
+                snap.indices,
+                snap.weights,
+            )
+        self._restructured = False
+        self._reweighed.clear()
+        self._snapshot = snap
+        return snap
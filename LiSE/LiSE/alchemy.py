@@ -362,6 +362,21 @@ def tables_for_meta(meta):
         sqlite_with_rowid=True,
     )
 
+    # Rules handled in one rulebook during one turn, for every entity,
+    # compressed into a single blob. The tables above are kept so that
+    # older databases will still load.
+    Table(
+        "rules_handled",
+        meta,
+        Column("kind", TEXT),
+        Column("rulebook", BLOB),
+        Column("branch", TEXT, default="trunk"),
+        Column("turn", INT),
+        Column("tick", INT),
+        Column("handled", BLOB),
+        sqlite_with_rowid=True,
+    )
+
     Table(
         "turns_completed",
         meta,
@@ -631,6 +646,7 @@ def queries(table):
         "character_portal_rules_handled",
         "node_rules_handled",
         "portal_rules_handled",
+        "rules_handled",
     ):
         ht = table[handledtab]
         r["del_{}_turn".format(handledtab)] = ht.delete().where(
@@ -554,6 +554,34 @@ def queries_for_table_dict(table):
         r[t.name + "_del"] = t.delete().where(
             and_(*[c == bindparam(c.name) for c in (t.primary_key or t.c)])
         )
+        if "branch" in t.columns:
+            r[t.name + "_del_branch"] = t.delete().where(
+                t.c.branch == bindparam("branch")
+            )
+            if "turn" in t.columns:
+                before = t.c.turn < bindparam("turn")
+                if "tick" in t.columns:
+                    before = or_(
+                        before,
+                        and_(
+                            t.c.turn == bindparam("turn"),
+                            t.c.tick < bindparam("tick"),
+                        ),
+                    )
+                r[t.name + "_del_before"] = t.delete().where(
+                    and_(t.c.branch == bindparam("branch"), before)
+                )
+    r["plan_ticks_del_branch"] = (
+        table["plan_ticks"]
+        .delete()
+        .where(
+            table["plan_ticks"].c.plan_id.in_(
+                select(table["plans"].c.id).where(
+                    table["plans"].c.branch == bindparam("branch")
+                )
+            )
+        )
+    )
     return r
 
 
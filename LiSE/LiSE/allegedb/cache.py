@@ -14,9 +14,15 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """Classes for in-memory storage and retrieval of historical graph data."""
 
+from array import array
 from collections import OrderedDict, defaultdict, deque
-from threading import RLock
-from typing import Hashable, Optional, Tuple
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from sys import getsizeof
+from threading import Lock, RLock
+from typing import Dict, Hashable, List, Optional, Tuple
 
 from .window import (
     EntikeySettingsTurnDict,
@@ -26,6 +32,7 @@ from .window import (
     TurnDict,
     WindowDict,
 )
+from .wrap import Patch
 
 
 class NotInKeyframeError(KeyError):
@@ -174,10 +181,175 @@ class StructuredDefaultDict(dict):
         raise TypeError("Can't set layer {}".format(self.layer))
 
 
+def estimate_size(obj, sample: int = 64) -> Tuple[int, int]:
+    """Estimate the number of entries in a cache structure, and its bytes
+
+    Only the first ``sample`` items in each container get measured. The
+    rest are assumed to be like them.
+
+    """
+    if isinstance(obj, WindowDict):
+        entries = 0
+        size = getsizeof(obj) + getsizeof(getattr(obj, "_keys", None))
+        for stack in (obj._past, obj._future):
+            size += getsizeof(stack)
+            if not stack:
+                continue
+            taken = stack[:sample]
+            scale = len(stack) / len(taken)
+            for pair in taken:
+                pair_entries, pair_size = estimate_size(pair[1], sample)
+                entries += pair_entries * scale
+                size += (pair_size + getsizeof(pair)) * scale
+        return round(entries), round(size)
+    if isinstance(obj, array):
+        return len(obj), getsizeof(obj)
+    if isinstance(obj, tuple):
+        return 1, getsizeof(obj) + sum(map(getsizeof, obj))
+    if isinstance(obj, Mapping):
+        items = obj.values()
+    elif isinstance(obj, (list, set, frozenset, deque)):
+        items = obj
+    else:
+        return 1, getsizeof(obj)
+    entries = 0
+    size = getsizeof(obj)
+    if obj:
+        taken = list(islice(items, sample))
+        scale = len(obj) / len(taken)
+        for item in taken:
+            item_entries, item_size = estimate_size(item, sample)
+            entries += item_entries * scale
+            size += item_size * scale
+    return round(entries), round(size)
+
+
+_recorded_reads: ContextVar[Optional[list]] = ContextVar(
+    "_recorded_reads", default=None
+)
+
+
+@contextmanager
+def recording_reads():
+    """Collect every lookup made in this context
+
+    Yields a list that gets a ``(cache, args, result)`` triple for each
+    call to :meth:`Cache._base_retrieve`. Other threads' lookups aren't
+    included.
+
+    """
+    reads = []
+    token = _recorded_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _recorded_reads.reset(token)
+
+
 class KeyframeError(KeyError):
     pass
 
 
+class HintCache(OrderedDict):
+    """Bounded dictionary of retrieval results, least recently used first
+
+    Keys are ``(*entity, key, branch, turn, tick)`` tuples. When there are
+    more than ``maxsize`` of them, the least recently used are forgotten.
+    They're indexed by their first element, which is usually a graph
+    name, and by branch, so :meth:`forget_graph` and
+    :meth:`forget_branch` don't need to look at every key.
+
+    Readers sharing a lock still write here, so I have a lock of my own.
+
+    """
+
+    __slots__ = (
+        "maxsize",
+        "hits",
+        "misses",
+        "_by_graph",
+        "_by_branch",
+        "_lock",
+    )
+
+    def __init__(self, maxsize: int = 16384):
+        super().__init__()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._by_graph = defaultdict(set)
+        self._by_branch = defaultdict(set)
+        self._lock = Lock()
+
+    def __setitem__(self, key: tuple, value) -> None:
+        with self._lock:
+            if key in self:
+                super().__setitem__(key, value)
+                self.move_to_end(key)
+                return
+            super().__setitem__(key, value)
+            self._index(key)
+            if len(self) > self.maxsize:
+                self._unindex(self.popitem(last=False)[0])
+
+    def __delitem__(self, key: tuple) -> None:
+        with self._lock:
+            self._delitem(key)
+
+    def _delitem(self, key: tuple) -> None:
+        super().__delitem__(key)
+        self._unindex(key)
+
+    def _index(self, key: tuple) -> None:
+        self._by_graph[key[0]].add(key)
+        self._by_branch[key[-3]].add(key)
+
+    def _unindex(self, key: tuple) -> None:
+        for index, k in ((self._by_graph, key[0]), (self._by_branch, key[-3])):
+            keys = index[k]
+            keys.discard(key)
+            if not keys:
+                del index[k]
+
+    def lookup(self, key: tuple, default=None):
+        """Return the value for ``key``, or ``default``, counting the hit"""
+        with self._lock:
+            try:
+                ret = super().__getitem__(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.move_to_end(key)
+            return ret
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self._clear_indices()
+
+    def _clear_indices(self) -> None:
+        self._by_graph.clear()
+        self._by_branch.clear()
+
+    def forget_graph(self, graph) -> None:
+        """Forget everything about entities in ``graph``"""
+        with self._lock:
+            for key in list(self._by_graph.get(graph, ())):
+                self._delitem(key)
+
+    def forget_branch(self, branch: str) -> None:
+        """Forget everything that happened in ``branch``"""
+        with self._lock:
+            for key in list(self._by_branch.get(branch, ())):
+                self._delitem(key)
+
+    def hit_rate(self) -> float:
+        """Return the proportion of lookups that found something"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
 class Cache:
     """A data store that's useful for tracking graph revisions."""
 
@@ -216,7 +388,7 @@ class Cache:
 		"""
         self.keyframe = StructuredDefaultDict(1, SettingsTurnDict, **(kfkvs or {}))
         """Key-value dictionaries representing my state at a given time"""
-        self.shallowest = OrderedDict()
+        self.shallowest = HintCache(db.hint_cache_size)
         """A dictionary for plain, unstructured hinting."""
         self.settings = PickyDefaultDict(EntikeySettingsTurnDict)
         """All the ``entity[key] = value`` settings on some turn"""
@@ -266,6 +438,18 @@ class Cache:
             PickyDefaultDict, PickyDefaultDict, callable
         ] = (self.settings, self.presettings, self._base_retrieve)
 
+    def memory_usage(self, sample: int = 64) -> Dict[str, Tuple[int, int]]:
+        """Estimate the entries and bytes in each of my structures
+
+        See :func:`estimate_size` for the meaning of ``sample``.
+
+        """
+        return {
+            name: estimate_size(struct, sample)
+            for (name, struct) in vars(self).items()
+            if isinstance(struct, (dict, WindowDict, list, deque))
+        }
+
     def _get_keyframe(
         self, graph_ent: tuple, branch: str, turn: int, tick: int, copy=True
     ):
@@ -691,6 +875,9 @@ class Cache:
         entity, key, branch, turn, tick, value = args[-6:]
         if loading:
             self.db._updload(branch, turn, tick)
+            if type(value) is Patch:
+                value = self._apply_patch(args)
+                args = args[:-1] + (value,)
         parent = args[:-6]
         entikey = (entity, key)
         parentikey = parent + (entity, key)
@@ -728,7 +915,7 @@ class Cache:
                     )
                 )
                 if contras:
-                    self.shallowest = {}
+                    self.shallowest.clear()
                 for contra_turn, contra_tick in contras:
                     if (
                         branch,
@@ -801,10 +988,8 @@ class Cache:
             if (parent and parent[0] == character)
             or (not parent and entity == character)
         }
-        todel_shallow = {k for k in self.shallowest if k[0] == character}
         with lock:
-            for k in todel_shallow:
-                del self.shallowest[k]
+            self.shallowest.forget_graph(character)
             for branch, turn, tick, parent, entity, key in todel:
                 self._remove_btt_parentikey(branch, turn, tick, parent, entity, key)
 
@@ -828,21 +1013,10 @@ class Cache:
             ) in time_entity.items()
             if branc == branch
         }
-        todel_shallow = {k for k in self.shallowest if k[-2] == branch}
         with lock:
-            for k in todel_shallow:
-                del self.shallowest[k]
+            self.shallowest.forget_branch(branch)
             for branc, turn, tick, parent, entity, key in todel:
                 self._remove_btt_parentikey(branc, turn, tick, parent, entity, key)
-                if (
-                    *parent,
-                    entity,
-                    key,
-                    branc,
-                    turn,
-                    tick,
-                ) in self.shallowest:
-                    del self.shallowest[(*parent, entity, key, branc, turn, tick)]
 
     def _remove_btt_parentikey(self, branch, turn, tick, parent, entity, key):
         (
@@ -977,7 +1151,7 @@ class Cache:
             if not pbranhc:
                 del settings[branch]
                 del presettings[branch]
-            self.shallowest = OrderedDict()
+            self.shallowest.clear()
             remove_keycache(parent + (entity, branch), turn, tick)
 
     def _remove_keycache(self, entity_branch: tuple, turn: int, tick: int):
@@ -1031,7 +1205,7 @@ class Cache:
                     truncate_branhc(branches[branch])
             truncate_branhc(settings[branch])
             truncate_branhc(presettings[branch])
-            self.shallowest = OrderedDict()
+            self.shallowest.clear()
             for entity_branch in keycache:
                 if entity_branch[-1] == branch:
                     truncate_branhc(keycache[entity_branch])
@@ -1067,6 +1241,26 @@ class Cache:
                 if newval != value:
                     yield trn, tick
 
+    def _apply_patch(self, args: tuple):
+        """Get the value that the :class:`Patch` in ``args[-1]`` made
+
+        It's already in the keyframe, if there's one at that time.
+        Otherwise, apply the patch to the value in the tick before.
+
+        """
+        entity = args[:-5]
+        key, branch, turn, tick, patch = args[-5:]
+        try:
+            return self._get_keyframe(entity, branch, turn, tick, copy=False)[key]
+        except KeyError:
+            pass
+        prev = self._base_retrieve(
+            args[:-2] + (tick - 1,), store_hint=False, retrieve_hint=False
+        )
+        if prev is None or isinstance(prev, Exception):
+            raise KeyError("Nothing to patch", entity, key, branch, turn, tick)
+        return patch.apply(prev)
+
     def _store_journal(self, *args):
         # overridden in LiSE.cache.InitializedCache
         (settings, presettings, base_retrieve) = self._store_journal_stuff
@@ -1098,6 +1292,20 @@ class Cache:
             settings_turns[turn] = {tick: parent + (entity, key, value)}
 
     def _base_retrieve(self, args, store_hint=True, retrieve_hint=True, search=False):
+        """Look up the value for ``args``, noting it if reads are recorded
+
+        See :func:`recording_reads` and :meth:`_unrecorded_retrieve`.
+
+        """
+        ret = self._unrecorded_retrieve(args, store_hint, retrieve_hint, search)
+        reads = _recorded_reads.get()
+        if reads is not None:
+            reads.append((self, args, ret))
+        return ret
+
+    def _unrecorded_retrieve(
+        self, args, store_hint=True, retrieve_hint=True, search=False
+    ):
         """Hot code.
 
         Swim up the timestream trying to find a value for the
@@ -1110,8 +1318,10 @@ class Cache:
 
         """
         shallowest = self.shallowest
-        if retrieve_hint and args in shallowest:
-            return shallowest[args]
+        if retrieve_hint:
+            ret = shallowest.lookup(args, shallowest)
+            if ret is not shallowest:
+                return ret
         entity: tuple = args[:-4]
         key: Hashable
         branch: str
@@ -1448,6 +1658,8 @@ class EdgesCache(Cache):
         "_get_destcache_stuff",
         "_get_origcache_stuff",
         "_additional_store_stuff",
+        "_kf_dests",
+        "_kf_dests_size",
     )
 
     @property
@@ -1467,6 +1679,9 @@ class EdgesCache(Cache):
         self.predecessors = StructuredDefaultDict(3, TurnDict)
         self._origcache_lru = OrderedDict()
         self._destcache_lru = OrderedDict()
+        self._kf_dests: Dict[Tuple[Hashable, Hashable], List[Hashable]] = {}
+        """Destinations of the edges in ``keyframe``, by graph and origin"""
+        self._kf_dests_size = 0
         self._get_destcache_stuff: Tuple[
             PickyDefaultDict,
             OrderedDict,
@@ -1504,12 +1719,21 @@ class EdgesCache(Cache):
     ):
         if len(graph_ent) == 3:
             return super()._get_keyframe(graph_ent, branch, turn, tick, copy)
+        keyframe = self.keyframe
+        if len(keyframe) != self._kf_dests_size:
+            # edges only ever get added to the keyframe dict, never deleted
+            kf_dests = self._kf_dests = {}
+            for graph, orig, dest in keyframe:
+                if (graph, orig) in kf_dests:
+                    kf_dests[graph, orig].append(dest)
+                else:
+                    kf_dests[graph, orig] = [dest]
+            self._kf_dests_size = len(keyframe)
         ret = {}
-        for graph, orig, dest in self.keyframe:
-            if (graph, orig) == graph_ent:
-                ret[dest] = super()._get_keyframe(
-                    (graph, orig, dest), branch, turn, tick, copy
-                )
+        for dest in self._kf_dests.get(graph_ent, ()):
+            ret[dest] = super()._get_keyframe(
+                graph_ent + (dest,), branch, turn, tick, copy
+            )
         return ret
 
     def _update_keycache(self, *args, forward: bool):
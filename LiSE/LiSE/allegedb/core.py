@@ -19,14 +19,17 @@ from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import ContextDecorator, contextmanager
 from functools import wraps
+from itertools import islice
 from queue import Queue
-from threading import RLock, Thread
+from threading import Condition, Lock, RLock, Thread, get_ident
+from time import monotonic
 from typing import (
     Any,
     Callable,
     Dict,
     FrozenSet,
     Hashable,
+    Iterable,
     Iterator,
     List,
     Optional,
@@ -39,7 +42,14 @@ import networkx as nx
 from blinker import Signal
 
 from ..util import sort_set
-from .cache import KeyframeError, PickyDefaultDict
+from .cache import (
+    Cache,
+    EntitylessCache,
+    HintCache,
+    KeyframeError,
+    PickyDefaultDict,
+    estimate_size,
+)
 from .graph import DiGraph, Edge, GraphsMapping, Node
 from .query import QueryEngine, TimeError
 from .window import HistoricKeyError, WindowDict, update_backward_window, update_window
@@ -95,6 +105,172 @@ def world_locked(fn: Callable) -> Callable:
     return lockedy
 
 
+class WorldLock:
+    """Reentrant reader/writer lock, for use as ``world_lock``
+
+    Enter it in a ``with`` block for exclusive access, same as an ``RLock``.
+    Use :meth:`shared` for access that may overlap with other readers.
+
+    Once a writer is waiting, new readers wait behind it, so writers
+    can't be starved. A thread holding the exclusive lock may take the
+    shared one as well, but a thread holding only the shared lock may not
+    upgrade to exclusive.
+
+    """
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._writer = None
+        self._write_depth = 0
+        self._readers: Dict[int, int] = {}
+        self._writers_waiting = 0
+        self.shared_acquisitions = 0
+        self.exclusive_acquisitions = 0
+        self.shared_contended = 0
+        self.exclusive_contended = 0
+        self.wait_time = 0.0
+
+    def _writable(self) -> bool:
+        return self._writer is None and not self._readers
+
+    def _readable(self) -> bool:
+        return self._writer is None and not self._writers_waiting
+
+    def acquire(self, blocking=True, timeout=-1) -> bool:
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return True
+            if me in self._readers:
+                raise RuntimeError("Can't upgrade a shared world lock to exclusive")
+            self.exclusive_acquisitions += 1
+            if not self._writable():
+                if not blocking:
+                    return False
+                self.exclusive_contended += 1
+                self._writers_waiting += 1
+                start = monotonic()
+                try:
+                    got = self._cond.wait_for(
+                        self._writable, None if timeout < 0 else timeout
+                    )
+                finally:
+                    self._writers_waiting -= 1
+                    self.wait_time += monotonic() - start
+                if not got:
+                    self._cond.notify_all()
+                    return False
+            self._writer = me
+            self._write_depth = 1
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            if self._writer != get_ident():
+                raise RuntimeError("Can't release a world lock you don't hold")
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def acquire_shared(self) -> None:
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            readers = self._readers
+            if me in readers:
+                readers[me] += 1
+                return
+            self.shared_acquisitions += 1
+            if not self._readable():
+                self.shared_contended += 1
+                start = monotonic()
+                self._cond.wait_for(self._readable)
+                self.wait_time += monotonic() - start
+            readers[me] = 1
+
+    def release_shared(self) -> None:
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._writer = None
+                    self._cond.notify_all()
+                return
+            readers = self._readers
+            if me not in readers:
+                raise RuntimeError("Can't release a world lock you don't hold")
+            readers[me] -= 1
+            if not readers[me]:
+                del readers[me]
+                if not readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def shared(self):
+        """Context manager for reading while others may also read"""
+        self.acquire_shared()
+        try:
+            yield self
+        finally:
+            self.release_shared()
+
+    def contention(self) -> Dict[str, Union[int, float]]:
+        """Return counts of how often threads had to wait for me
+
+        ``wait_time`` is the total seconds spent waiting, across all threads.
+
+        """
+        with self._cond:
+            return {
+                "shared_acquisitions": self.shared_acquisitions,
+                "shared_contended": self.shared_contended,
+                "exclusive_acquisitions": self.exclusive_acquisitions,
+                "exclusive_contended": self.exclusive_contended,
+                "wait_time": self.wait_time,
+            }
+
+
+def _shared_locked(lock: WorldLock, fn: Callable) -> Callable:
+    @wraps(fn)
+    def sharedy(*args, **kwargs):
+        with lock.shared():
+            return fn(*args, **kwargs)
+
+    return sharedy
+
+
+def _shared_locked_iter(lock: WorldLock, fn: Callable) -> Callable:
+    # Generators would hold the lock for as long as they're suspended,
+    # so gather the results while holding it.
+    @wraps(fn)
+    def sharedy(*args, **kwargs):
+        with lock.shared():
+            return iter(tuple(fn(*args, **kwargs)))
+
+    return sharedy
+
+
+def _exclusive_locked(lock: WorldLock, fn: Callable) -> Callable:
+    @wraps(fn)
+    def exclusivy(*args, **kwargs):
+        with lock:
+            return fn(*args, **kwargs)
+
+    return exclusivy
+
+
 class GraphNameError(KeyError):
     """For errors involving graphs' names"""
 
@@ -364,6 +540,15 @@ class ORM:
     query_engine_cls = QueryEngine
     illegal_graph_names = {"global"}
     illegal_node_names = {"nodes", "node_val", "edges", "edge_val"}
+    hint_cache_size = 16384
+    patch_collections = False
+    """Whether to save changes to collections as a :class:`wrap.Patch`
+
+    Only turn this on if ``pack`` can serialize them. This only affects
+    the database. The caches, and so deltas, still hold the whole
+    collection after each change.
+
+    """
     time = TimeSignalDescriptor()
 
     def _graph_state_hash(
@@ -577,6 +762,19 @@ class ORM:
         or edge exists.
 
         """
+        return self._replay_branch_delta(
+            branch, turn_from, tick_from, turn_to, tick_to
+        )[0]
+
+    def _replay_branch_delta(
+        self,
+        branch: str,
+        turn_from: int,
+        tick_from: int,
+        turn_to: int,
+        tick_to: int,
+    ) -> Tuple[DeltaDict, int]:
+        """As :meth:`_get_branch_delta`, and count the settings replayed"""
 
         def setgraph(delta: DeltaDict, _: None, graph: Key, val: Any) -> None:
             """Change a delta to say that a graph was deleted or not"""
@@ -661,11 +859,11 @@ class ORM:
         from functools import partial
 
         if turn_from == turn_to:
-            return self._get_turn_delta(branch, turn_from, tick_from, tick_to)
+            return self._get_turn_delta(branch, turn_from, tick_from, tick_to), 0
         delta = {}
         graph_objs = self._graph_objs
         if turn_to < turn_from:
-            updater = partial(
+            update = partial(
                 update_backward_window, turn_from, tick_from, turn_to, tick_to
             )
             gbranches = self._graph_cache.presettings
@@ -676,13 +874,18 @@ class ORM:
             evbranches = self._edge_val_cache.presettings
             tick_to += 1
         else:
-            updater = partial(update_window, turn_from, tick_from, turn_to, tick_to)
+            update = partial(update_window, turn_from, tick_from, turn_to, tick_to)
             gbranches = self._graph_cache.settings
             gvbranches = self._graph_val_cache.settings
             nbranches = self._nodes_cache.settings
             nvbranches = self._node_val_cache.settings
             ebranches = self._edges_cache.settings
             evbranches = self._edge_val_cache.settings
+        replayed = 0
+
+        def updater(updfun, branchd):
+            nonlocal replayed
+            replayed += update(updfun, branchd)
 
         if branch in gbranches:
             updater(partial(setgraph, delta), gbranches[branch])
@@ -708,7 +911,7 @@ class ORM:
                 evbranches[branch],
             )
 
-        return delta
+        return delta, replayed
 
     def _get_turn_delta(
         self,
@@ -911,6 +1114,151 @@ class ORM:
             self._edge_val_cache,
         ]
 
+    _shared_cache_methods = (
+        "retrieve",
+        "contains_entity_or_key",
+        "contains_entity",
+        "contains_key",
+        "contains_entity_key",
+        "count_entities_or_keys",
+        "count_entities",
+        "count_keys",
+        "count_entity_keys",
+        "count_successors",
+        "count_predecessors",
+        "has_successor",
+        "has_predecessor",
+    )
+    _shared_cache_iter_methods = (
+        "iter_entities_or_keys",
+        "iter_entities",
+        "iter_keys",
+        "iter_entity_keys",
+        "iter_successors",
+        "iter_predecessors",
+    )
+    _exclusive_cache_methods = ("store", "remove", "truncate")
+
+    def _iter_caches(self) -> Iterator[Cache]:
+        """Iterate over all my caches, including those inside other caches"""
+        caches = {}
+        for cache in vars(self).values():
+            if isinstance(cache, Cache):
+                caches[id(cache)] = cache
+                for subcache in vars(cache).values():
+                    if isinstance(subcache, Cache):
+                        caches[id(subcache)] = subcache
+        return iter(caches.values())
+
+    def _caches_to_report(self) -> list:
+        return list(self._iter_caches())
+
+    @world_locked
+    def memory_report(self, sample: int = 64) -> dict:
+        """Estimate how much memory my caches are using
+
+        Returns a dictionary with the total number of ``'entries'`` and
+        ``'bytes'``, and the same for each cache under ``'caches'``, along
+        with the numbers for each of the cache's ``'structures'``. Under
+        ``'graphs'``, each graph gets its share of the entries and bytes.
+
+        Only the first ``sample`` items in each container get measured,
+        and the graphs' shares are worked out from the first ``sample``
+        squared keys in each cache, so this is quick enough to call often,
+        even on a big world.
+
+        """
+        caches = {}
+        graphs = {}
+        for cache in self._caches_to_report():
+            usage = cache.memory_usage(sample)
+            entries = sum(entries for (entries, _) in usage.values())
+            size = sum(size for (_, size) in usage.values())
+            name = getattr(cache, "name", None) or type(cache).__name__
+            while name in caches:
+                name += "_"
+            caches[name] = {
+                "entries": entries,
+                "bytes": size,
+                "structures": {
+                    struct: {"entries": struct_entries, "bytes": struct_size}
+                    for (struct, (struct_entries, struct_size)) in usage.items()
+                },
+            }
+            if not entries or not isinstance(cache, Cache):
+                continue
+            if isinstance(cache, EntitylessCache):
+                continue
+            histories = defaultdict(list)
+            for key, history in islice(cache.branches.items(), sample * sample):
+                histories[key[0]].append(history)
+            if not histories:
+                continue
+            scale = len(cache.branches) / sum(map(len, histories.values()))
+            for graph, graph_histories in histories.items():
+                taken = graph_histories[:sample]
+                graph_entries = (
+                    sum(estimate_size(history, sample)[0] for history in taken)
+                    * len(graph_histories)
+                    * scale
+                    / len(taken)
+                )
+                if graph not in graphs:
+                    graphs[graph] = {"entries": 0, "bytes": 0}
+                graphs[graph]["entries"] += round(graph_entries)
+                graphs[graph]["bytes"] += round(graph_entries * size / entries)
+        return {
+            "entries": sum(cache["entries"] for cache in caches.values()),
+            "bytes": sum(cache["bytes"] for cache in caches.values()),
+            "caches": caches,
+            "graphs": graphs,
+        }
+
+    def hint_report(self) -> dict:
+        """Say how well each cache's hints have been working
+
+        Returns a dictionary keyed by cache name, each value having the
+        number of ``'hints'`` kept, the ``'hits'`` and ``'misses'`` when
+        looking them up, and the ``'hit_rate'``.
+
+        """
+        report = {}
+        for cache in self._caches_to_report():
+            hints = getattr(cache, "shallowest", None)
+            if not isinstance(hints, HintCache):
+                continue
+            name = getattr(cache, "name", None) or type(cache).__name__
+            while name in report:
+                name += "_"
+            report[name] = {
+                "hints": len(hints),
+                "hits": hints.hits,
+                "misses": hints.misses,
+                "hit_rate": hints.hit_rate(),
+            }
+        return report
+
+    def _lock_caches(self) -> None:
+        """Make my caches take ``world_lock`` when they're used
+
+        Reads take it shared, writes exclusive.
+
+        """
+        lock = self.world_lock
+        for cache in self._iter_caches():
+            for meth in self._shared_cache_methods:
+                if hasattr(cache, meth):
+                    setattr(cache, meth, _shared_locked(lock, getattr(cache, meth)))
+            for meth in self._shared_cache_iter_methods:
+                if hasattr(cache, meth):
+                    setattr(
+                        cache,
+                        meth,
+                        _shared_locked_iter(lock, getattr(cache, meth)),
+                    )
+            for meth in self._exclusive_cache_methods:
+                setattr(cache, meth, _exclusive_locked(lock, getattr(cache, meth)))
+
     def _get_keyframe(self, branch: str, turn: int, tick: int, copy=True, silent=False):
         """Load the keyframe if it's not loaded, and return it"""
         if (branch, turn, tick) in self._keyframes_loaded:
@@ -961,6 +1309,8 @@ class ORM:
         connect_args: dict = None,
         main_branch=None,
         enforce_end_of_time=False,
+        rw_lock=False,
+        hint_cache_size: int = None,
     ):
         """Make a SQLAlchemy engine and begin a transaction
 
@@ -969,8 +1319,16 @@ class ORM:
         :arg connect_args: Dictionary of
         keyword arguments to be used for the database connection.
 
+        :arg rw_lock: Whether ``world_lock`` should be a :class:`WorldLock`,
+        letting cache reads in different threads proceed together.
+
+        :arg hint_cache_size: How many recent lookups each cache should
+        remember, so it doesn't have to search the history again.
+
         """
-        self.world_lock = RLock()
+        self.world_lock = WorldLock() if rw_lock else RLock()
+        if hint_cache_size is not None:
+            self.hint_cache_size = hint_cache_size
         connect_args = connect_args or {}
         self._planning = False
         self._forward = False
@@ -982,6 +1340,8 @@ class ORM:
         self._init_caches()
         if hasattr(self, "_post_init_cache_hook"):
             self._post_init_cache_hook()
+        if rw_lock:
+            self._lock_caches()
         if not hasattr(self, "query"):
             self.query = self.query_engine_cls(
                 dbstring,
@@ -1161,11 +1521,10 @@ class ORM:
                 edge_val[graph] = {orig: {dest: evv}}
         return ret
 
-    def _load_plans(self) -> None:
-        keyframes_list = self._keyframes_list
+    def _load_keyframe_times(self, times: Iterable[Tuple[str, int, int]]) -> None:
         keyframes_dict = self._keyframes_dict
         keyframes_times = self._keyframes_times
-        for branch, turn, tick in self.query.keyframes_dump():
+        for branch, turn, tick in times:
             if branch not in keyframes_dict:
                 keyframes_dict[branch] = {turn: {tick}}
             else:
@@ -1176,7 +1535,9 @@ class ORM:
                     keyframes_dict_branch[turn].add(tick)
             keyframes_times.add((branch, turn, tick))
 
-        keyframes_list.extend(self.query.keyframes_graphs())
+    def _load_plans(self) -> None:
+        self._load_keyframe_times(self.query.keyframes_dump())
+        self._keyframes_list.extend(self.query.keyframes_graphs())
 
         last_plan = -1
         plans = self._plans
@@ -2056,7 +2417,7 @@ class ORM:
                             for tick in ticks:
                                 if tick <= late_tick:
                                     kf_to_keep.add((past_branch, turn, tick))
-                        else:
+                        elif early_turn < turn < late_turn:
                             kf_to_keep.update(
                                 (past_branch, turn, tick) for tick in ticks
                             )
@@ -2079,7 +2440,7 @@ class ORM:
                         pass
                     else:
                         early.truncate(early_tick, "backward")
-        self._keyframes_loaded = kf_to_keep
+        self._keyframes_loaded.intersection_update(kf_to_keep)
         loaded.update(to_keep)
         for branch in set(loaded).difference(to_keep):
             for cache in caches:
@@ -2183,7 +2544,7 @@ class ORM:
             # been finalized.
             self.query.new_branch(v, curbranch, curturn, curtick)
             self._branches[v] = curbranch, curturn, curtick, curturn, curtick
-            self._upd_branch_parentage(v, curbranch)
+            self._upd_branch_parentage(curbranch, v)
             self._turn_end_plan[v, curturn] = self._turn_end[v, curturn] = curtick
         self._obranch = v
         self._otick = tick = self._turn_end_plan[v, curturn]
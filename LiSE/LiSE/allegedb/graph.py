@@ -141,6 +141,15 @@ class AbstractEntityMapping(AllegedMapping, ABC):
         self._del_cache(key, branch, turn, tick)
         self._del_db(key, branch, turn, tick)
 
+    def _patch_key(self, key, patch):
+        """Change the collection at ``key``, and save only the change"""
+        branch, turn, tick = self.db._nbtt()
+        value = patch.apply(self._get_cache(key, branch, turn, tick))
+        self._set_cache(key, branch, turn, tick, value)
+        self._set_db(
+            key, branch, turn, tick, patch if self.db.patch_collections else value
+        )
+
 
 class GraphMapping(AbstractEntityMapping):
     """Mapping for graph attributes"""
@@ -19,8 +19,11 @@ doesn't pollute the other files so much.
 """
 
 import os
-from collections import defaultdict
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
 from collections.abc import MutableMapping
+from functools import lru_cache
 from queue import Empty, Queue
 from threading import Lock, Thread
 from time import monotonic
@@ -43,6 +46,29 @@ GraphValRowType = Tuple[Hashable, Hashable, str, int, int, Any]
 NodeValRowType = Tuple[Hashable, Hashable, Hashable, str, int, int, Any]
 EdgeValRowType = Tuple[Hashable, Hashable, Hashable, int, str, int, int, Any]
 
+KEYFRAME_DELTA = b"\xc1"
+"""Starts a keyframe blob that holds only changes since an earlier keyframe
+
+No msgpack object or ``repr`` starts with this byte.
+
+"""
+
+
+def is_plain_key(key) -> bool:
+    """Return whether ``key`` is only ``str`` and ``int``, in nested tuples
+
+    Such keys are equal only if they have the same types all the way down,
+    so they're safe to use in a ``dict`` that mustn't mix up ``1``,
+    ``1.0``, and ``True``.
+
+    """
+    typ = type(key)
+    if typ is str or typ is int:
+        return True
+    if typ is tuple:
+        return all(map(is_plain_key, key))
+    return False
+
 
 class TimeError(ValueError):
     """Exception class for problems with the time model"""
@@ -172,6 +198,11 @@ class ConnectionHolder:
                 silent = True
             if inst[0] == "echo":
                 self.outq.put(inst[1])
+            elif inst[0] in ("backup", "vacuum", "database_size"):
+                try:
+                    self.outq.put(getattr(self, inst[0])(*inst[1:]))
+                except Exception as ex:
+                    self.outq.put(ex)
             elif inst[0] == "one":
                 try:
                     res = self.call_one(inst[1], *inst[2], **inst[3])
@@ -222,6 +253,41 @@ class ConnectionHolder:
             [dict(zip(statement.positiontup, larg)) for larg in largs],
         )
 
+    def backup(self, path):
+        """Copy the database, as committed, into a new SQLite file"""
+        import sqlite3
+
+        raw = self.connection.connection.dbapi_connection
+        if not isinstance(raw, sqlite3.Connection):
+            raise TypeError("Can only back up SQLite databases")
+        dest = sqlite3.connect(path)
+        try:
+            raw.backup(dest)
+        finally:
+            dest.close()
+
+    def vacuum(self):
+        """Commit, then rebuild the SQLite database file to free unused space"""
+        import sqlite3
+
+        raw = self.connection.connection.dbapi_connection
+        if not isinstance(raw, sqlite3.Connection):
+            raise TypeError("Can only vacuum SQLite databases")
+        self.commit()
+        raw.execute("VACUUM")
+
+    def database_size(self):
+        """Return the number of bytes in use in the SQLite database"""
+        import sqlite3
+
+        raw = self.connection.connection.dbapi_connection
+        if not isinstance(raw, sqlite3.Connection):
+            raise TypeError("Can only measure SQLite databases")
+        (page_count,) = raw.execute("PRAGMA page_count").fetchone()
+        (freelist_count,) = raw.execute("PRAGMA freelist_count").fetchone()
+        (page_size,) = raw.execute("PRAGMA page_size").fetchone()
+        return (page_count - freelist_count) * page_size
+
     def initdb(self):
         """Create tables and indices as needed."""
         for table in (
@@ -267,6 +333,9 @@ class QueryEngine(object):
         "universals",
     )
 
+    key_pack_cache_size = 16384
+    """How many packed keys to remember. See ``pack_key``."""
+
     def __init__(self, dbstring, connect_args, pack=None, unpack=None, gather=None):
         dbstring = dbstring or "sqlite:///:memory:"
         self._inq = Queue()
@@ -287,6 +356,23 @@ class QueryEngine(object):
                 return literal_eval(b.decode())
 
         self.pack = pack
+        pack_memo = lru_cache(maxsize=self.key_pack_cache_size)(pack)
+
+        def pack_key(key: Any) -> bytes:
+            """Like ``pack``, but remembers what it packed
+
+            Only use this for the names of graphs, nodes, and the like,
+            which are packed over and over again. Values go through
+            ``pack``. Only keys made of ``str`` and ``int`` are remembered,
+            since ``lru_cache`` can't tell ``(1, 0)`` from ``(True, 0)``.
+
+            """
+            if is_plain_key(key):
+                return pack_memo(key)
+            return pack(key)
+
+        pack_key.cache_info = pack_memo.cache_info
+        self.pack_key = pack_key
         self.unpack = unpack
         self._branches = {}
         self._nodevals2set = []
@@ -296,6 +382,11 @@ class QueryEngine(object):
         self._edges2set = []
         self._new_keyframes = []
         self._new_keyframe_times = set()
+        self.keyframe_base_interval = 8
+        self.keyframe_cache_size = 32
+        self._kf_graph_times = defaultdict(list)
+        self._kf_graph_latest = OrderedDict()
+        self._kf_graph_cache = OrderedDict()
         self._btts = set()
         self._t = Thread(target=self._holder.run, daemon=True)
         self._t.start()
@@ -322,6 +413,32 @@ class QueryEngine(object):
             raise ret
         return ret
 
+    def backup(self, path):
+        __doc__ = ConnectionHolder.backup.__doc__
+        with self._holder.lock:
+            self._inq.put(("backup", path))
+            ret = self._outq.get()
+        if isinstance(ret, Exception):
+            raise ret
+
+    def vacuum(self):
+        __doc__ = ConnectionHolder.vacuum.__doc__
+        self.flush()
+        with self._holder.lock:
+            self._inq.put(("vacuum",))
+            ret = self._outq.get()
+        if isinstance(ret, Exception):
+            raise ret
+
+    def database_size(self):
+        __doc__ = ConnectionHolder.database_size.__doc__
+        with self._holder.lock:
+            self._inq.put(("database_size",))
+            ret = self._outq.get()
+        if isinstance(ret, Exception):
+            raise ret
+        return ret
+
     def execute(self, stmt):
         if not isinstance(stmt, Select):
             raise TypeError("Only select statements should be executed")
@@ -336,9 +453,190 @@ class QueryEngine(object):
         return self.call_one("graphs_insert", graph, branch, turn, tick, typ)
 
     def keyframe_graph_insert(self, graph, branch, turn, tick, nodes, edges, graph_val):
-        self._new_keyframes.append((graph, branch, turn, tick, nodes, edges, graph_val))
+        """Store a keyframe of one graph
+
+        If there's an earlier keyframe of the graph in the same branch, only
+        the nodes, edges, and graph stats that changed since then get
+        stored, unless it's been ``keyframe_base_interval`` keyframes since
+        the last complete one, or most of the graph changed.
+
+        """
+        pack = self.pack
+        parts = tuple(
+            {k: pack(v) for (k, v) in part.items()}
+            for part in (nodes, edges, graph_val)
+        )
+        times = self._kf_graph_times[graph, branch]
+        i = bisect_left(times, (turn, tick))
+        if i == len(times) or times[i] != (turn, tick):
+            times.insert(i, (turn, tick))
+        blobs = None
+        depth = 0
+        if i:
+            prev_turn, prev_tick = times[i - 1]
+            try:
+                prev_depth, *prev_parts = self._get_keyframe_graph_packed(
+                    graph, branch, prev_turn, prev_tick
+                )
+            except KeyError:
+                prev_depth = None
+            if prev_depth is not None and prev_depth + 1 < self.keyframe_base_interval:
+                diffs = [
+                    (
+                        {k: v for (k, v) in part.items() if prev_part.get(k) != v},
+                        [k for k in prev_part if k not in part],
+                    )
+                    for (part, prev_part) in zip(parts, prev_parts)
+                ]
+                changes = sum(len(changed) + len(deled) for (changed, deled) in diffs)
+                if changes * 2 <= sum(map(len, parts)):
+                    depth = prev_depth + 1
+                    blobs = [
+                        KEYFRAME_DELTA
+                        + zlib.compress(
+                            pack([prev_turn, prev_tick, depth, changed, deled])
+                        )
+                        for (changed, deled) in diffs
+                    ]
+        if blobs is None:
+            blobs = [pack(nodes), pack(edges), pack(graph_val)]
+        self._cache_keyframe_graph(graph, branch, turn, tick, (depth, *parts))
+        self._new_keyframes.append((self.pack_key(graph), branch, turn, tick, *blobs))
         self._new_keyframe_times.add((branch, turn, tick))
 
+    def _cache_keyframe_graph(self, graph, branch, turn, tick, packed):
+        latests = self._kf_graph_latest
+        latest = latests.get((graph, branch))
+        if latest is None or latest[0] <= (turn, tick):
+            latests[graph, branch] = ((turn, tick), packed)
+            latests.move_to_end((graph, branch))
+            while len(latests) > self.keyframe_cache_size:
+                latests.popitem(last=False)
+        cache = self._kf_graph_cache
+        cache[graph, branch, turn, tick] = packed
+        cache.move_to_end((graph, branch, turn, tick))
+        while len(cache) > self.keyframe_cache_size:
+            cache.popitem(last=False)
+
+    def _get_keyframe_graph_blobs(self, graph, branch, turn, tick):
+        packed_graph = self.pack_key(graph)
+        for row in reversed(self._new_keyframes):
+            if row[:4] == (packed_graph, branch, turn, tick):
+                return row[4:]
+        stuff = self.call_one("get_keyframe_graph", packed_graph, branch, turn, tick)
+        if not stuff:
+            raise KeyError(f"No keyframe for {graph} at {branch, turn, tick}")
+        return stuff[0]
+
+    def _get_keyframe_graph_packed(self, graph, branch, turn, tick):
+        """Return a keyframe's depth in its chain, and its parts, packed
+
+        The parts are dictionaries of nodes, edges, and graph stats, with
+        their values packed.
+
+        """
+        latest = self._kf_graph_latest.get((graph, branch))
+        if latest is not None and latest[0] == (turn, tick):
+            return latest[1]
+        cache = self._kf_graph_cache
+        if (graph, branch, turn, tick) in cache:
+            cache.move_to_end((graph, branch, turn, tick))
+            return cache[graph, branch, turn, tick]
+        pack = self.pack
+        unpack = self.unpack
+        depth = 0
+        parts = []
+        for blob in self._get_keyframe_graph_blobs(graph, branch, turn, tick):
+            if blob[:1] == KEYFRAME_DELTA:
+                prev_turn, prev_tick, depth, changed, deled = unpack(
+                    zlib.decompress(blob[1:])
+                )
+                prev = self._get_keyframe_graph_packed(
+                    graph, branch, prev_turn, prev_tick
+                )
+                part = dict(prev[len(parts) + 1])
+                for k in deled:
+                    del part[k]
+                part.update(changed)
+            else:
+                part = {k: pack(v) for (k, v) in unpack(blob).items()}
+            parts.append(part)
+        ret = (depth, *parts)
+        self._cache_keyframe_graph(graph, branch, turn, tick, ret)
+        return ret
+
+    def index_keyframe_graph(self, graph, branch, turn, tick):
+        """Note that there's a keyframe of ``graph`` at this time
+
+        So that later keyframes of it can be stored as changes.
+
+        """
+        times = self._kf_graph_times[graph, branch]
+        i = bisect_left(times, (turn, tick))
+        if i == len(times) or times[i] != (turn, tick):
+            times.insert(i, (turn, tick))
+
+    def rebase_keyframes(self, branch, turn, tick):
+        """Forget keyframes of ``branch`` before this time
+
+        The first keyframe of each graph after then, if it was stored as
+        changes since an earlier one, gets stored in full, so that the
+        earlier keyframes may be deleted from the database.
+
+        """
+        self.flush()
+        pack = self.pack
+        unpack = self.unpack
+        for (graph, branc), times in self._kf_graph_times.items():
+            if branc != branch:
+                continue
+            i = bisect_left(times, (turn, tick))
+            if i < len(times):
+                first_turn, first_tick = times[i]
+                blobs = self._get_keyframe_graph_blobs(
+                    graph, branch, first_turn, first_tick
+                )
+                if any(blob[:1] == KEYFRAME_DELTA for blob in blobs):
+                    _, *parts = self._get_keyframe_graph_packed(
+                        graph, branch, first_turn, first_tick
+                    )
+                    packed_graph = pack(graph)
+                    self.call_one(
+                        "keyframes_graphs_del",
+                        packed_graph,
+                        branch,
+                        first_turn,
+                        first_tick,
+                    )
+                    self.call_one(
+                        "keyframes_graphs_insert",
+                        packed_graph,
+                        branch,
+                        first_turn,
+                        first_tick,
+                        *(
+                            pack({k: unpack(v) for (k, v) in part.items()})
+                            for part in parts
+                        ),
+                    )
+                    self._cache_keyframe_graph(
+                        graph, branch, first_turn, first_tick, (0, *parts)
+                    )
+            del times[:i]
+            if not times:
+                self._kf_graph_latest.pop((graph, branc), None)
+        for key in list(self._kf_graph_cache):
+            if key[1] == branch and key[2:] < (turn, tick):
+                del self._kf_graph_cache[key]
+
+    def forget_keyframes(self, branch):
+        """Forget every keyframe of ``branch``"""
+        for key in [key for key in self._kf_graph_times if key[1] == branch]:
+            del self._kf_graph_times[key]
+            self._kf_graph_latest.pop(key, None)
+        for key in [key for key in self._kf_graph_cache if key[1] == branch]:
+            del self._kf_graph_cache[key]
+
     def keyframe_insert(self, branch: str, turn: int, tick: int):
         self._new_keyframe_times.add((branch, turn, tick))
 
@@ -347,18 +645,20 @@ class QueryEngine(object):
 
     def keyframes_graphs(self):
         unpack = self.unpack
+        index = self.index_keyframe_graph
         for graph, branch, turn, tick in self.call_one("keyframes_graphs_list"):
-            yield unpack(graph), branch, turn, tick
+            graph = unpack(graph)
+            index(graph, branch, turn, tick)
+            yield graph, branch, turn, tick
 
     def get_keyframe_graph(self, graph, branch, turn, tick):
         unpack = self.unpack
-        stuff = self.call_one(
-            "get_keyframe_graph", self.pack(graph), branch, turn, tick
-        )
-        if not stuff:
-            raise KeyError(f"No keyframe for {graph} at {branch, turn, tick}")
-        nodes, edges, graph_val = stuff[0]
-        return unpack(nodes), unpack(edges), unpack(graph_val)
+        if (graph, branch, turn, tick) not in self._kf_graph_cache:
+            blobs = self._get_keyframe_graph_blobs(graph, branch, turn, tick)
+            if not any(blob[:1] == KEYFRAME_DELTA for blob in blobs):
+                return tuple(map(unpack, blobs))
+        _, *parts = self._get_keyframe_graph_packed(graph, branch, turn, tick)
+        return tuple({k: unpack(v) for (k, v) in part.items()} for part in parts)
 
     def graph_type(self, graph):
         """What type of graph is this?"""
@@ -541,10 +841,11 @@ class QueryEngine(object):
         if not self._graphvals2set:
             return
         pack = self.pack
+        pack_key = self.pack_key
         self.call_many(
             "graph_val_insert",
             (
-                (pack(graph), pack(key), branch, turn, tick, pack(value))
+                (pack_key(graph), pack_key(key), branch, turn, tick, pack(value))
                 for (
                     graph,
                     key,
@@ -611,11 +912,11 @@ class QueryEngine(object):
     def _flush_nodes(self):
         if not self._nodes2set:
             return
-        pack = self.pack
+        pack_key = self.pack_key
         self.call_many(
             "nodes_insert",
             (
-                (pack(graph), pack(node), branch, turn, tick, bool(extant))
+                (pack_key(graph), pack_key(node), branch, turn, tick, bool(extant))
                 for (
                     graph,
                     node,
@@ -1002,13 +1303,14 @@ class QueryEngine(object):
         if not self._nodevals2set:
             return
         pack = self.pack
+        pack_key = self.pack_key
         self.call_many(
             "node_val_insert",
             (
                 (
-                    pack(graph),
-                    pack(node),
-                    pack(key),
+                    pack_key(graph),
+                    pack_key(node),
+                    pack_key(key),
                     branch,
                     turn,
                     tick,
@@ -1114,11 +1416,11 @@ class QueryEngine(object):
 
     def _pack_edge2set(self, tup):
         graph, orig, dest, idx, branch, turn, tick, extant = tup
-        pack = self.pack
+        pack_key = self.pack_key
         return (
-            pack(graph),
-            pack(orig),
-            pack(dest),
+            pack_key(graph),
+            pack_key(orig),
+            pack_key(dest),
             idx,
             branch,
             turn,
@@ -1225,12 +1527,13 @@ class QueryEngine(object):
     def _pack_edgeval2set(self, tup):
         graph, orig, dest, idx, key, branch, turn, tick, value = tup
         pack = self.pack
+        pack_key = self.pack_key
         return (
-            pack(graph),
-            pack(orig),
-            pack(dest),
+            pack_key(graph),
+            pack_key(orig),
+            pack_key(dest),
             idx,
-            pack(key),
+            pack_key(key),
             branch,
             turn,
             tick,
@@ -1290,6 +1593,7 @@ class QueryEngine(object):
 
     def _flush(self):
         pack = self.pack
+        pack_key = self.pack_key
         put = self._inq.put
         if self._nodes2set:
             put(
@@ -1299,8 +1603,8 @@ class QueryEngine(object):
                     "nodes_insert",
                     [
                         (
-                            pack(graph),
-                            pack(node),
+                            pack_key(graph),
+                            pack_key(node),
                             branch,
                             turn,
                             tick,
@@ -1336,8 +1640,8 @@ class QueryEngine(object):
                     "graph_val_insert",
                     [
                         (
-                            pack(graph),
-                            pack(key),
+                            pack_key(graph),
+                            pack_key(key),
                             branch,
                             turn,
                             tick,
@@ -1363,9 +1667,9 @@ class QueryEngine(object):
                     "node_val_insert",
                     [
                         (
-                            pack(graph),
-                            pack(node),
-                            pack(key),
+                            pack_key(graph),
+                            pack_key(node),
+                            pack_key(key),
                             branch,
                             turn,
                             tick,
@@ -1410,26 +1714,7 @@ class QueryEngine(object):
                     "silent",
                     "many",
                     "keyframes_graphs_insert",
-                    [
-                        (
-                            pack(graph),
-                            branch,
-                            turn,
-                            tick,
-                            pack(nodes),
-                            pack(edges),
-                            pack(graph_val),
-                        )
-                        for (
-                            graph,
-                            branch,
-                            turn,
-                            tick,
-                            nodes,
-                            edges,
-                            graph_val,
-                        ) in self._new_keyframes
-                    ],
+                    self._new_keyframes,
                 )
             )
             self._new_keyframes = []
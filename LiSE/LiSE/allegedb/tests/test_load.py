@@ -222,3 +222,70 @@ def test_keyframe_unload(tmpdbfile):
         ) in orm._edges_cache.keyframe and "trunk" in orm._edges_cache.keyframe[
             "g", (1, 1), (1, 2)
         ]
+
+
+def test_hint_cache(tmpdbfile):
+    with ORM("sqlite:///" + tmpdbfile, hint_cache_size=50) as orm:
+        g = orm.new_digraph("g", nx.grid_2d_graph(5, 5))
+        h = orm.new_digraph("h", nx.path_graph(5))
+        for turn in range(1, 4):
+            orm.turn = turn
+            for node in g.node.values():
+                node["turn"] = turn
+            for node in h.node.values():
+                node["turn"] = turn
+        for node in g.node.values():
+            assert node["turn"] == 3
+        for node in g.node.values():
+            assert node["turn"] == 3
+        hints = orm._node_val_cache.shallowest
+        assert len(hints) == 50
+        report = orm.hint_report()["node_val_cache"]
+        assert report["hints"] == 50
+        assert report["hits"] > 0
+        assert 0 < report["hit_rate"] < 1
+        hints.forget_graph("g")
+        assert all(key[0] == "h" for key in hints)
+        orm.branch = "b"
+        orm.turn = 4
+        h.node[0]["turn"] = 4
+        assert h.node[0]["turn"] == 4
+        hints.forget_branch("b")
+        assert all(key[-3] == "trunk" for key in hints)
+
+def test_pack_key_memo(tmpdbfile):
+    with ORM("sqlite:///" + tmpdbfile) as orm:
+        g = orm.new_digraph("g", nx.grid_2d_graph(3, 3))
+        for turn in range(1, 3):
+            orm.turn = turn
+            for node in g.node.values():
+                node["turn"] = turn
+            g.node[0, 0][1] = turn
+            g.node[0, 0][1.5] = turn
+            g.node[0, 1][True] = turn
+            orm.query.flush()
+        assert orm.query.pack_key.cache_info().hits > 9
+    with ORM("sqlite:///" + tmpdbfile) as orm:
+        g = orm.graph["g"]
+        for turn in range(1, 3):
+            orm.turn = turn
+            assert g.node[0, 0]["turn"] == turn
+            assert {type(k) for k in g.node[0, 0]} == {str, int, float}
+            assert {type(k) for k in g.node[0, 1]} == {str, bool}
+
+
+def test_pack_key_nested_types(tmpdbfile):
+    with ORM("sqlite:///" + tmpdbfile) as orm:
+        pack_key = orm.query.pack_key
+        assert pack_key((1, 0)) == orm.query.pack((1, 0))
+        for key in ((True, 0), (1.0, 0), ((1, True), 0), (1, (0, 1.0))):
+            assert pack_key(key) == orm.query.pack(key)
+            assert pack_key(key) == orm.query.pack(key)
+        # (1, 0) == (True, 0), so they need to be in different graphs
+        for name, node in (("a", (1, 0)), ("b", (True, 0)), ("c", (1.0, 0))):
+            orm.new_digraph(name).add_node(node)
+        types = {
+            graph: tuple(map(type, node))
+            for (graph, node, *_) in orm.query.nodes_dump()
+        }
+        assert types == {"a": (int, int), "b": (bool, int), "c": (float, int)}
@@ -0,0 +1,163 @@
+import sys
+from threading import Event, Thread
+
+import networkx as nx
+import pytest
+
+from LiSE.allegedb import ORM, WorldLock
+from LiSE.allegedb.cache import HintCache, recording_reads
+
+
+def test_shared_readers_overlap():
+    lock = WorldLock()
+    both_in = Event()
+    entered = []
+
+    def read():
+        with lock.shared():
+            entered.append(True)
+            if len(entered) == 2:
+                both_in.set()
+            assert both_in.wait(5)
+
+    threads = [Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert both_in.is_set()
+
+
+def test_writer_not_starved():
+    lock = WorldLock()
+    order = []
+    lock.acquire_shared()
+
+    def write():
+        with lock:
+            order.append("write")
+
+    def read():
+        with lock.shared():
+            order.append("read")
+
+    writer = Thread(target=write)
+    writer.start()
+    while not lock._writers_waiting:
+        pass
+    reader = Thread(target=read)
+    reader.start()
+    while not lock.shared_contended:
+        pass
+    lock.release_shared()
+    writer.join()
+    reader.join()
+    assert order == ["write", "read"]
+    stats = lock.contention()
+    assert stats["exclusive_contended"] == 1
+    assert stats["shared_contended"] == 1
+
+
+def test_reentrance():
+    lock = WorldLock()
+    with lock:
+        with lock:
+            with lock.shared():
+                pass
+    with lock.shared():
+        with lock.shared():
+            with pytest.raises(RuntimeError):
+                lock.acquire()
+
+
+def test_rw_lock_orm(tmpdbfile):
+    with ORM("sqlite:///" + tmpdbfile, rw_lock=True) as orm:
+        assert isinstance(orm.world_lock, WorldLock)
+        orm.new_digraph("path", nx.path_graph(5))
+        orm.turn = 1
+        del orm.graph["path"].node[4]
+        assert set(orm.graph["path"].node) == {0, 1, 2, 3}
+        assert orm.world_lock.contention()["exclusive_acquisitions"] > 0
+        assert orm.world_lock.contention()["shared_acquisitions"] > 0
+
+
+@pytest.fixture
+def fast_switching():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def run_threads(target, n):
+    errors = []
+
+    def run(i):
+        try:
+            target(i)
+        except BaseException as ex:
+            errors.append(ex)
+
+    threads = [Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+
+def test_hint_cache_threads(fast_switching):
+    hints = HintCache(64)
+
+    def churn(offset):
+        for _ in range(600):
+            for i in range(128):
+                key = ("g", (i + offset * 16) % 128, "trunk", 0, 0)
+                if hints.lookup(key) is None:
+                    hints[key] = i
+
+    run_threads(churn, 8)
+    assert len(hints) == 64
+    assert len(hints) == sum(map(len, hints._by_graph.values()))
+
+
+def test_rw_lock_shared_hints(tmpdbfile, fast_switching):
+    with ORM("sqlite:///" + tmpdbfile, rw_lock=True, hint_cache_size=16) as orm:
+        g = orm.new_digraph("g", nx.complete_graph(4))
+        for i in range(64):
+            g.graph[i] = i
+
+        def read(offset):
+            for _ in range(100):
+                with orm.world_lock.shared():
+                    for i in range(64):
+                        k = (i + offset * 16) % 64
+                        assert g.graph[k] == k
+
+        run_threads(read, 4)
+        hints = orm._graph_val_cache.shallowest
+        assert len(hints) == 16
+        assert len(hints) == sum(map(len, hints._by_graph.values()))
+
+
+def test_recording_reads_per_thread(tmpdbfile):
+    with ORM("sqlite:///" + tmpdbfile) as orm:
+        g = orm.new_digraph("g", nx.path_graph(3))
+        g.graph["k"] = "v"
+        with recording_reads() as reads:
+
+            def read(_):
+                assert g.graph["k"] == "v"
+                assert orm._edge_exists("g", 0, 1)
+
+            run_threads(read, 2)
+            assert reads == []
+            # looked up through a method bound when the ORM started
+            assert orm._edge_exists("g", 0, 1)
+            assert g.graph["k"] == "v"
+        assert [(cache, args[:-3], ret) for (cache, args, ret) in reads] == [
+            (orm._edges_cache, ("g", 0, 1, 0), True),
+            (orm._graph_val_cache, ("g", "k"), "v"),
+        ]
+        assert g.graph["k"] == "v"
+        assert len(reads) == 2
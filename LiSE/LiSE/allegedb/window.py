@@ -47,19 +47,28 @@ def update_window(
     updfun: Callable,
     branchd: Dict[int, List[tuple]],
 ):
-    """Iterate over some time in ``branchd``, call ``updfun`` on the values"""
+    """Iterate over some time in ``branchd``, call ``updfun`` on the values
+
+    Return how many values there were.
+
+    """
+    n = 0
     if turn_from in branchd:
         # Not including the exact tick you started from,
         # because deltas are *changes*
         for past_state in branchd[turn_from][tick_from + 1 :]:
             updfun(*past_state)
+            n += 1
     for midturn in range(turn_from + 1, turn_to):
         if midturn in branchd:
             for past_state in branchd[midturn][:]:
                 updfun(*past_state)
+                n += 1
     if turn_to in branchd:
         for past_state in branchd[turn_to][: tick_to + 1]:
             updfun(*past_state)
+            n += 1
+    return n
 
 
 def update_backward_window(
@@ -70,17 +79,26 @@ def update_backward_window(
     updfun: Callable,
     branchd: Dict[int, List[tuple]],
 ):
-    """Iterate backward over time in ``branchd``, call ``updfun`` on the values"""
+    """Iterate backward over time in ``branchd``, call ``updfun`` on the values
+
+    Return how many values there were.
+
+    """
+    n = 0
     if turn_from in branchd:
         for future_state in reversed(branchd[turn_from][: tick_from + 1]):
             updfun(*future_state)
+            n += 1
     for midturn in range(turn_from - 1, turn_to, -1):
         if midturn in branchd:
             for future_state in reversed(branchd[midturn][:]):
                 updfun(*future_state)
+                n += 1
     if turn_to in branchd:
         for future_state in reversed(branchd[turn_to][tick_to + 1 :]):
             updfun(*future_state)
+            n += 1
+    return n
 
 
 class HistoricKeyError(KeyError):
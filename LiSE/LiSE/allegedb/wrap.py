@@ -15,7 +15,13 @@
 """Wrapper classes to let you store mutable data types in the allegedb ORM
 
 The wrapper objects act like regular mutable objects, but write a new copy
-of themselves to allegedb every time they are changed.
+of themselves to allegedb every time they are changed. Where the ORM
+supports it, only a :class:`Patch` describing the change gets written
+to the database.
+
+Patches only save space in the database. The in-memory caches still
+get a whole new copy of the collection for every change, made with
+:meth:`Patch.apply`, and deltas carry the whole new value.
 
 """
 
@@ -35,6 +41,46 @@ from itertools import zip_longest
 from typing import Callable
 
 
+class Patch:
+    """Changes to make to a list, set, or dict, in order
+
+    Each operation is a tuple of a method name and its arguments:
+    ``("append", value)``, ``("insert", index, value)``,
+    ``("setitem", key, value)``, ``("delitem", key)``, ``("add", value)``,
+    or ``("discard", value)``.
+
+    """
+
+    __slots__ = ("ops",)
+
+    def __init__(self, *ops: tuple):
+        self.ops = ops
+
+    def apply(self, collection):
+        """Return a copy of ``collection`` with my changes made to it"""
+        new = collection.copy()
+        for op, *args in self.ops:
+            if op == "setitem":
+                new[args[0]] = args[1]
+            elif op == "delitem":
+                del new[args[0]]
+            else:
+                getattr(new, op)(*args)
+        return new
+
+    def __add__(self, other: "Patch") -> "Patch":
+        return Patch(*self.ops, *other.ops)
+
+    def __eq__(self, other):
+        return isinstance(other, Patch) and self.ops == other.ops
+
+    def __hash__(self):
+        return hash(self.ops)
+
+    def __repr__(self):
+        return "Patch{}".format(self.ops)
+
+
 class MutableWrapper(ABC):
     __slots__ = ()
 
@@ -71,6 +117,9 @@ class MutableWrapper(ABC):
     def unwrap(self):
         raise NotImplementedError
 
+    def _patch(self, *op):
+        self._set(Patch(op).apply(self._getter()))
+
 
 Iterable.register(MutableWrapper)
 Sized.register(MutableWrapper)
@@ -81,9 +130,7 @@ class MutableWrapperDictList(MutableWrapper, ABC):
     __slots__ = ()
 
     def _subset(self, k, v):
-        new = self._copy()
-        new[k] = v
-        self._set(new)
+        self._patch("setitem", k, v)
 
     def __getitem__(self, k):
         ret = self._getter()[k]
@@ -96,14 +143,10 @@ class MutableWrapperDictList(MutableWrapper, ABC):
         return ret
 
     def __setitem__(self, key, value):
-        me = self._copy()
-        me[key] = value
-        self._set(me)
+        self._patch("setitem", key, value)
 
     def __delitem__(self, key):
-        me = self._copy()
-        del me[key]
-        self._set(me)
+        self._patch("delitem", key)
 
 
 class MutableMappingUnwrapper(MutableMapping, ABC):
@@ -157,11 +200,6 @@ class SubDictWrapper(MutableMappingWrapper, dict):
     def _copy(self):
         return dict(self._getter())
 
-    def _subset(self, k, v):
-        new = dict(self._getter())
-        new[k] = v
-        self._set(new)
-
 
 class MutableSequenceWrapper(MutableWrapperDictList, MutableSequence, ABC):
     def __eq__(self, other):
@@ -198,14 +236,10 @@ class SubListWrapper(MutableSequenceWrapper, list):
         return list(self._getter())
 
     def insert(self, index, object):
-        me = self._copy()
-        me.insert(index, object)
-        self._set(me)
+        self._patch("insert", index, object)
 
     def append(self, object):
-        me = self._copy()
-        me.append(object)
-        self._set(me)
+        self._patch("append", object)
 
 
 class MutableWrapperSet(MutableWrapper, MutableSet):
@@ -217,25 +251,25 @@ class MutableWrapperSet(MutableWrapper, MutableSet):
         return set(self._getter())
 
     def pop(self):
-        me = self._copy()
-        yours = me.pop()
-        self._set(me)
+        me = self._getter()
+        if not me:
+            raise KeyError("pop from an empty set")
+        yours = next(iter(me))
+        self._patch("discard", yours)
         return yours
 
     def discard(self, element):
-        me = self._copy()
-        me.discard(element)
-        self._set(me)
+        if element in self._getter():
+            self._patch("discard", element)
 
     def remove(self, element):
-        me = self._copy()
-        me.remove(element)
-        self._set(me)
+        if element not in self._getter():
+            raise KeyError(element)
+        self._patch("discard", element)
 
     def add(self, element):
-        me = self._copy()
-        me.add(element)
-        self._set(me)
+        if element not in self._getter():
+            self._patch("add", element)
 
     def unwrap(self):
         """Deep copy myself as a set, all contents unwrapped"""
@@ -259,6 +293,19 @@ class SubSetWrapper(MutableWrapperSet, set):
         return set(self._getter())
 
 
+def _patch_outer(wrapper, op: tuple) -> None:
+    """Change the collection ``wrapper`` wraps, with a :class:`Patch` if I can
+
+    Mappings that can record patches have a ``_patch_key`` method.
+
+    """
+    patch_key = getattr(wrapper._outer, "_patch_key", None)
+    if patch_key is None:
+        wrapper._set(Patch(op).apply(wrapper._getter()))
+    else:
+        patch_key(wrapper._key, Patch(op))
+
+
 class DictWrapper(MutableMappingWrapper, dict):
     """A dictionary synchronized with a serialized field.
 
@@ -284,6 +331,9 @@ class DictWrapper(MutableMappingWrapper, dict):
         self._setter(v)
         self._outer[self._key] = v
 
+    def _patch(self, *op):
+        _patch_outer(self, op)
+
 
 class ListWrapper(MutableWrapperDictList, MutableSequence, list):
     """A list synchronized with a serialized field.
@@ -323,15 +373,14 @@ class ListWrapper(MutableWrapperDictList, MutableSequence, list):
         self._setter(v)
         self._outer[self._key] = v
 
+    def _patch(self, *op):
+        _patch_outer(self, op)
+
     def insert(self, i, v):
-        new = self._copy()
-        new.insert(i, v)
-        self._set(new)
+        self._patch("insert", i, v)
 
     def append(self, v):
-        new = self._copy()
-        new.append(v)
-        self._set(new)
+        self._patch("append", v)
 
     def unwrap(self):
         """Deep copy myself as a list, with all contents unwrapped"""
@@ -363,6 +412,9 @@ class SetWrapper(MutableWrapperSet, set):
         self._setter(v)
         self._outer[self._key] = v
 
+    def _patch(self, *op):
+        _patch_outer(self, op)
+
 
 class UnwrappingDict(dict):
     """Dict that stores the data from the wrapper classes
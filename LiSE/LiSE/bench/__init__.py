@@ -0,0 +1,225 @@
+# This file is part of LiSE, a framework for life simulation games.
+# Copyright (c) Zachary Spector, public@zacharyspector.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Benchmarks of the example simulations, to catch performance regressions
+
+Run them as:
+
+	python3 -m LiSE.bench --output results.json
+
+and compare with an earlier run by adding ``--baseline baseline.json``.
+Any metric that got worse by more than the ``--tolerance`` is reported,
+and the exit status is 1.
+
+Each scenario is one of the modules in :mod:`LiSE.examples`, installed
+at some ``size``, whose meaning depends on the scenario; see
+:data:`SCENARIOS`. For each, we measure the time it takes to install,
+turns simulated per second, the latency of time travel to each of those
+turns, how long it takes to load the world again, peak memory use, and
+the growth of the database per turn.
+
+"""
+
+import os
+import platform
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from multiprocessing import get_context
+from random import Random
+from tempfile import TemporaryDirectory
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..engine import Engine
+from ..examples import college, kobold, pathfind, polygons, sickle, wolfsheep
+
+
+def _kobold(eng: Engine, size: int) -> None:
+    kobold.inittest(
+        eng,
+        mapsize=(size, size),
+        kobold_pos=(size - 1, size - 1),
+        shrubberies=size * 2,
+    )
+
+
+def _college(eng: Engine, size: int) -> None:
+    college.install(eng, dorms=size)
+
+
+def _sickle(eng: Engine, size: int) -> None:
+    sickle.install(eng, n_creatures=size, n_sickles=size * 3 // 5)
+
+
+def _wolfsheep(eng: Engine, size: int) -> None:
+    wolfsheep.install(
+        eng, map_size=(size, size), wolves=size * 2 // 5, sheep=size, seed=0
+    )
+
+
+def _pathfind(eng: Engine, size: int) -> None:
+    pathfind.install(eng, seed=0, size=size)
+
+
+def _polygons(eng: Engine, size: int) -> None:
+    polygons.install(eng, size=size, polys=size * 3 // 2)
+
+
+SCENARIOS: Dict[str, Tuple[Callable[[Engine, int], None], int]] = {
+    "kobold": (_kobold, 10),  # width of the map
+    "college": (_college, 3),  # number of dorms
+    "sickle": (_sickle, 5),  # number of creatures
+    "wolfsheep": (_wolfsheep, 25),  # width of the map
+    "pathfind": (_pathfind, 100),  # width of the map
+    "polygons": (_polygons, 20),  # width of the map
+}
+"""Install function and default size for each scenario"""
+
+METRICS: Dict[str, bool] = {
+    "install_seconds": False,
+    "turns_per_second": True,
+    "time_travel_mean_seconds": False,
+    "time_travel_max_seconds": False,
+    "cold_start_seconds": False,
+    "peak_rss_bytes": False,
+    "db_bytes_per_turn": False,
+}
+"""Whether a greater value is better, for each metric we record"""
+
+
+def peak_rss() -> Optional[int]:
+    """Return the most memory this process has used, in bytes
+
+    ``None`` on platforms without the :mod:`resource` module.
+
+    """
+    try:
+        from resource import RUSAGE_SELF, getrusage
+    except ImportError:
+        return None
+    rss = getrusage(RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return rss
+    return rss * 1024
+
+
+def run_scenario(
+    name: str, size: int = None, turns: int = 10, *, workers: int = None
+) -> dict:
+    """Measure one scenario, in this process
+
+    Metrics that can't be measured here, like ``peak_rss_bytes`` on
+    platforms without the :mod:`resource` module, are ``None``.
+
+    """
+    install, default_size = SCENARIOS[name]
+    if size is None:
+        size = default_size
+    with TemporaryDirectory() as prefix:
+        db = os.path.join(prefix, "world.db")
+        with Engine(prefix, random_seed=69105, workers=workers) as eng:
+            start = monotonic()
+            with redirect_stdout(sys.stderr):
+                install(eng, size)
+            install_seconds = monotonic() - start
+            eng.commit()
+            db_start = os.path.getsize(db)
+            start = monotonic()
+            for _ in range(turns):
+                eng.next_turn()
+            sim_seconds = monotonic() - start
+            eng.commit()
+            db_end = os.path.getsize(db)
+            destinations = list(range(turns + 1))
+            Random(69105).shuffle(destinations)
+            latencies = []
+            for turn in destinations:
+                start = monotonic()
+                eng.turn = turn
+                latencies.append(monotonic() - start)
+        start = monotonic()
+        with Engine(prefix, workers=workers):
+            cold_start_seconds = monotonic() - start
+    return {
+        "size": size,
+        "turns": turns,
+        "install_seconds": install_seconds,
+        "turns_per_second": turns / sim_seconds if sim_seconds else None,
+        "time_travel_mean_seconds": sum(latencies) / len(latencies),
+        "time_travel_max_seconds": max(latencies),
+        "cold_start_seconds": cold_start_seconds,
+        "peak_rss_bytes": peak_rss(),
+        "db_bytes_per_turn": (db_end - db_start) / turns if turns else None,
+    }
+
+
+def run(
+    names: Iterable[str] = None,
+    sizes: Dict[str, int] = None,
+    turns: int = 10,
+    *,
+    workers: int = None,
+) -> dict:
+    """Measure the named scenarios, or all of them
+
+    Each runs in a fresh process, so that its memory use is its own.
+
+    """
+    if names is None:
+        names = SCENARIOS.keys()
+    sizes = sizes or {}
+    results = {}
+    for name in names:
+        if name not in SCENARIOS:
+            raise KeyError(f"No such scenario: {name}")
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            results[name] = pool.submit(
+                run_scenario, name, sizes.get(name), turns, workers=workers
+            ).result()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.1) -> List[str]:
+    """Describe every metric that got worse than the baseline
+
+    Only scenarios run at the same size, for the same number of turns,
+    get compared. Metrics may be off by the ``tolerance``, as a
+    proportion of the baseline, before they count. Metrics that either
+    run couldn't measure, being ``None`` or absent, are skipped.
+
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or (base["size"], base["turns"]) != (
+            result["size"],
+            result["turns"],
+        ):
+            continue
+        for metric, greater_is_better in METRICS.items():
+            now, then = result.get(metric), base.get(metric)
+            if now is None or then is None:
+                continue
+            if greater_is_better:
+                worse = now < then * (1 - tolerance)
+            else:
+                worse = now > then * (1 + tolerance)
+            if worse:
+                regressions.append(f"{name}: {metric} went from {then:g} to {now:g}")
+    return regressions
@@ -0,0 +1,62 @@
+# This file is part of LiSE, a framework for life simulation games.
+# Copyright (c) Zachary Spector, public@zacharyspector.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Run the benchmarks in :mod:`LiSE.bench` and report the results as JSON"""
+
+import json
+import sys
+from argparse import ArgumentParser
+
+from . import SCENARIOS, compare, run
+
+parser = ArgumentParser(prog="python3 -m LiSE.bench")
+parser.add_argument(
+    "scenarios", nargs="*", help="any of: " + ", ".join(SCENARIOS.keys())
+)
+parser.add_argument("--turns", action="store", type=int, default=10)
+parser.add_argument(
+    "--size",
+    action="append",
+    default=[],
+    metavar="SCENARIO=SIZE",
+    help="override the size of a scenario",
+)
+parser.add_argument("--workers", action="store", type=int, default=None)
+parser.add_argument("--output", action="store", help="write results here")
+parser.add_argument("--baseline", action="store", help="results to compare with")
+parser.add_argument("--tolerance", action="store", type=float, default=0.1)
+args = parser.parse_args()
+for scenario in args.scenarios:
+    if scenario not in SCENARIOS:
+        parser.error(f"no such scenario: {scenario}")
+sizes = {}
+for size in args.size:
+    scenario, _, n = size.partition("=")
+    if scenario not in SCENARIOS or not n.isdigit():
+        parser.error(f"can't parse size: {size}")
+    sizes[scenario] = int(n)
+results = run(args.scenarios or None, sizes, args.turns, workers=args.workers)
+if args.output:
+    with open(args.output, "w") as outf:
+        json.dump(results, outf, indent=2)
+else:
+    json.dump(results, sys.stdout, indent=2)
+    print()
+if args.baseline:
+    with open(args.baseline) as inf:
+        regressions = compare(results, json.load(inf), args.tolerance)
+    for regression in regressions:
+        print(regression, file=sys.stderr)
+    if regressions:
+        sys.exit(1)
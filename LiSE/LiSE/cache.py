@@ -12,20 +12,22 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
-from collections import OrderedDict
+from array import array
+from collections import defaultdict
 from functools import partial
 from operator import itemgetter, or_, sub
-from typing import Tuple
+from sys import getsizeof
+from typing import Dict, Set, Tuple
 
 from .allegedb import Key
 from .allegedb.cache import (
     Cache,
     EntitylessCache,
+    HintCache,
     KeyframeError,
-    StructuredDefaultDict,
     WindowDict,
+    estimate_size,
 )
-from .allegedb.window import SettingsTurnDict
 from .util import sort_set
 
 
@@ -230,12 +232,47 @@ class UnitnessCache(Cache):
         return self.iter_entities(char, branch, turn, tick)
 
 
+class HandledJournal:
+    """The rules handled in one rulebook during one turn
+
+    Each entity's handled rules are the bits of one integer, rather than
+    a set. The order they were handled in is kept in arrays of entity IDs,
+    rule IDs, and ticks.
+
+    """
+
+    __slots__ = ("rules", "rule_ids", "masks", "entity_log", "rule_log", "tick_log")
+
+    def __init__(self):
+        self.rules = []
+        self.rule_ids = {}
+        self.masks = {}
+        self.entity_log = array("L")
+        self.rule_log = array("H")
+        self.tick_log = array("q")
+
+    def add(self, entity_id: int, rule: Key, tick: int) -> None:
+        if rule in self.rule_ids:
+            rule_id = self.rule_ids[rule]
+        else:
+            rule_id = self.rule_ids[rule] = len(self.rules)
+            self.rules.append(rule)
+        self.masks[entity_id] = self.masks.get(entity_id, 0) | (1 << rule_id)
+        self.entity_log.append(entity_id)
+        self.rule_log.append(rule_id)
+        self.tick_log.append(tick)
+
+    def rules_in(self, mask: int) -> frozenset:
+        rules = self.rules
+        return frozenset(rules[i] for i in range(mask.bit_length()) if mask >> i & 1)
+
+
 class RulesHandledCache(object):
     def __init__(self, engine):
         self.engine = engine
-        self.handled = {}
-        self.handled_deep = StructuredDefaultDict(1, type=WindowDict)
-        self.unhandled = {}
+        self.journals = {}
+        self._entity_ids = {}
+        self._entities = []
 
     def get_rulebook(self, *args):
         raise NotImplementedError
@@ -246,25 +283,76 @@ class RulesHandledCache(object):
     def store(self, *args, loading=False):
         entity = args[:-5]
         rulebook, rule, branch, turn, tick = args[-5:]
-        self.handled.setdefault(entity + (rulebook, branch, turn), set()).add(rule)
-        self.handled_deep[branch][turn][tick] = (entity, rulebook, rule)
-        unhandl = (
-            self.unhandled.setdefault(entity, {})
-            .setdefault(rulebook, {})
-            .setdefault(branch, {})
-        )
-        if turn not in unhandl:
-            unhandl[turn] = list(self.iter_unhandled_rules(branch, turn, tick))
-        try:
-            unhandl[turn].remove(rule)
-        except ValueError:
-            pass
+        if entity in self._entity_ids:
+            entity_id = self._entity_ids[entity]
+        else:
+            entity_id = self._entity_ids[entity] = len(self._entities)
+            self._entities.append(entity)
+        journals = self.journals.setdefault((branch, turn), {})
+        if rulebook in journals:
+            journal = journals[rulebook]
+        else:
+            journal = journals[rulebook] = HandledJournal()
+        journal.add(entity_id, rule, tick)
 
     def retrieve(self, *args):
-        return self.handled[args]
+        entity = args[:-3]
+        rulebook, branch, turn = args[-3:]
+        try:
+            journal = self.journals[branch, turn][rulebook]
+            return journal.rules_in(journal.masks[self._entity_ids[entity]])
+        except KeyError:
+            raise KeyError("No rules handled", args)
 
     def get_handled_rules(self, entity, rulebook, branch, turn):
-        return self.handled.setdefault(entity + (rulebook, branch, turn), set())
+        journal = self.journals.get((branch, turn), {}).get(rulebook)
+        if journal is None or entity not in self._entity_ids:
+            return frozenset()
+        mask = journal.masks.get(self._entity_ids[entity])
+        if mask is None:
+            return frozenset()
+        return journal.rules_in(mask)
+
+    def memory_usage(self, sample: int = 64) -> Dict[str, Tuple[int, int]]:
+        """Estimate the entries and bytes in each of my structures
+
+        Every rule handled is an entry in ``journals``.
+
+        """
+        entries = 0
+        size = getsizeof(self.journals)
+        for journals in self.journals.values():
+            size += getsizeof(journals)
+            for journal in journals.values():
+                entries += len(journal.entity_log)
+                size += getsizeof(journal) + sum(
+                    getsizeof(getattr(journal, slot)) for slot in journal.__slots__
+                )
+        ids_entries, ids_size = estimate_size(self._entity_ids, sample)
+        return {
+            "journals": (entries, size),
+            "entities": (ids_entries, ids_size + getsizeof(self._entities)),
+        }
+
+    def handled_turn(self, branch, turn) -> WindowDict:
+        """Return a :class:`WindowDict` of what rule was handled at each tick
+
+        Its values are tuples of ``(entity, rulebook, rule)``.
+
+        """
+        entities = self._entities
+        handled = []
+        for rulebook, journal in self.journals.get((branch, turn), {}).items():
+            rules = journal.rules
+            for entity_id, rule_id, tick in zip(
+                journal.entity_log, journal.rule_log, journal.tick_log
+            ):
+                handled.append((tick, (entities[entity_id], rulebook, rules[rule_id])))
+        handled.sort(key=itemgetter(0))
+        ret = WindowDict()
+        for tick, entity_rulebook_rule in handled:
+            ret[tick] = entity_rulebook_rule
+        return ret
 
 
 class CharacterRulesHandledCache(RulesHandledCache):
@@ -517,104 +605,117 @@ class ThingsCache(Cache):
     def __init__(self, db):
         Cache.__init__(self, db)
         self._make_node = db.thing_cls
+        self.visitors: Dict[Tuple[Key, Key], Set[Key]] = {}
+        """Things that have been located in a node, at any time
+
+        Keyed by the character and the node. Only
+        :class:`NodeContentsCache` should need this.
+
+        """
+        self.visited: Dict[Tuple[Key, Key], Set[Key]] = {}
+        """Nodes that a thing has been located in, at any time
+
+        Keyed by the character and the thing. The reverse of
+        :attr:`visitors`.
+
+        """
+        self._revisit_due = False
+
+    def _visit(self, character: Key, thing: Key, location: Key) -> None:
+        if (character, location) in self.visitors:
+            self.visitors[character, location].add(thing)
+        else:
+            self.visitors[character, location] = {thing}
+        if (character, thing) in self.visited:
+            self.visited[character, thing].add(location)
+        else:
+            self.visited[character, thing] = {location}
+
+    def _revisit(self) -> None:
+        """Recompute ``visitors`` and ``visited`` from what I still have
+
+        Done lazily, because history is truncated one cache at a time,
+        and keyframes after that.
+
+        """
+        self._revisit_due = False
+        self.visitors = {}
+        self.visited = {}
+        for (character,), things in self.keys.items():
+            for thing, branches in things.items():
+                for turns in branches.values():
+                    for ticks in turns.values():
+                        for location in ticks.values():
+                            if location is not None:
+                                self._visit(character, thing, location)
+        for (character,), branches in self.keyframe.items():
+            for turns in branches.values():
+                for ticks in turns.values():
+                    for keyframe in ticks.values():
+                        for thing, location in keyframe.items():
+                            if location is not None:
+                                self._visit(character, thing, location)
+
+    def _forget_contents(
+        self, character: Key, thing: Key, branch: str, turn: int, tick: int
+    ) -> None:
+        """Throw out remembered contents of nodes ``thing`` has been in
+
+        Only those from ``(turn, tick)`` on, in ``branch``. Other
+        branches' are all thrown out.
+
+        """
+        remembered = self.db._node_contents_cache.shallowest
+        for location in self.visited.get((character, thing), ()):
+            remembered.forget_place(character, location, branch, turn, tick)
 
     def store(self, *args, planning=None, loading=False, contra=None):
         character, thing, branch, turn, tick, location = args
         with self._lock:
-            try:
-                oldloc = self.retrieve(character, thing, branch, turn, tick)
-            except KeyError:
-                oldloc = None
             super().store(*args, planning=planning, loading=loading, contra=contra)
-            node_contents_cache = self.db._node_contents_cache
-            this = frozenset((thing,))
-            # Cache the contents of nodes
-            if oldloc is not None:
-                try:
-                    oldconts_orig = node_contents_cache.retrieve(
-                        character, oldloc, branch, turn, tick
-                    )
-                except KeyError:
-                    oldconts_orig = frozenset()
-                newconts_orig = oldconts_orig.difference(this)
-                node_contents_cache.store(
-                    character,
-                    oldloc,
-                    branch,
-                    turn,
-                    tick,
-                    newconts_orig,
-                    contra=False,
-                    loading=True,
-                )
-                todo = []
-                # update any future contents caches pertaining to the old location
-                if (character, oldloc) in node_contents_cache.loc_settings:
-                    locset = node_contents_cache.loc_settings[character, oldloc][branch]
-                    if turn in locset:
-                        for future_tick in locset[turn].future(tick):
-                            todo.append((turn, future_tick))
-                    for future_turn, future_ticks in locset.future(turn).items():
-                        for future_tick in future_ticks:
-                            todo.append((future_turn, future_tick))
-                for trn, tck in todo:
-                    node_contents_cache.store(
-                        character,
-                        oldloc,
-                        branch,
-                        trn,
-                        tck,
-                        node_contents_cache.retrieve(
-                            character, oldloc, branch, trn, tck, search=True
-                        ).difference(this),
-                        planning=False,
-                        contra=False,
-                        loading=True,
-                    )
             if location is not None:
-                todo = []
-                try:
-                    oldconts_dest = node_contents_cache.retrieve(
-                        character, location, branch, turn, tick
-                    )
-                except KeyError:
-                    oldconts_dest = frozenset()
-                newconts_dest = oldconts_dest.union(this)
-                node_contents_cache.store(
-                    character,
-                    location,
-                    branch,
-                    turn,
-                    tick,
-                    newconts_dest,
-                    contra=False,
-                    loading=True,
-                )
-                # and the new location
-                if (character, location) in node_contents_cache.loc_settings:
-                    locset = node_contents_cache.loc_settings[character, location][
-                        branch
-                    ]
-                    if turn in locset:
-                        for future_tick in locset[turn].future(tick):
-                            todo.append((turn, future_tick))
-                    for future_turn, future_ticks in locset.future(turn).items():
-                        for future_tick in future_ticks:
-                            todo.append((future_turn, future_tick))
-                for trn, tck in todo:
-                    node_contents_cache.store(
-                        character,
-                        location,
-                        branch,
-                        trn,
-                        tck,
-                        node_contents_cache.retrieve(
-                            character, location, branch, trn, tck, search=True
-                        ).union(this),
-                        planning=False,
-                        contra=False,
-                        loading=True,
-                    )
+                self._visit(character, thing, location)
+            self._forget_contents(character, thing, branch, turn, tick)
+
+    def set_keyframe(
+        self, graph_ent: tuple, branch: str, turn: int, tick: int, keyframe
+    ):
+        super().set_keyframe(graph_ent, branch, turn, tick, keyframe)
+        (character,) = graph_ent
+        with self._lock:
+            for thing, location in keyframe.items():
+                if location is not None:
+                    self._visit(character, thing, location)
+            self.db._node_contents_cache.shallowest.forget_graph(character)
+
+    def remove(self, branch: str, turn: int, tick: int):
+        with self._lock:
+            _, character, thing = self.time_entity[branch, turn, tick]
+            super().remove(branch, turn, tick)
+            self._forget_contents(character, thing, branch, turn, tick)
+
+    def truncate(self, branch: str, turn: int, tick: int, direction="forward"):
+        with self._lock:
+            super().truncate(branch, turn, tick, direction)
+            self._revisit_due = True
+            self.db._node_contents_cache.shallowest.clear()
+
+    def remove_branch(self, branch: str):
+        with self._lock:
+            super().remove_branch(branch)
+            self._revisit_due = True
+            self.db._node_contents_cache.shallowest.clear()
+
+    def remove_character(self, character):
+        with self._lock:
+            super().remove_character(character)
+            for char, location in list(self.visitors):
+                if char == character:
+                    del self.visitors[char, location]
+            for char, thing in list(self.visited):
+                if char == character:
+                    del self.visited[char, thing]
+            self.db._node_contents_cache.shallowest.forget_graph(character)
 
     def turn_before(self, character, thing, branch, turn):
         with self._lock:
@@ -633,122 +734,103 @@ class ThingsCache(Cache):
             return self.keys[(character,)][thing][branch].rev_after(turn)
 
 
+class NodeContentsHintCache(HintCache):
+    """:class:`HintCache` that can forget the contents of one node"""
+
+    __slots__ = ("_by_place",)
+
+    def __init__(self, maxsize: int = 16384):
+        super().__init__(maxsize)
+        self._by_place = defaultdict(set)
+
+    def _index(self, key: tuple) -> None:
+        super()._index(key)
+        self._by_place[key[:2]].add(key)
+
+    def _unindex(self, key: tuple) -> None:
+        super()._unindex(key)
+        keys = self._by_place[key[:2]]
+        keys.discard(key)
+        if not keys:
+            del self._by_place[key[:2]]
+
+    def _clear_indices(self) -> None:
+        super()._clear_indices()
+        self._by_place.clear()
+
+    def forget_place(
+        self, character: Key, place: Key, branch: str, turn: int, tick: int
+    ) -> None:
+        """Forget the contents of ``place`` in ``character`` from a time on
+
+        What's remembered for earlier in ``branch`` is kept. Other
+        branches may have started from ``branch`` later, so everything
+        remembered for them goes.
+
+        """
+        time = (turn, tick)
+        with self._lock:
+            for key in list(self._by_place.get((character, place), ())):
+                if key[2] != branch or key[3:] >= time:
+                    self._delitem(key)
+
+
 class NodeContentsCache(Cache):
+    """What things are in each node, at any time
+
+    Only keyframes get stored here. Otherwise, contents are worked out
+    from :class:`ThingsCache`: each thing that has been in the node, in
+    the history still loaded, is in it now if the things cache says
+    that's where it is now. So moving a thing costs the same no matter
+    how crowded the node is, or how far ahead it's been planned.
+
+    This is not an index of when each thing was where. Working out
+    the contents takes one location lookup for every thing that has
+    ever visited the node, so a node that many things have passed
+    through is slow to look in. Answers are remembered in
+    ``shallowest``; moving a thing forgets only those for the nodes
+    it's been in, from the time of the move on.
+
+    """
+
     name = "node_contents_cache"
 
     def __init__(self, db, kfkvs=None):
         super().__init__(db, kfkvs)
-        self.loc_settings = StructuredDefaultDict(1, SettingsTurnDict)
+        self.shallowest = NodeContentsHintCache(db.hint_cache_size)
 
-    def store(
+    def retrieve(
         self,
         character: Key,
         place: Key,
         branch: str,
         turn: int,
         tick: int,
-        contents: frozenset,
-        planning: bool = None,
-        forward: bool = None,
-        loading=False,
-        contra: bool = None,
-    ):
-        self.loc_settings[character, place][branch].store_at(turn, tick, contents)
-
-        return super().store(
-            character,
-            place,
-            branch,
-            turn,
-            tick,
-            contents,
-            planning=planning,
-            forward=forward,
-            loading=loading,
-            contra=contra,
-        )
-
-    def _iter_future_contradictions(
-        self, entity, key, turns, branch, turn, tick, value
-    ):
-        return self.db._things_cache._iter_future_contradictions(
-            entity, key, turns, branch, turn, tick, value
-        )
-
-    def remove(self, branch, turn, tick):
-        """Delete data on or after this tick
-
-        On the assumption that the future has been invalidated.
-
-        """
-        with self._lock:
-            assert not self.parents  # not how stuff is stored in this cache
-            for branchkey, branches in list(self.branches.items()):
-                if branch in branches:
-                    branhc = branches[branch]
-                    if turn in branhc:
-                        trun = branhc[turn]
-                        if tick in trun:
-                            del trun[tick]
-                        trun.truncate(tick)
-                        if not trun:
-                            del branhc[turn]
-                    branhc.truncate(turn)
-                    if not branhc:
-                        del branches[branch]
-                if not branches:
-                    del self.branches[branchkey]
-            for keykey, keys in list(self.keys.items()):
-                for key, branchs in list(keys.items()):
-                    if branch in branchs:
-                        branhc = branchs[branch]
-                        if turn in branhc:
-                            trun = branhc[turn]
-                            if tick in trun:
-                                del trun[tick]
-                            trun.truncate(tick)
-                            if not trun:
-                                del branhc[turn]
-                        branhc.truncate(turn)
-                        if not branhc:
-                            del branchs[branch]
-                    if not branchs:
-                        del keys[key]
-                if not keys:
-                    del self.keys[keykey]
-            sets = self.settings[branch]
-            if turn in sets:
-                setsturn = sets[turn]
-                if tick in setsturn:
-                    del setsturn[tick]
-                setsturn.truncate(tick)
-                if not setsturn:
-                    del sets[turn]
-            sets.truncate(turn)
-            if not sets:
-                del self.settings[branch]
-            presets = self.presettings[branch]
-            if turn in presets:
-                presetsturn = presets[turn]
-                if tick in presetsturn:
-                    del presetsturn[tick]
-                presetsturn.truncate(tick)
-                if not presetsturn:
-                    del presets[turn]
-            presets.truncate(turn)
-            if not presets:
-                del self.presettings[branch]
-            for entity, brnch in list(self.keycache):
-                if brnch == branch:
-                    kc = self.keycache[entity, brnch]
-                    if turn in kc:
-                        kcturn = kc[turn]
-                        if tick in kcturn:
-                            del kcturn[tick]
-                        kcturn.truncate(tick)
-                        if not kcturn:
-                            del kc[turn]
-                    kc.truncate(turn)
-                    if not kc:
-                        del self.keycache[entity, brnch]
-            self.shallowest = OrderedDict()
+        search: bool = False,
+    ) -> frozenset:
+        things_cache = self.db._things_cache
+        remembered = self.shallowest
+        args = (character, place, branch, turn, tick)
+        with things_cache._lock:
+            ret = remembered.lookup(args)
+            if ret is not None:
+                return ret
+            if things_cache._revisit_due:
+                things_cache._revisit()
+            visitors = things_cache.visitors.get((character, place))
+            if not visitors:
+                return frozenset()
+            # The things cache's hints may predate a move that didn't
+            # contradict any plans, so don't trust them here
+            retrieve = partial(
+                things_cache._base_retrieve,
+                store_hint=False,
+                retrieve_hint=False,
+                search=search,
+            )
+            ret = remembered[args] = frozenset(
+                thing
+                for thing in visitors
+                if retrieve((character, thing, branch, turn, tick)) == place
+            )
+            return ret
@@ -34,6 +34,8 @@ and their node in the physical world is a unit of it.
 
 from abc import ABC, abstractmethod
 from collections.abc import Mapping, MutableMapping
+from contextlib import contextmanager
+from copy import deepcopy
 from itertools import chain
 from types import MethodType
 from typing import Type
@@ -41,6 +43,7 @@ from typing import Type
 import networkx as nx
 from blinker import Signal
 
+from .adjacency import Adjacency, AdjacencySnapshot
 from .allegedb.cache import FuturistWindowDict, PickyDefaultDict
 from .allegedb.graph import (
     DiGraph,
@@ -51,11 +54,13 @@ from .allegedb.graph import (
 from .allegedb.wrap import MutableMappingUnwrapper
 from .exc import WorldIntegrityError
 from .node import Node, Place, Thing
+from .pathfinding import PathFinder
 from .portal import Portal
 from .query import StatusAlias
 from .rule import RuleFollower as BaseRuleFollower
 from .rule import RuleMapping
 from .util import AbstractCharacter, AbstractEngine, getatt, singleton_get, timer
+from .view import CharacterView, View
 from .xcollections import CompositeDict
 
 
@@ -157,29 +162,54 @@ class RuleFollower(BaseRuleFollower):
         )
 
 
+_MUTABLE = (dict, list, set)
+
+
 class FacadeEntity(MutableMapping, Signal, ABC):
+    """Copy-on-write view of an entity, for use in a :class:`Facade`
+
+    Reads fall through to the real entity, at the time the facade was
+    made. Changes go in a patch, with ``None`` for deleted keys, and
+    mutable values are copied into the patch when they're read, so that
+    changing them doesn't change the real entity.
+
+    """
+
     exists = True
+    _fixed_keys = ()
 
-    def __init__(self, mapping, _=None, **kwargs):
+    def __init__(self, mapping, real=None, patch=None):
         super().__init__()
         self.facade = self.character = mapping.facade
-        self._real = mapping
-        self._patch = {
-            k: v.unwrap() if hasattr(v, "unwrap") else v for (k, v) in kwargs.items()
-        }
+        self._real = {} if real is None else real
+        self._patch = {}
+        if patch:
+            for k, v in patch.items():
+                self._patch[k] = v.unwrap() if hasattr(v, "unwrap") else v
+
+    def _get_fixed(self, k):
+        raise KeyError(k)
 
     def __contains__(self, item):
+        if item in self._fixed_keys:
+            return True
         patch = self._patch
-        return item in self._real or (item in patch and patch[item] is not None)
+        if item in patch:
+            return patch[item] is not None
+        with self.facade._reading():
+            return item in self._real
 
     def __iter__(self):
-        seen = set()
-        for k in self._real:
-            if k not in self._patch:
+        fixed = self._fixed_keys
+        yield from fixed
+        patch = self._patch
+        with self.facade._reading():
+            real_keys = list(self._real)
+        for k in real_keys:
+            if k not in patch and k not in fixed:
                 yield k
-                seen.add(k)
-        for k in self._patch:
-            if self._patch[k] is not None and k not in seen:
+        for k, v in list(patch.items()):
+            if v is not None:
                 yield k
 
     def __len__(self):
@@ -189,21 +219,26 @@ class FacadeEntity(MutableMapping, Signal, ABC):
         return n
 
     def __getitem__(self, k):
-        if k in self._patch:
-            if self._patch[k] is None:
+        if k in self._fixed_keys:
+            return self._get_fixed(k)
+        patch = self._patch
+        if k in patch:
+            if patch[k] is None:
                 raise KeyError("{} has been masked.".format(k))
-            return self._patch[k]
-        ret = self._real[k]
+            return patch[k]
+        with self.facade._reading():
+            ret = self._real[k]
         if hasattr(ret, "unwrap"):  # a wrapped mutable object from the
             # allegedb.wrap module
-            ret = ret.unwrap()
-            self._patch[k] = ret  # changes will be reflected in the
+            ret = patch[k] = ret.unwrap()  # changes will be reflected in the
         # facade but not the original
+        elif isinstance(ret, _MUTABLE):  # views give the cached object itself
+            ret = patch[k] = deepcopy(ret)
         return ret
 
     def __setitem__(self, k, v):
-        if k == "name":
-            raise KeyError("Can't change names")
+        if k in self._fixed_keys:
+            raise KeyError("Can't change {}".format(k))
         if hasattr(v, "unwrap"):
             v = v.unwrap()
         self._patch[k] = v
@@ -213,13 +248,22 @@ class FacadeEntity(MutableMapping, Signal, ABC):
 
 
 class FacadeNode(FacadeEntity, ABC):
+    _fixed_keys = ("name",)
+
+    def __init__(self, mapping, name, real=None, patch=None):
+        super().__init__(mapping, real, patch)
+        self._name = name
+
+    def _get_fixed(self, k):
+        return self._name
+
     @property
     def name(self):
-        return self["name"]
+        return self._name
 
     @property
     def portal(self):
-        return self.facade.portal[self["name"]]
+        return self.facade.portal[self._name]
 
     def contents(self):
         for thing in self.facade.thing.values():
@@ -231,13 +275,6 @@ class FacadeNode(FacadeEntity, ABC):
 class FacadePlace(FacadeNode):
     """Lightweight analogue of Place for Facade use."""
 
-    def __init__(self, mapping, real_or_name, **kwargs):
-        super().__init__(mapping, real_or_name, **kwargs)
-        if isinstance(real_or_name, (Place, FacadePlace)):
-            self._real = real_or_name
-        else:
-            self._real = {"name": real_or_name}
-
     def add_thing(self, name):
         self.facade.add_thing(name, self.name)
 
@@ -246,22 +283,15 @@ class FacadePlace(FacadeNode):
 
 
 class FacadeThing(FacadeNode):
-    def __init__(self, mapping, real_or_name, **kwargs):
-        location = kwargs.pop("location", None)
-        super().__init__(mapping, real_or_name, **kwargs)
-        if location is None and not (
-            isinstance(real_or_name, Thing) or isinstance(real_or_name, FacadeThing)
-        ):
+    def __init__(self, mapping, name, real=None, patch=None):
+        super().__init__(mapping, name, real, patch)
+        try:
+            self["location"]
+        except KeyError:
             raise TypeError(
                 "FacadeThing needs to wrap a real Thing or another "
                 "FacadeThing, or have a location of its own."
             )
-        self._real = {
-            "name": (
-                real_or_name.name if hasattr(real_or_name, "name") else real_or_name
-            ),
-            "location": location,
-        }
 
     @property
     def location(self):
@@ -279,18 +309,10 @@ class FacadeThing(FacadeNode):
 class FacadePortal(FacadeEntity):
     """Lightweight analogue of Portal for Facade use."""
 
-    def __init__(self, mapping, other, **kwargs):
-        super().__init__(mapping, other, **kwargs)
-        if hasattr(mapping, "orig"):
-            self.orig = mapping.orig
-            self.dest = other
-        else:
-            self.dest = mapping.dest
-            self.orig = other
-        try:
-            self._real = self.facade.character.portal[self.orig][self.dest]
-        except (KeyError, AttributeError):
-            self._real = {}
+    def __init__(self, mapping, dest, real=None, patch=None):
+        super().__init__(mapping, real, patch)
+        self.orig = mapping.orig
+        self.dest = dest
 
     def __getitem__(self, item):
         if item == "origin":
@@ -319,6 +341,9 @@ class FacadeEntityMapping(MutableMappingUnwrapper, Signal, ABC):
     All the entities are of the same type, ``facadecls``, possibly
     being distorted views of entities of the type ``innercls``.
 
+    Looking up an entity that hasn't been changed in the facade gets a
+    view of the real one, which only copies what gets changed.
+
     """
 
     facadecls: Type[FacadeEntity]
@@ -332,7 +357,10 @@ class FacadeEntityMapping(MutableMappingUnwrapper, Signal, ABC):
         for badkey in ("character", "engine", "name"):
             if badkey in kwargs:
                 del kwargs[badkey]
-        return self.facadecls(self, k, **kwargs)
+        return self.facadecls(self, k, patch=kwargs)
+
+    def _view(self, k, real):
+        return self.facadecls(self, k, real)
 
     engine = getatt("facade.engine")
 
@@ -345,16 +373,18 @@ class FacadeEntityMapping(MutableMappingUnwrapper, Signal, ABC):
     def __contains__(self, k):
         if k in self._patch:
             return self._patch[k] is not None
-        return k in self._get_inner_map()
+        with self.facade._reading():
+            return k in self._get_inner_map()
 
     def __iter__(self):
-        seen = set()
-        for k in self._patch:
-            if k not in seen and self._patch[k] is not None:
+        patch = self._patch
+        for k, v in list(patch.items()):
+            if v is not None:
                 yield k
-            seen.add(k)
-        for k in self._get_inner_map():
-            if k not in seen:
+        with self.facade._reading():
+            inner = list(self._get_inner_map())
+        for k in inner:
+            if k not in patch:
                 yield k
 
     def __len__(self):
@@ -364,15 +394,20 @@ class FacadeEntityMapping(MutableMappingUnwrapper, Signal, ABC):
         return n
 
     def __getitem__(self, k):
-        if k not in self:
-            raise KeyError
-        if k not in self._patch:
-            self._patch[k] = self._make(k, self._get_inner_map()[k])
-        ret = self._patch[k]
-        if ret is None:
-            raise KeyError
-        if type(ret) is not self.facadecls:
-            ret = self._patch[k] = self._make(k, ret)
+        patch = self._patch
+        if k in patch:
+            ret = patch[k]
+            if ret is None:
+                raise KeyError("{} has been masked.".format(k))
+            if type(ret) is not self.facadecls:
+                ret = patch[k] = self._make(k, ret)
+            return ret
+        with self.facade._reading():
+            inner = self._get_inner_map()
+            if k not in inner:
+                raise KeyError("{} not present".format(k))
+            real = inner[k]
+        ret = patch[k] = self._view(k, real)
         return ret
 
     def __setitem__(self, k, v):
@@ -396,17 +431,24 @@ class FacadePortalSuccessors(FacadeEntityMapping):
         super().__init__(facade, origname)
         self.orig = origname
 
-    def _make(self, k, v):
-        return self.facadecls(self, k, **v)
-
     def _get_inner_map(self):
         try:
-            return self.facade.character.portal[self.orig]
-        except AttributeError:
+            character = self.facade._source
+            if hasattr(character, "portal"):
+                return character.portal[self.orig]
+            return character.adj[self.orig]
+        except (AttributeError, KeyError):
             return {}
 
 
 class FacadePortalPredecessors(FacadeEntityMapping):
+    """The portals into one node of a Facade
+
+    These are the same :class:`FacadePortal` as in the successors mapping
+    of their origin.
+
+    """
+
     facadecls = FacadePortal
     innercls = Portal
 
@@ -414,15 +456,39 @@ class FacadePortalPredecessors(FacadeEntityMapping):
         super().__init__(facade, destname)
         self.dest = destname
 
-    def _make(self, k, v):
-        return self.facadecls(self.facade.portal[k], v)
-
     def _get_inner_map(self):
         try:
-            return self.facade.character.preportal[self.dest]
-        except AttributeError:
+            character = self.facade._source
+            if hasattr(character, "preportal"):
+                return character.preportal[self.dest]
+            return character.pred[self.dest]
+        except (AttributeError, KeyError):
             return {}
 
+    def __contains__(self, k):
+        portal = self.facade.portal
+        return k in portal and self.dest in portal[k]
+
+    def __iter__(self):
+        seen = set()
+        with self.facade._reading():
+            inner = list(self._get_inner_map())
+        for orig in chain(inner, list(self.facade.portal._patch)):
+            if orig not in seen and orig in self:
+                seen.add(orig)
+                yield orig
+
+    def __getitem__(self, k):
+        if k not in self:
+            raise KeyError("{} not present".format(k))
+        return self.facade.portal[k][self.dest]
+
+    def __setitem__(self, k, v):
+        self.facade.portal[k][self.dest] = v
+
+    def __delitem__(self, k):
+        del self.facade.portal[k][self.dest]
+
 
 class FacadePortalMapping(FacadeEntityMapping, ABC):
     cls: Type[FacadeEntityMapping]
@@ -441,13 +507,23 @@ class FacadePortalMapping(FacadeEntityMapping, ABC):
                 nuret._patch = ret
             else:
                 nuret.update(ret)
-            ret = nuret
+            ret = self._patch[node] = nuret
         return ret
 
 
 class Facade(AbstractCharacter, nx.DiGraph):
+    """A copy-on-write overlay on a character, for hypothetical changes
+
+    Reading a facade reads its character, at the time the facade was
+    made, except where the facade has been changed. Changes to the facade
+    never reach the character, or the database.
+
+    """
+
     engine = getatt("character.engine")
     db = getatt("character.engine")
+    _time = None
+    _source = None
 
     def __getstate__(self):
         ports = {}
@@ -465,7 +541,7 @@ class Facade(AbstractCharacter, nx.DiGraph):
         return things, places, ports, stats
 
     def __setstate__(self, state):
-        self.character = None
+        self.character = self._source = None
         self.graph = self.StatMapping(self)
         (
             self.thing._patch,
@@ -535,10 +611,28 @@ class Facade(AbstractCharacter, nx.DiGraph):
         raise NotImplementedError("Facades don't have units")
 
     def __init__(self, character=None):
-        """Store the character."""
+        """Store the character, and the time, if it has one."""
         super().__init__()
         self.character = character
         self.graph = self.StatMapping(self)
+        if isinstance(character, Character):
+            self._time = character.engine._btt()
+            self._source = CharacterView(
+                View(character.engine, *self._time), character.name
+            )
+        else:
+            self._source = character
+
+    @contextmanager
+    def _reading(self):
+        """Make sure the time I was made is loaded, to read my character"""
+        time = self._time
+        if time is not None:
+            engine = self.character.engine
+            if not engine._time_is_loaded(*time):
+                with engine.world_lock:
+                    engine._load_at(*time)
+        yield
 
     class ThingMapping(FacadeEntityMapping):
         facadecls = FacadeThing
@@ -546,7 +640,7 @@ class Facade(AbstractCharacter, nx.DiGraph):
 
         def _get_inner_map(self):
             try:
-                return self.facade.character.thing
+                return self.facade._source.thing
             except AttributeError:
                 return {}
 
@@ -562,9 +656,12 @@ class Facade(AbstractCharacter, nx.DiGraph):
 
         def _get_inner_map(self):
             try:
-                return self.facade.character._node
+                character = self.facade._source
             except AttributeError:
                 return {}
+            if hasattr(character, "place"):
+                return character.place
+            return getattr(character, "_node", {})
 
         def patch(self, d: dict):
             things = d.keys() & self.facade.thing.keys()
@@ -583,7 +680,7 @@ class Facade(AbstractCharacter, nx.DiGraph):
 
         def _get_inner_map(self):
             try:
-                return self.facade.character._adj
+                return self.facade._source.adj
             except AttributeError:
                 return {}
 
@@ -595,7 +692,7 @@ class Facade(AbstractCharacter, nx.DiGraph):
 
         def _get_inner_map(self):
             try:
-                return self.facade.character.pred
+                return self.facade._source.pred
             except AttributeError:
                 return {}
 
@@ -606,14 +703,15 @@ class Facade(AbstractCharacter, nx.DiGraph):
             self._patch = {}
 
         def __iter__(self):
-            seen = set()
-            if hasattr(self.facade.character, "graph"):
-                for k in self.facade.character.graph:
-                    if k not in self._patch:
+            patch = self._patch
+            if hasattr(self.facade._source, "graph"):
+                with self.facade._reading():
+                    real_keys = list(self.facade._source.graph)
+                for k in real_keys:
+                    if k not in patch:
                         yield k
-                        seen.add(k)
-            for k, v in self._patch.items():
-                if k not in seen and v is not None:
+            for k, v in list(patch.items()):
+                if v is not None:
                     yield k
 
         def __len__(self):
@@ -625,21 +723,23 @@ class Facade(AbstractCharacter, nx.DiGraph):
         def __contains__(self, k):
             if k in self._patch:
                 return self._patch[k] is not None
-            if (
-                hasattr(self.facade.character, "graph")
-                and k in self.facade.character.graph
-            ):
-                return True
+            if hasattr(self.facade._source, "graph"):
+                with self.facade._reading():
+                    return k in self.facade._source.graph
             return False
 
         def __getitem__(self, k):
-            if k not in self._patch and hasattr(self.facade.character, "graph"):
-                ret = self.facade.character.graph[k]
-                if not hasattr(ret, "unwrap"):
+            if k not in self._patch and hasattr(self.facade._source, "graph"):
+                with self.facade._reading():
+                    ret = self.facade._source.graph[k]
+                if hasattr(ret, "unwrap"):
+                    self._patch[k] = ret.unwrap()
+                elif isinstance(ret, _MUTABLE):
+                    self._patch[k] = deepcopy(ret)
+                else:
                     return ret
-                self._patch[k] = ret.unwrap()
             if self._patch[k] is None:
-                return KeyError
+                raise KeyError("{} has been masked.".format(k))
             return self._patch[k]
 
         def __setitem__(self, k, v):
@@ -1559,6 +1659,9 @@ class Character(DiGraph, AbstractCharacter, RuleFollower):
         stuff Characters do to save changes to the database, nor enable
         time travel. This makes it much speedier to work with.
 
+        It's copy-on-write, so making one is cheap: it reads from me, as I
+        was when it was made, until you change it.
+
         """
         return Facade(self)
 
@@ -1765,3 +1868,28 @@ class Character(DiGraph, AbstractCharacter, RuleFollower):
 
         """
         return StatusAlias(entity=self, stat=stat, engine=self.engine)
+
+    def pathfinder(self, weight=None) -> PathFinder:
+        """Get a :class:`LiSE.pathfinding.PathFinder` for this character
+
+        It's kept up to date with my portals, and the ``weight`` stat on
+        them, as time passes.
+
+        """
+        key = (self.name, weight)
+        if key not in self.engine._pathfinders:
+            self.engine._pathfinders[key] = PathFinder(self, weight)
+        return self.engine._pathfinders[key]
+
+    def adjacency_snapshot(self, weight=None) -> AdjacencySnapshot:
+        """Get my portals now, as arrays in compressed sparse row form
+
+        See :class:`LiSE.adjacency.AdjacencySnapshot`. With a ``weight``,
+        it has an array of that stat on each portal, which must be a
+        number; portals without it get 1.
+
+        """
+        key = (self.name, weight)
+        if key not in self.engine._adjacencies:
+            self.engine._adjacencies[key] = Adjacency(self, weight)
+        return self.engine._adjacencies[key].snapshot()
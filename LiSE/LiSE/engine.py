@@ -26,19 +26,36 @@ import sys
 import zlib
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 from concurrent.futures import wait as futwait
 from functools import partial
 from itertools import chain
-from multiprocessing import Pipe, Process, Queue
+from multiprocessing import Pipe, Process, Queue, get_context
 from operator import itemgetter
 from os import PathLike
 from queue import Empty, SimpleQueue
 from random import Random
+from tempfile import TemporaryDirectory
 from threading import Lock, Thread
-from time import sleep
+from time import monotonic
 from types import FunctionType, MethodType, ModuleType
-from typing import Any, Dict, List, Optional, Set, Tuple, Type, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 import msgpack
 import networkx as nx
@@ -64,7 +81,12 @@ from .allegedb import (
     StatDict,
     world_locked,
 )
-from .allegedb.cache import KeyframeError, PickyDefaultDict, StructuredDefaultDict
+from .allegedb.cache import (
+    KeyframeError,
+    PickyDefaultDict,
+    StructuredDefaultDict,
+    recording_reads,
+)
 from .allegedb.window import update_backward_window, update_window
 from .cache import PortalsRulebooksCache
 from .character import Character, Facade
@@ -84,6 +106,7 @@ from .query import (
     _make_side_sel,
 )
 from .util import AbstractEngine, final_rule, normalize_layout, sort_set
+from .view import View
 from .xcollections import FunctionStore, MethodStore, StringStore, UniversalMapping
 
 SlightlyPackedDeltaType = Dict[
@@ -122,6 +145,242 @@ LOCATION: bytes = msgpack.packb("location")
 BRANCH: bytes = msgpack.packb("branch")
 
 
+def _pick_stats(entities: dict, stats: frozenset) -> dict:
+    """Keep only the given stats of each entity, and only entities with some"""
+    ret = {}
+    for name, vals in entities.items():
+        picked = {stat: val for stat, val in vals.items() if stat in stats}
+        if picked:
+            ret[name] = picked
+    return ret
+
+
+class DeltaInterest:
+    """Which parts of a delta some observer wants
+
+    :param characters: names of the characters to include, or ``None``
+        to include them all.
+    :param stats: stat keys to include, for characters, nodes, and portals,
+        or ``None`` to include them all.
+    :param kinds: which parts of a character's delta to include, or ``None``
+        for all of them. Any of ``"nodes"``, ``"node_val"``, ``"edges"``,
+        ``"edge_val"``, ``"units"``, ``"rulebooks"``, or ``"stat"`` for the
+        character's own stats.
+
+    The universal, eternal, rules, and rulebooks parts of a delta are
+    always included.
+
+    :meth:`Engine._get_slow_delta` takes one of these, and doesn't build
+    the parts it doesn't want. Other deltas are built whole, then
+    trimmed with :meth:`filter`.
+
+    """
+
+    kinds = frozenset(
+        ["nodes", "node_val", "edges", "edge_val", "units", "rulebooks", "stat"]
+    )
+    # deltas from comparing keyframes say "rulebook"
+    _global_keys = frozenset(["universal", "eternal", "rules", "rulebooks", "rulebook"])
+
+    def __init__(
+        self,
+        pack: Callable[[Any], bytes],
+        characters: Iterable[Key] = None,
+        stats: Iterable[Key] = None,
+        kinds: Iterable[str] = None,
+    ):
+        if kinds is not None:
+            kinds = frozenset(kinds)
+            if not kinds <= self.kinds:
+                raise ValueError("Unknown kinds of delta", kinds - self.kinds)
+        self.characters = None if characters is None else frozenset(characters)
+        self.stats = None if stats is None else frozenset(stats)
+        self.want = self.kinds if kinds is None else kinds
+        self._packed_characters = (
+            None if characters is None else frozenset(map(pack, self.characters))
+        )
+        self._packed_stats = None if stats is None else frozenset(map(pack, self.stats))
+        self._packed_kinds = {pack(kind): kind for kind in self.kinds - {"stat"}}
+        self._packed_global_keys = frozenset(map(pack, self._global_keys))
+
+    def _filter_char(self, chardelta, kinds, stats):
+        if chardelta is None:
+            return None
+        ret = {}
+        want = self.want
+        for k, v in chardelta.items():
+            kind = kinds.get(k)
+            if kind is None:
+                if "stat" in want and (stats is None or k in stats):
+                    ret[k] = v
+            elif kind in want:
+                if stats is not None and kind == "node_val":
+                    v = _pick_stats(v, stats)
+                elif stats is not None and kind == "edge_val":
+                    picked = {}
+                    for orig, dests in v.items():
+                        if dests := _pick_stats(dests, stats):
+                            picked[orig] = dests
+                    v = picked
+                ret[k] = v
+        return ret
+
+    def wants_character(self, name: Key) -> bool:
+        return self.characters is None or name in self.characters
+
+    def wants_stat(self, key: Key) -> bool:
+        return self.stats is None or key in self.stats
+
+    def wants_character_key(self, key: Key) -> bool:
+        """Whether I want this key of a character's delta"""
+        if key in self.kinds and key != "stat":
+            return key in self.want
+        return "stat" in self.want and self.wants_stat(key)
+
+    def filter(self, delta: DeltaDict) -> DeltaDict:
+        """Return a new delta with only the parts I'm interested in"""
+        characters = self.characters
+        kinds = {kind: kind for kind in self.kinds - {"stat"}}
+        ret = {}
+        for k, v in delta.items():
+            if k in self._global_keys:
+                ret[k] = v
+            elif characters is None or k in characters:
+                ret[k] = self._filter_char(v, kinds, self.stats)
+        return ret
+
+    def filter_packed(self, delta: SlightlyPackedDeltaType) -> SlightlyPackedDeltaType:
+        """Like :meth:`filter`, but for deltas with msgpack-encoded keys"""
+        characters = self._packed_characters
+        ret = {}
+        for k, v in delta.items():
+            if k in self._packed_global_keys:
+                ret[k] = v
+            elif characters is None or k in characters:
+                if v == NONE:
+                    ret[k] = v
+                else:
+                    ret[k] = self._filter_char(
+                        v, self._packed_kinds, self._packed_stats
+                    )
+        return ret
+
+
+class KeyframeScheduler:
+    """Decide when to snap keyframes, from how long loading actually takes
+
+    Keeps a moving average of the seconds it takes to replay one record
+    of history, measured whenever the engine loads history or computes
+    a delta, and says a keyframe is due once the records written since
+    the last keyframe would take longer than ``target`` seconds to
+    replay.
+
+    :param target: the longest replay, in seconds, to allow.
+    :param seconds_per_record: initial guess at the replay cost, used
+        until there are measurements.
+    :param smoothing: weight of each new measurement in the average.
+
+    """
+
+    __slots__ = ("target", "seconds_per_record", "smoothing", "records")
+
+    def __init__(
+        self,
+        target: float,
+        seconds_per_record: float = 1e-5,
+        smoothing: float = 0.2,
+    ):
+        if target <= 0:
+            raise ValueError("Target latency must be positive")
+        self.target = target
+        self.seconds_per_record = seconds_per_record
+        self.smoothing = smoothing
+        self.records = 0
+
+    def observe(self, seconds: float, records: int) -> None:
+        """Note that it took ``seconds`` to replay ``records``"""
+        if records <= 0:
+            return
+        self.seconds_per_record += self.smoothing * (
+            seconds / records - self.seconds_per_record
+        )
+
+    def predicted(self) -> float:
+        """Seconds it would take to replay everything since the last keyframe"""
+        return self.records * self.seconds_per_record
+
+    def due(self) -> bool:
+        return self.predicted() > self.target
+
+
+def _read_value(ret):
+    """Turn a raw cache lookup into something to compare for equality"""
+    if isinstance(ret, Exception):
+        return KeyError
+    return ret
+
+
+def _entity_key(entity) -> tuple:
+    """Identify the Character, node, or Portal that a trigger is about"""
+    if isinstance(entity, Character):
+        return (entity.name,)
+    elif isinstance(entity, Portal):
+        return entity.character.name, entity.orig, entity.dest
+    return entity.character.name, entity.name
+
+
+def _simulate_branch(
+    prefix: str, db: str, branch: str, turns: int, seed: int
+) -> Dict[str, list]:
+    """Simulate ``turns`` turns of a new ``branch`` in a copy of the world
+
+    ``db`` is a snapshot of the world's database. The code and strings
+    get copied from the ``prefix``.
+
+    Returns the rows written for the new branch, keyed by table name.
+
+    """
+    from .alchemy import table
+
+    with TemporaryDirectory() as tmp:
+        for name in ("function", "method", "trigger", "prereq", "action"):
+            fn = os.path.join(prefix, f"{name}.py")
+            if os.path.exists(fn):
+                shutil.copy(fn, tmp)
+        strings = os.path.join(prefix, "strings")
+        if os.path.isdir(strings):
+            shutil.copytree(strings, os.path.join(tmp, "strings"))
+        shutil.copy(db, os.path.join(tmp, "world.db"))
+        eng = Engine(tmp, workers=0, keyframe_on_close=False)
+        try:
+            eng.branch = branch
+            eng._rando.seed(seed)
+            eng.universal["rando_state"] = eng._rando.getstate()
+            for _ in range(turns):
+                eng.next_turn()
+            eng.snap_keyframe(silent=True)
+            eng.commit()
+            rows = {}
+            for name, tab in table.items():
+                if "branch" not in tab.c:
+                    continue
+                i = list(tab.c.keys()).index("branch")
+                rows[name] = [
+                    tuple(row)
+                    for row in eng.query.call_one(name + "_dump")
+                    if row[i] == branch
+                ]
+            plans = {row[0] for row in rows["plans"]}
+            rows["plan_ticks"] = [
+                tuple(row)
+                for row in eng.query.call_one("plan_ticks_dump")
+                if row[0] in plans
+            ]
+        finally:
+            eng.close()
+    return rows
+
+
 class InnerStopIteration(StopIteration):
     pass
 
@@ -316,6 +575,10 @@ class Engine(AbstractEngine, gORM, Executor):
     :param keyframe_interval: How many records to let through before automatically
             snapping a keyframe, default ``1000``. If ``None``, you'll need
             to call ``snap_keyframe`` yourself.
+    :param keyframe_latency: If set, also snap a keyframe whenever loading
+            the history since the last one is predicted to take longer than
+            this many seconds, going by how long loads have taken so far.
+            See :class:`KeyframeScheduler`. Default ``None``.
     :param commit_interval: LiSE will commit changes to disk every
             ``commit_interval`` turns. If ``None`` (the default), only commit
             on close or manual call to ``commit``.
@@ -349,6 +612,13 @@ class Engine(AbstractEngine, gORM, Executor):
             side effects. If you don't want this, instead use
             ``workers=1``, which *does* disable parallelism in the case
             of trigger functions.
+    :param rw_lock: Whether to make ``world_lock`` a reader/writer lock,
+            so that threads reading the caches don't block one another,
+            only the threads that write. Default ``False``. See
+            :class:`LiSE.allegedb.WorldLock` for its contention metrics.
+    :param hint_cache_size: How many recent lookups each cache remembers,
+            to save searching its history again. Default 16384. See
+            :meth:`hint_report` for how often they're useful.
 
     """
 
@@ -365,6 +635,7 @@ class Engine(AbstractEngine, gORM, Executor):
         "rules",
     }
     illegal_node_names = {"nodes", "node_val", "edges", "edge_val", "things"}
+    patch_collections = True
 
     @property
     def eternal(self):
@@ -393,6 +664,7 @@ class Engine(AbstractEngine, gORM, Executor):
         schema_cls: Type[AbstractSchema] = NullSchema,
         flush_interval: int = None,
         keyframe_interval: Optional[int] = 1000,
+        keyframe_latency: Optional[float] = None,
         commit_interval: int = None,
         random_seed: int = None,
         logfun: FunctionType = None,
@@ -402,6 +674,8 @@ class Engine(AbstractEngine, gORM, Executor):
         enforce_end_of_time: bool = True,
         threaded_triggers: bool = None,
         workers: int = None,
+        rw_lock: bool = False,
+        hint_cache_size: int = None,
     ):
         if logfun is None:
             from logging import getLogger
@@ -424,6 +698,9 @@ class Engine(AbstractEngine, gORM, Executor):
             raise FileExistsError("Need a directory")
         self.keep_rules_journal = keep_rules_journal
         self._keyframe_on_close = keyframe_on_close
+        self._keyframe_scheduler = (
+            None if keyframe_latency is None else KeyframeScheduler(keyframe_latency)
+        )
         if string:
             self.string = string
         else:
@@ -455,6 +732,8 @@ class Engine(AbstractEngine, gORM, Executor):
             connect_args=connect_args,
             main_branch=main_branch,
             enforce_end_of_time=enforce_end_of_time,
+            rw_lock=rw_lock,
+            hint_cache_size=hint_cache_size,
         )
         self._things_cache.setdb = self.query.set_thing_loc
         self._universal_cache.setdb = self.query.universal_set
@@ -471,6 +750,13 @@ class Engine(AbstractEngine, gORM, Executor):
         self.query.snap_keyframe = self.snap_keyframe
         self.query.kf_interval_override = self._detect_kf_interval_override
         self.flush_interval = flush_interval
+        self._pure_triggers = set(self.eternal.get("_pure_triggers", ()))
+        self._pure_trigger_memo = {}
+        self._pathfinders = {}
+        self._adjacencies = {}
+        self._pure_trigger_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        if hasattr(self.trigger, "connect"):
+            self.trigger.connect(self._forget_pure_trigger)
         self._rando = Random()
         if "rando_state" in self.universal:
             self._rando.setstate(self.universal["rando_state"])
@@ -532,21 +818,26 @@ class Engine(AbstractEngine, gORM, Executor):
                 with wlk[-1]:
                     inpipe_here.send_bytes(branches_payload)
                     inpipe_here.send_bytes(initial_payload)
-            self._how_many_futs_running = 0
-            self._fut_manager_thread = Thread(target=self._manage_futs, daemon=True)
-            self._futs_to_start: SimpleQueue[Future] = SimpleQueue()
+            self._futs_to_start: SimpleQueue[Optional[Future]] = SimpleQueue()
             self._uid_to_fut: dict[int, Future] = {}
-            self._fut_manager_thread.start()
+            self._worker_busy_time = [0.0] * workers
+            self._worker_tasks_done = [0] * workers
+            self._worker_running: List[Optional[int]] = [None] * workers
+            self._workers_started = monotonic()
+            self._fut_dispatch_threads = [
+                Thread(target=self._dispatch_futs, args=(i,), daemon=True)
+                for i in range(workers)
+            ]
+            for thread in self._fut_dispatch_threads:
+                thread.start()
             self.trigger.connect(self._reimport_trigger_functions)
             self.function.connect(self._reimport_worker_functions)
             self.method.connect(self._reimport_worker_methods)
             self._worker_updated_btts = [self._btt()] * workers
+            self._worker_interests: List[Optional[DeltaInterest]] = [None] * workers
         self._rules_iter = self._follow_rules()
 
-    def _call_in_subprocess(
-        self, uid, method, func_name, future: Future, *args, **kwargs
-    ):
-        i = uid % len(self._worker_inputs)
+    def _call_in_subprocess(self, i, uid, method, func_name, *args, **kwargs):
         argbytes = zlib.compress(self.pack((uid, method, (func_name, *args), kwargs)))
         with self._worker_locks[i]:
             self._update_worker_process_state(i)
@@ -554,17 +845,14 @@ class Engine(AbstractEngine, gORM, Executor):
             output = self._worker_outputs[i].recv_bytes()
         got_uid, result = self.unpack(zlib.decompress(output))
         assert got_uid == uid
-        self._how_many_futs_running -= 1
-        del self._uid_to_fut[uid]
-        if isinstance(result, Exception):
-            future.set_exception(result)
-        else:
-            future.set_result(result)
+        return result
 
     def snap_keyframe(
         self, silent=False, update_worker_processes=True
     ) -> Optional[dict]:
         ret = super().snap_keyframe(silent)
+        if self._keyframe_scheduler is not None:
+            self._keyframe_scheduler.records = 0
         if hasattr(self, "_worker_processes") and update_worker_processes:
             self._update_all_worker_process_states(clobber=True)
         return ret
@@ -584,36 +872,375 @@ class Engine(AbstractEngine, gORM, Executor):
         uid = self._top_uid
         ret = Future()
         ret.uid = uid
-        ret._t = Thread(
-            target=self._call_in_subprocess,
-            args=(uid, method, fn.__name__, ret, *args),
-            kwargs=kwargs,
-        )
+        ret._call = (method, fn.__name__, args, kwargs)
         self._top_uid += 1
         self._uid_to_fut[uid] = ret
         self._futs_to_start.put(ret)
         return ret
 
-    def _manage_futs(self):
-        while True:
-            while self._how_many_futs_running < len(self._worker_processes):
-                try:
-                    fut = self._futs_to_start.get()
-                except Empty:
-                    break
-                if not fut.running() and fut.set_running_or_notify_cancel():
-                    fut._t.start()
-                    self._how_many_futs_running += 1
-            sleep(0.001)
+    def _dispatch_futs(self, i: int) -> None:
+        """Run submitted futures in worker ``i``, whenever it's idle"""
+        get_fut = self._futs_to_start.get
+        while (fut := get_fut()) is not None:
+            if not fut.set_running_or_notify_cancel():
+                self._uid_to_fut.pop(fut.uid, None)
+                continue
+            method, func_name, args, kwargs = fut._call
+            self._worker_running[i] = fut.uid
+            start = monotonic()
+            try:
+                result = self._call_in_subprocess(
+                    i, fut.uid, method, func_name, *args, **kwargs
+                )
+            except Exception as ex:
+                result = ex
+            self._worker_busy_time[i] += monotonic() - start
+            self._worker_tasks_done[i] += 1
+            self._worker_running[i] = None
+            del self._uid_to_fut[fut.uid]
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    def worker_stats(self) -> dict:
+        """Report on how busy the worker processes have been
+
+        Returns a dictionary with the number of submitted tasks not yet
+        started under ``'queue_depth'``, and a list under ``'workers'``
+        with a dictionary for each worker process. Those have the number of
+        ``'tasks'`` it's finished, the seconds it's spent ``'busy'``, the
+        ``'utilization'``, being the proportion of time it's been busy
+        since the workers started, and whether it's ``'running'`` a task
+        now.
+
+        """
+        if not hasattr(self, "_worker_processes"):
+            raise RuntimeError("LiSE was launched with no worker processes")
+        elapsed = monotonic() - self._workers_started
+        return {
+            "queue_depth": self._futs_to_start.qsize(),
+            "workers": [
+                {
+                    "tasks": tasks,
+                    "busy": busy,
+                    "utilization": busy / elapsed if elapsed else 0.0,
+                    "running": running is not None,
+                }
+                for (tasks, busy, running) in zip(
+                    self._worker_tasks_done,
+                    self._worker_busy_time,
+                    self._worker_running,
+                )
+            ],
+        }
+
+    @world_locked
+    def simulate_branches(
+        self,
+        n: int,
+        turns: int,
+        seed_fn: Callable[[int], int] = None,
+        *,
+        branches: List[str] = None,
+        processes: int = None,
+    ) -> List[str]:
+        """Simulate ``n`` new branches from the present, ``turns`` turns each
+
+        Every branch runs in a process of its own, on a snapshot of the
+        database, with its random number generator seeded with
+        ``seed_fn(i)`` for the ``i``th branch, or just ``i`` if you don't
+        supply ``seed_fn``. Their history then gets written into this
+        database, so you can travel to them like any other branches.
+
+        The branches are named like ``trunk_sim0``, after the present
+        branch, unless you supply the names in ``branches``. At most
+        ``processes`` simulations run at once; by default, one for each CPU.
+
+        Only works with SQLite. Returns the names of the new branches.
+
+        """
+        if self._planning:
+            raise ValueError("Don't simulate branches while planning")
+        if branches is None:
+            branches = []
+            i = 0
+            while len(branches) < n:
+                name = f"{self.branch}_sim{i}"
+                if name not in self._branches:
+                    branches.append(name)
+                i += 1
+        elif len(set(branches)) != n:
+            raise ValueError(f"Need {n} distinct branch names")
+        for branch in branches:
+            if branch in self._branches:
+                raise ValueError(f"Branch already exists: {branch}")
+        if not branches:
+            return branches
+        if seed_fn is None:
+            seeds = range(n)
+        else:
+            seeds = map(seed_fn, range(n))
+        for store in self.stores:
+            store.save(reimport=False)
+        self.commit(unload=False)
+        prefix = os.path.abspath(self._prefix)
+        with TemporaryDirectory() as tmp:
+            snapshot = os.path.join(tmp, "world.db")
+            self.query.backup(snapshot)
+            with ProcessPoolExecutor(
+                max_workers=min((n, processes or os.cpu_count() or 1)),
+                mp_context=get_context("spawn"),
+            ) as pool:
+                futs = [
+                    pool.submit(_simulate_branch, prefix, snapshot, branch, turns, seed)
+                    for (branch, seed) in zip(branches, seeds)
+                ]
+                for fut in futs:
+                    self._merge_branch_rows(fut.result())
+        self.query.commit()
+        return branches
+
+    def _merge_branch_rows(self, rows: Dict[str, list]) -> None:
+        """Insert rows from another copy of the world, and load their metadata
+
+        The rows should be for branches I don't have yet.
+
+        """
+        q = self.query
+        unpack = self.unpack
+        plan_ids = {}
+        for plan, *_ in rows["plans"]:
+            self._last_plan += 1
+            plan_ids[plan] = self._last_plan
+        rows["plans"] = [(plan_ids[plan], *rest) for (plan, *rest) in rows["plans"]]
+        rows["plan_ticks"] = [
+            (plan_ids[plan], *rest) for (plan, *rest) in rows["plan_ticks"]
+        ]
+        for table, tabrows in rows.items():
+            if tabrows:
+                q.call_many(table + "_insert", tabrows)
+        for branch, parent, *span in rows["branches"]:
+            self._branches[branch] = (parent, *span)
+            self._upd_branch_parentage(parent, branch)
+        turn_end_plan = self._turn_end_plan
+        for branch, turn, _, plan_end_tick in rows["turns"]:
+            turn_end_plan[branch, turn] = max(
+                (turn_end_plan[branch, turn], plan_end_tick)
+            )
+        self._load_keyframe_times(rows["keyframes"])
+        for graph, branch, turn, tick, *_ in rows["keyframes_graphs"]:
+            graph = unpack(graph)
+            q.index_keyframe_graph(graph, branch, turn, tick)
+            self._keyframes_list.append((graph, branch, turn, tick))
+        for graph, branch, turn, tick, typ in rows["graphs"]:
+            graph = unpack(graph)
+            self._graph_cache.store(
+                graph, branch, turn, tick, (typ if typ != "Deleted" else None)
+            )
+            if graph not in self._graph_objs:
+                self._graph_objs[graph] = self.char_cls(
+                    self, graph, init_rulebooks=False
+                )
+        for plan, branch, turn, tick in rows["plans"]:
+            self._plans[plan] = branch, turn, tick
+            self._branches_plans[branch].add(plan)
+        for plan, turn, tick in rows["plan_ticks"]:
+            branch = self._plans[plan][0]
+            self._plan_ticks[plan][turn].append(tick)
+            turn_end_plan[branch, turn] = max((turn_end_plan[branch, turn], tick))
+            self._time_plan[branch, turn, tick] = plan
+        handled_caches = self._rules_handled_caches()
+        for kind, row in q.unpack_rules_handled(rows["rules_handled"]):
+            handled_caches[kind].store(*row, loading=True)
+        for branch, turn in rows["turns_completed"]:
+            if branch in self._turns_completed:
+                turn = max((turn, self._turns_completed[branch]))
+            self._turns_completed[branch] = turn
+            self._turns_completed_previous[branch] = turn
+
+    @world_locked
+    def compact(
+        self,
+        before_turn: int,
+        keep_branches: Iterable[str] = None,
+        *,
+        vacuum: bool = False,
+    ) -> dict:
+        """Forget history before ``before_turn``, and branches nobody needs
+
+        Each branch that began earlier gets a keyframe at the start of
+        ``before_turn``, or at its end, if that's earlier. The changes that
+        keyframe supersedes are deleted, along with older keyframes and
+        the journal of rules handled. You can't time travel to before
+        that keyframe anymore.
+
+        If ``keep_branches`` is supplied, every other branch is deleted,
+        except the main branch, the current one, and their ancestors.
+
+        With ``vacuum=True``, rebuild the database file afterward, so it
+        actually gets smaller. Only works with SQLite.
+
+        Returns a dictionary with the list of branches ``'deleted'``, and
+        before-and-after pairs of the number of ``'rows'`` in the database,
+        the ``'db_bytes'`` in use, and the ``'load_seconds'`` it takes to
+        read the present state from the database, as at startup.
+
+        """
+        from .alchemy import table
+
+        branch_now, turn_now, tick_now = self._btt()
+        keep = {self.main_branch, branch_now}
+        if keep_branches is None:
+            keep.update(self._branches)
+        else:
+            keep.update(keep_branches)
+            if not keep.issubset(self._branches):
+                raise KeyError("No such branches", keep - self._branches.keys())
+        for branch in list(keep):
+            while branch is not None:
+                keep.add(branch)
+                branch = self._branches[branch][0]
+        drop = set(self._branches).difference(keep)
+        cutoffs = {}
+        for branch in keep:
+            _, turn_from, tick_from, turn_to, tick_to = self._branches[branch]
+            if (turn_from, tick_from) < (before_turn, 0):
+                cutoffs[branch] = min(((before_turn, 0), (turn_to, tick_to)))
+        if branch_now in cutoffs and (turn_now, tick_now) < cutoffs[branch_now]:
+            raise ValueError("Can't forget the history you're looking at")
+        q = self.query
+
+        def measure():
+            self.flush()
+            start = monotonic()
+            self._read_at(*self._btt())
+            return (
+                sum(q.call_one(name + "_count")[0][0] for name in table),
+                q.database_size(),
+                monotonic() - start,
+            )
+
+        before = measure()
+        for branch, (turn, tick) in cutoffs.items():
+            self._load_at(branch, turn, tick)
+            self._set_btt(branch, turn, tick)
+            self.snap_keyframe(silent=True, update_worker_processes=False)
+        self._set_btt(branch_now, turn_now, tick_now)
+        self.flush()
+        for branch, (turn, tick) in cutoffs.items():
+            q.rebase_keyframes(branch, turn, tick)
+        for branch in drop:
+            q.forget_keyframes(branch)
+            q.call_one("plan_ticks_del_branch", branch=branch)
+        # keyframes don't cover the history in these
+        uncompacted = {
+            "graphs",
+            "plans",
+            "rule_neighborhood",
+            "node_rulebook",
+            "portal_rulebook",
+        }
+        for name, tab in table.items():
+            if "branch" not in tab.c:
+                continue
+            for branch in drop:
+                q.call_one(name + "_del_branch", branch=branch)
+            if "turn" not in tab.c or name in uncompacted:
+                continue
+            for branch, (turn, tick) in cutoffs.items():
+                q.call_one(name + "_del_before", branch=branch, turn=turn, tick=tick)
+
+        for branch in drop:
+            del self._branches[branch]
+            self._branch_end.pop(branch, None)
+            self._branch_parents.pop(branch, None)
+            self._childbranch.pop(branch, None)
+            self._turns_completed.pop(branch, None)
+            self._turns_completed_previous.pop(branch, None)
+            for plan in self._branches_plans.pop(branch, ()):
+                self._plans.pop(plan, None)
+                self._plan_ticks.pop(plan, None)
+            self._loaded.pop(branch, None)
+            for cache in self._caches:
+                cache.remove_branch(branch)
+                for branches in cache.keyframe.values():
+                    if branch in branches:
+                        del branches[branch]
+        for children in self._childbranch.values():
+            children.difference_update(drop)
+        for parents in self._branch_parents.values():
+            parents.difference_update(drop)
+        for branch, (turn, tick) in cutoffs.items():
+            parent, _, _, turn_to, tick_to = self._branches[branch]
+            self._branches[branch] = (parent, turn, tick, turn_to, tick_to)
+
+        def gone(branch, turn, tick=None):
+            if branch in drop:
+                return True
+            if branch not in cutoffs:
+                return False
+            if tick is None:
+                return turn < cutoffs[branch][0]
+            return (turn, tick) < cutoffs[branch]
+
+        for plan_time in list(self._time_plan):
+            if plan_time[0] in drop:
+                del self._time_plan[plan_time]
+        for turn_ends in (self._turn_end, self._turn_end_plan):
+            for key in list(turn_ends):
+                if key in drop or (isinstance(key, tuple) and gone(*key)):
+                    del turn_ends[key]
+        for cache in self._rules_handled_caches().values():
+            for branch_turn in [k for k in cache.journals if gone(*k)]:
+                del cache.journals[branch_turn]
+        times = [time for time in self._keyframes_times if not gone(*time)]
+        self._keyframes_times.clear()
+        self._keyframes_dict.clear()
+        self._load_keyframe_times(times)
+        self._keyframes_list[:] = [
+            kf for kf in self._keyframes_list if not gone(*kf[-3:])
+        ]
+        self._keyframes_loaded.intersection_update(self._keyframes_times)
+        self._pathfinders.clear()
+        self._adjacencies.clear()
+        self.commit()
+        if vacuum:
+            q.vacuum()
+        after = measure()
+        if hasattr(self, "_worker_processes"):
+            self._update_all_worker_process_states(clobber=True)
+        return {
+            "deleted": sorted(drop),
+            "rows": (before[0], after[0]),
+            "db_bytes": (before[1], after[1]),
+            "load_seconds": (before[2], after[2]),
+        }
 
     def shutdown(self, wait=True, *, cancel_futures=False) -> None:
         if not hasattr(self, "_worker_processes"):
             return
         if cancel_futures:
-            for fut in self._uid_to_fut.values():
+            for fut in list(self._uid_to_fut.values()):
                 fut.cancel()
         if wait:
-            futwait(self._uid_to_fut.values())
+            futwait(list(self._uid_to_fut.values()))
+        else:
+            # The workers are about to stop, so what's still in the queue
+            # won't ever run. Cancel it, so the dispatchers only need to
+            # finish what they're running.
+            queue = self._futs_to_start
+            while not queue.empty():
+                try:
+                    fut = queue.get_nowait()
+                except Empty:
+                    break
+                fut.cancel()
+                self._uid_to_fut.pop(fut.uid, None)
+        for _ in self._fut_dispatch_threads:
+            self._futs_to_start.put(None)
+        for thread in self._fut_dispatch_threads:
+            thread.join()
         self._uid_to_fut = {}
         for i, (lock, pipein, pipeout, proc) in enumerate(
             zip(
@@ -631,14 +1258,20 @@ class Engine(AbstractEngine, gORM, Executor):
                 ), f"expected 'done', got {self.unpack(zlib.decompress(recvd))}"
                 proc.join()
                 proc.close()
+        del self._worker_processes
 
-    def _detect_kf_interval_override(self):
+    def _detect_kf_interval_override(self, n: int = 1):
+        scheduler = self._keyframe_scheduler
+        if scheduler is not None:
+            scheduler.records += n
         if getattr(self, "_no_kc", False):
             self._kf_overridden = True
             return True
         if getattr(self, "_kf_overridden", False):
             self._kf_overridden = False
             return False
+        if scheduler is not None and scheduler.due():
+            return False
 
     def _reimport_trigger_functions(self, *args, attr, **kwargs):
         if attr is not None:
@@ -838,11 +1471,40 @@ class Engine(AbstractEngine, gORM, Executor):
         store_porh = self._portal_rules_handled_cache.store
         for row in q.portal_rules_handled_dump():
             store_porh(*row, loading=True)
+        handled_caches = self._rules_handled_caches()
+        for kind, row in q.rules_handled_dump():
+            handled_caches[kind].store(*row, loading=True)
         self._turns_completed.update(q.turns_completed_dump())
         self._rules_cache = {
             name: Rule(self, name, create=False) for name in q.rules_dump()
         }
 
+    def _caches_to_report(self) -> list:
+        return super()._caches_to_report() + list(
+            self._rules_handled_caches().values()
+        )
+
+    def memory_report(self, sample: int = 64) -> dict:
+        """As :meth:`LiSE.allegedb.ORM.memory_report`, keyed by character
+
+        What that calls ``'graphs'`` is called ``'characters'`` here.
+
+        """
+        report = super().memory_report(sample)
+        report["characters"] = report.pop("graphs")
+        return report
+
+    def _rules_handled_caches(self) -> dict:
+        return {
+            "character": self._character_rules_handled_cache,
+            "unit": self._unit_rules_handled_cache,
+            "character_thing": self._character_thing_rules_handled_cache,
+            "character_place": self._character_place_rules_handled_cache,
+            "character_portal": self._character_portal_rules_handled_cache,
+            "node": self._node_rules_handled_cache,
+            "portal": self._portal_rules_handled_cache,
+        }
+
     @world_locked
     def _load_between(
         self,
@@ -891,6 +1553,29 @@ class Engine(AbstractEngine, gORM, Executor):
                 self._portals_rulebooks_cache.load(rowdict["portal_rulebook"])
         return loaded
 
+    @world_locked
+    def _load_at(self, branch: str, turn: int, tick: int) -> None:
+        scheduler = self._keyframe_scheduler
+        if scheduler is None or self._time_is_loaded(branch, turn, tick):
+            return super()._load_at(branch, turn, tick)
+        start = monotonic()
+        latest_past_keyframe, earliest_future_keyframe, graphs_rows, loaded = (
+            self._read_at(branch, turn, tick)
+        )
+        elapsed = monotonic() - start
+        records = len(graphs_rows)
+        for rows in loaded.values():
+            if isinstance(rows, dict):
+                records += sum(map(len, rows.values()))
+            else:
+                records += len(rows)
+        if latest_past_keyframe:
+            # the keyframe costs the same however much history follows it
+            self._get_keyframe(*latest_past_keyframe, silent=True)
+        start = monotonic()
+        self._load(latest_past_keyframe, earliest_future_keyframe, graphs_rows, loaded)
+        scheduler.observe(elapsed + monotonic() - start, records)
+
     def _load(
         self,
         latest_past_keyframe: Optional[Tuple[str, int, int]],
@@ -1235,6 +1920,7 @@ class Engine(AbstractEngine, gORM, Executor):
         time_from: Tuple[str, int, int],
         time_to: Tuple[str, int, int],
         slow=False,
+        interest: DeltaInterest = None,
     ) -> DeltaDict:
         """Get a dictionary describing changes to the world.
 
@@ -1273,22 +1959,24 @@ class Engine(AbstractEngine, gORM, Executor):
                 but we may take that approach anyway, if comparing between branches,
                 or between times that are far enough apart that a delta assuming
                 linear time would require *more* comparisons than comparing keyframes.
+        :param interest: Only the parts of the delta this
+                :class:`DeltaInterest` wants. Comparing keyframes skips the
+                rest; otherwise, the changes recorded between the times are
+                read, and the rest dropped.
 
         """
         if time_from == time_to:
             return {}
-        if time_from[0] == time_to[0]:
-            if slow or self._is_timespan_too_big(
-                time_from[0], time_from[1], time_to[1]
-            ):
-                return self._unpack_slightly_packed_delta(
-                    self._get_slow_delta(time_from, time_to)
-                )
-            else:
-                return self._get_branch_delta(*time_from, time_to[1], time_to[2])
-        return self._unpack_slightly_packed_delta(
-            self._get_slow_delta(time_from, time_to)
-        )
+        if time_from[0] != time_to[0] or (
+            slow or self._is_timespan_too_big(time_from[0], time_from[1], time_to[1])
+        ):
+            return self._unpack_slightly_packed_delta(
+                self._get_slow_delta(time_from, time_to, interest)
+            )
+        delta = self._get_branch_delta(*time_from, time_to[1], time_to[2])
+        if interest is not None:
+            delta = interest.filter(delta)
+        return delta
 
     def _unpack_slightly_packed_delta(
         self, delta: SlightlyPackedDeltaType
@@ -1350,7 +2038,10 @@ class Engine(AbstractEngine, gORM, Executor):
         return delt
 
     def _get_slow_delta(
-        self, btt_from: Tuple[str, int, int], btt_to: Tuple[str, int, int]
+        self,
+        btt_from: Tuple[str, int, int],
+        btt_to: Tuple[str, int, int],
+        interest: DeltaInterest = None,
     ) -> SlightlyPackedDeltaType:
         def newgraph():
             return {
@@ -1371,6 +2062,16 @@ class Engine(AbstractEngine, gORM, Executor):
             RULEBOOK: PickyDefaultDict(bytes),
         }
         pack = self.pack
+        pack_key = self.query.pack_key
+        if interest is None:
+            wants_graph = wants_graph_key = wants_stat = lambda _: True
+            want = DeltaInterest.kinds
+        else:
+            # Don't compare, or pack, what won't be sent
+            wants_graph = interest.wants_character
+            wants_graph_key = interest.wants_character_key
+            wants_stat = interest.wants_stat
+            want = interest.want
         now = self._btt()
         self._set_btt(*btt_from)
         kf_from = self.snap_keyframe()
@@ -1425,10 +2126,12 @@ class Engine(AbstractEngine, gORM, Executor):
             ids_to.append(id(b))
             values_from.append(a)
             values_to.append(b)
-        for graph in kf_from["graph_val"].keys() | kf_to["graph_val"].keys():
+        for graph in filter(
+            wants_graph, kf_from["graph_val"].keys() | kf_to["graph_val"].keys()
+        ):
             a = kf_from["graph_val"].get(graph, {})
             b = kf_to["graph_val"].get(graph, {})
-            for k in a.keys() | b.keys():
+            for k in filter(wants_graph_key, a.keys() | b.keys()):
                 keys.append(("graph", graph, k))
                 va = a.get(k)
                 vb = b.get(k)
@@ -1436,7 +2139,12 @@ class Engine(AbstractEngine, gORM, Executor):
                 ids_to.append(id(vb))
                 values_from.append(va)
                 values_to.append(vb)
-        for graph in kf_from["node_val"].keys() | kf_to["node_val"].keys():
+        for graph in filter(
+            wants_graph,
+            kf_from["node_val"].keys() | kf_to["node_val"].keys()
+            if "node_val" in want
+            else (),
+        ):
             nodes = set()
             if graph in kf_from["node_val"]:
                 nodes.update(kf_from["node_val"][graph].keys())
@@ -1445,7 +2153,7 @@ class Engine(AbstractEngine, gORM, Executor):
             for node in nodes:
                 a = kf_from["node_val"].get(graph, {}).get(node, {})
                 b = kf_to["node_val"].get(graph, {}).get(node, {})
-                for k in a.keys() | b.keys():
+                for k in filter(wants_stat, a.keys() | b.keys()):
                     keys.append(("node", graph, node, k))
                     va = a.get(k)
                     vb = b.get(k)
@@ -1453,7 +2161,12 @@ class Engine(AbstractEngine, gORM, Executor):
                     ids_to.append(id(vb))
                     values_from.append(va)
                     values_to.append(vb)
-        for graph in kf_from["edge_val"].keys() | kf_to["edge_val"].keys():
+        for graph in filter(
+            wants_graph,
+            kf_from["edge_val"].keys() | kf_to["edge_val"].keys()
+            if "edge_val" in want
+            else (),
+        ):
             edges = set()
             if graph in kf_from["edge_val"]:
                 for orig in kf_from["edge_val"][graph]:
@@ -1466,7 +2179,7 @@ class Engine(AbstractEngine, gORM, Executor):
             for orig, dest in edges:
                 a = kf_from["edge_val"].get(graph, {}).get(orig, {}).get(dest, {})
                 b = kf_to["edge_val"].get(graph, {}).get(orig, {}).get(dest, {})
-                for k in a.keys() | b.keys():
+                for k in filter(wants_stat, a.keys() | b.keys()):
                     keys.append(("edge", graph, orig, dest, k))
                     va = a.get(k)
                     vb = b.get(k)
@@ -1512,25 +2225,25 @@ class Engine(AbstractEngine, gORM, Executor):
                 return
             v = pack(vb)
             if k[0] == "universal":
-                key = pack(k[1])
+                key = pack_key(k[1])
                 delta[UNIVERSAL][key] = v
             elif k[0] == "triggers":
-                rule = pack(k[1])
+                rule = pack_key(k[1])
                 delta[RULES][rule][TRIGGERS] = v
             elif k[0] == "prereqs":
-                rule = pack(k[1])
+                rule = pack_key(k[1])
                 delta[RULES][rule][PREREQS] = v
             elif k[0] == "actions":
-                rule = pack(k[1])
+                rule = pack_key(k[1])
                 delta[RULES][rule][ACTIONS] = v
             elif k[0] == "rulebook":
-                rulebook = pack(k[1])
+                rulebook = pack_key(k[1])
                 delta[RULEBOOK][rulebook] = v
             elif k[0] == "node":
                 _, graph, node, key = k
                 if graph in deleted_nodes and node in deleted_nodes[graph]:
                     return
-                graph, node, key = map(pack, (graph, node, key))
+                graph, node, key = map(pack_key, (graph, node, key))
                 if graph not in delta:
                     delta[graph] = newgraph()
                 delta[graph][NODE_VAL][node][key] = v
@@ -1538,46 +2251,50 @@ class Engine(AbstractEngine, gORM, Executor):
                 _, graph, orig, dest, key = k
                 if (graph, orig, dest) in deleted_edges:
                     return
-                graph, orig, dest, key = map(pack, (graph, orig, dest, key))
+                graph, orig, dest, key = map(pack_key, (graph, orig, dest, key))
                 if graph not in delta:
                     delta[graph] = newgraph()
                 delta[graph][EDGE_VAL][orig][dest][key] = v
             else:
                 assert k[0] == "graph"
                 _, graph, key = k
-                graph, key = map(pack, (graph, key))
+                graph, key = map(pack_key, (graph, key))
                 if graph not in delta:
                     delta[graph] = newgraph()
                 delta[graph][key] = v
 
         def pack_node(graph, node, existence):
-            grap, node = map(pack, (graph, node))
+            grap, node = map(pack_key, (graph, node))
             if grap not in delta:
                 delta[grap] = newgraph()
             delta[grap][NODES][node] = existence
 
         def pack_edge(graph, orig, dest, existence):
-            graph, origdest = map(pack, (graph, (orig, dest)))
+            graph, origdest = map(pack_key, (graph, (orig, dest)))
             if graph not in delta:
                 delta[graph] = newgraph()
             delta[graph][EDGES][origdest] = existence
 
         futs = []
         with ThreadPoolExecutor() as pool:
-            nodes_intersection = kf_from["nodes"].keys() & kf_to["nodes"].keys()
+            nodes_intersection = set(
+                filter(wants_graph, kf_from["nodes"].keys() & kf_to["nodes"].keys())
+            )
             deleted_nodes = {}
             for graph in nodes_intersection:
                 deleted_nodes_here = deleted_nodes[graph] = (
                     kf_from["nodes"][graph].keys() - kf_to["nodes"][graph].keys()
                 )
+                if "nodes" not in want:
+                    continue
                 for node in deleted_nodes_here:
                     futs.append(pool.submit(pack_node, graph, node, FALSE))
             deleted_edges = set()
-            for graph in kf_from["edges"]:
+            for graph in filter(wants_graph, kf_from["edges"]):
                 for orig in kf_from["edges"][graph]:
                     for dest, ex in kf_from["edges"][graph][orig].items():
                         deleted_edges.add((graph, orig, dest))
-            for graph in kf_to["edges"]:
+            for graph in filter(wants_graph, kf_to["edges"]):
                 for orig in kf_to["edges"][graph]:
                     for dest, ex in kf_to["edges"][graph][orig].items():
                         deleted_edges.discard((graph, orig, dest))
@@ -1589,31 +2306,32 @@ class Engine(AbstractEngine, gORM, Executor):
                 futs.append(
                     pool.submit(pack_one, k, va, vb, deleted_nodes, deleted_edges)
                 )
-            for graf in kf_from["graph_val"].keys() - kf_to["graph_val"].keys():
-                delta[self.pack(graf)] = NONE
-            for graph in nodes_intersection:
+            for graf in filter(
+                wants_graph, kf_from["graph_val"].keys() - kf_to["graph_val"].keys()
+            ):
+                delta[pack_key(graf)] = NONE
+            for graph in nodes_intersection if "nodes" in want else ():
                 for node in (
                     kf_to["nodes"][graph].keys() - kf_from["nodes"][graph].keys()
                 ):
                     futs.append(pool.submit(pack_node, graph, node, TRUE))
-            for graph, orig, dest in deleted_edges:
-                futs.append(pool.submit(pack_edge, graph, orig, dest, FALSE))
-            edges_to = {
-                (graph, orig, dest)
-                for graph in kf_to["edges"]
-                for orig in kf_to["edges"][graph]
-                for dest in kf_to["edges"][graph][orig]
-            }
-            edges_from = {
-                (graph, orig, dest)
-                for graph in kf_from["edges"]
-                for orig in kf_from["edges"][graph]
-                for dest in kf_from["edges"][graph][orig]
-            }
-            for graph, orig, dest in edges_to - edges_from:
-                futs.append(pool.submit(pack_edge, graph, orig, dest, TRUE))
-            for deleted in kf_from["graph_val"].keys() - kf_to["graph_val"].keys():
-                delta[pack(deleted)] = NONE
+            if "edges" in want:
+                for graph, orig, dest in deleted_edges:
+                    futs.append(pool.submit(pack_edge, graph, orig, dest, FALSE))
+                edges_to = {
+                    (graph, orig, dest)
+                    for graph in filter(wants_graph, kf_to["edges"])
+                    for orig in kf_to["edges"][graph]
+                    for dest in kf_to["edges"][graph][orig]
+                }
+                edges_from = {
+                    (graph, orig, dest)
+                    for graph in filter(wants_graph, kf_from["edges"])
+                    for orig in kf_from["edges"][graph]
+                    for dest in kf_from["edges"][graph][orig]
+                }
+                for graph, orig, dest in edges_to - edges_from:
+                    futs.append(pool.submit(pack_edge, graph, orig, dest, TRUE))
             futwait(futs)
         if not delta[UNIVERSAL]:
             del delta[UNIVERSAL]
@@ -1642,7 +2360,9 @@ class Engine(AbstractEngine, gORM, Executor):
                     todel.append(keey)
             for todo in todel:
                 del mapp[todo]
-        for added in kf_to["graph_val"].keys() - kf_from["graph_val"].keys():
+        for added in filter(
+            wants_graph, kf_to["graph_val"].keys() - kf_from["graph_val"].keys()
+        ):
             graphn = pack(added)
             if graphn not in delta:
                 delta[graphn] = {}
@@ -1665,18 +2385,24 @@ class Engine(AbstractEngine, gORM, Executor):
             if tick_from == tick_to:
                 return {}
             return self._get_turn_delta(branch, turn_to, tick_from, tick_to)
-        delta = super()._get_branch_delta(
+        start = monotonic()
+        delta, replayed = super()._replay_branch_delta(
             branch, turn_from, tick_from, turn_to, tick_to
         )
         if turn_from < turn_to:
-            updater = partial(update_window, turn_from, tick_from, turn_to, tick_to)
+            update = partial(update_window, turn_from, tick_from, turn_to, tick_to)
             attribute = "settings"
             tick_to += 1
         else:
-            updater = partial(
+            update = partial(
                 update_backward_window, turn_from, tick_from, turn_to, tick_to
             )
             attribute = "presettings"
+
+        def updater(updfun, branchd):
+            nonlocal replayed
+            replayed += update(updfun, branchd)
+
         univbranches = getattr(self._universal_cache, attribute)
         avbranches = getattr(self._unitness_cache, attribute)
         thbranches = getattr(self._things_cache, attribute)
@@ -1818,6 +2544,9 @@ class Engine(AbstractEngine, gORM, Executor):
         if branch in edgerbbranches:
             updater(updedgerb, edgerbbranches[branch])
 
+        if replayed and (scheduler := self._keyframe_scheduler) is not None:
+            # the same unit as the rows counted in _load_at
+            scheduler.observe(monotonic() - start, replayed)
         return delta
 
     def _get_turn_delta(
@@ -2268,9 +2997,9 @@ class Engine(AbstractEngine, gORM, Executor):
         except ValueError:
             assert (
                 rulen
-                in self._character_rules_handled_cache.handled[
+                in self._character_rules_handled_cache.retrieve(
                     charn, rulebook, branch, turn
-                ]
+                )
             )
             return
         self.query.handled_character_rule(charn, rulebook, rulen, branch, turn, tick)
@@ -2293,9 +3022,9 @@ class Engine(AbstractEngine, gORM, Executor):
         except ValueError:
             assert (
                 rule
-                in self._unit_rules_handled_cache.handled[
+                in self._unit_rules_handled_cache.retrieve(
                     character, graph, avatar, rulebook, branch, turn
-                ]
+                )
             )
             return
         self.query.handled_unit_rule(
@@ -2319,9 +3048,9 @@ class Engine(AbstractEngine, gORM, Executor):
         except ValueError:
             assert (
                 rule
-                in self._character_thing_rules_handled_cache.handled[
+                in self._character_thing_rules_handled_cache.retrieve(
                     character, thing, rulebook, branch, turn
-                ]
+                )
             )
             return
         self.query.handled_character_thing_rule(
@@ -2345,9 +3074,9 @@ class Engine(AbstractEngine, gORM, Executor):
         except ValueError:
             assert (
                 rule
-                in self._character_place_rules_handled_cache.handled[
+                in self._character_place_rules_handled_cache.retrieve(
                     character, place, rulebook, branch, turn
-                ]
+                )
             )
             return
         self.query.handled_character_place_rule(
@@ -2372,9 +3101,9 @@ class Engine(AbstractEngine, gORM, Executor):
         except ValueError:
             assert (
                 rule
-                in self._character_portal_rules_handled_cache.handled[
+                in self._character_portal_rules_handled_cache.retrieve(
                     character, orig, dest, rulebook, branch, turn
-                ]
+                )
             )
             return
         self.query.handled_character_portal_rule(
@@ -2398,9 +3127,9 @@ class Engine(AbstractEngine, gORM, Executor):
         except ValueError:
             assert (
                 rule
-                in self._node_rules_handled_cache.handled[
+                in self._node_rules_handled_cache.retrieve(
                     character, node, rulebook, branch, turn
-                ]
+                )
             )
             return
         self.query.handled_node_rule(
@@ -2425,15 +3154,96 @@ class Engine(AbstractEngine, gORM, Executor):
         except ValueError:
             assert (
                 rule
-                in self._portal_rules_handled_cache.handled[
+                in self._portal_rules_handled_cache.retrieve(
                     character, orig, dest, rulebook, branch, turn
-                ]
+                )
             )
             return
         self.query.handled_portal_rule(
             character, orig, dest, rulebook, rule, branch, turn, tick
         )
 
+    def set_trigger_pure(self, trigger: Union[str, Callable], pure: bool = True):
+        """Declare that a trigger depends only on the stats it looks up
+
+        The result of a pure trigger is remembered for each entity, and
+        reused until any of the stats it read last time is different.
+        Only values looked up by key get checked, not what keys or entities
+        exist, so don't declare a trigger pure if it iterates over
+        anything, or if it uses randomness.
+
+        Results are only reused when triggers aren't run in threads.
+        See the ``threaded_triggers`` parameter of :class:`Engine`.
+
+        """
+        name = trigger if isinstance(trigger, str) else trigger.__name__
+        if pure:
+            self._pure_triggers.add(name)
+        else:
+            self._pure_triggers.discard(name)
+            self._forget_pure_trigger(attr=name)
+        self.eternal["_pure_triggers"] = sorted(self._pure_triggers)
+
+    def pure_trigger_stats(self) -> Dict[str, int]:
+        """Count how often pure triggers' results have been reused
+
+        ``'hits'`` are the evaluations that reused a result, ``'misses'``
+        the ones that ran the trigger, and ``'invalidations'`` the misses
+        that were due to a stat changing.
+
+        """
+        return dict(self._pure_trigger_stats)
+
+    def _forget_pure_trigger(self, *args, attr, **kwargs):
+        for key in list(self._pure_trigger_memo):
+            if attr is None or key[0] == attr:
+                del self._pure_trigger_memo[key]
+
+    def _eval_pure_trigger(self, trigger: Callable, entity) -> bool:
+        key = (trigger.__name__, _entity_key(entity))
+        btt = self._btt()
+        stats = self._pure_trigger_stats
+        if key in self._pure_trigger_memo:
+            result, reads = self._pure_trigger_memo[key]
+            for cache, args, value in reads:
+                if _read_value(cache._base_retrieve(args + btt)) != value:
+                    stats["invalidations"] += 1
+                    break
+            else:
+                stats["hits"] += 1
+                return result
+        stats["misses"] += 1
+        with recording_reads() as reads:
+            result = bool(trigger(entity))
+        self._pure_trigger_memo[key] = (
+            result,
+            tuple((cache, args[:-3], _read_value(ret)) for (cache, args, ret) in reads),
+        )
+        return result
+
+    def set_worker_interest(
+        self,
+        i: int,
+        characters: Iterable[Key] = None,
+        stats: Iterable[Key] = None,
+        kinds: Iterable[str] = None,
+    ) -> None:
+        """Send worker ``i`` only the parts of deltas that it needs
+
+        Arguments after ``i`` are as for :class:`DeltaInterest`. Leave them
+        all ``None`` to send the worker everything again.
+
+        Only do this if you know your trigger functions don't look at the
+        rest of the world; the worker's view of it will go stale.
+
+        """
+        if characters is None and stats is None and kinds is None:
+            self._worker_interests[i] = None
+        else:
+            self._worker_interests[i] = DeltaInterest(
+                self.pack, characters, stats, kinds
+            )
+
     def _update_all_worker_process_states(self, clobber=False):
         for lock in self._worker_locks:
             lock.acquire()
@@ -2463,6 +3273,8 @@ class Engine(AbstractEngine, gORM, Executor):
                     )
                 if eternal_delta:
                     delt["eternal"] = eternal_delta
+                if self._worker_interests[i] is not None:
+                    delt = self._worker_interests[i].filter(delt)
                 argbytes = zlib.compress(
                     self.pack(
                         (
@@ -2502,6 +3314,8 @@ class Engine(AbstractEngine, gORM, Executor):
                 branch_from, turn_from, tick_from, self.turn, self.tick
             )
             delt["eternal"] = eternal_delta
+            if self._worker_interests[i] is not None:
+                delt = self._worker_interests[i].filter(delt)
             argbytes = zlib.compress(
                 self.pack(
                     (
@@ -2579,7 +3393,9 @@ class Engine(AbstractEngine, gORM, Executor):
             ):
                 return False
             for trigger in rule.triggers:
-                if hasattr(self, "_worker_processes"):
+                if not pool and trigger.__name__ in self._pure_triggers:
+                    res = self._eval_pure_trigger(trigger, entity)
+                elif hasattr(self, "_worker_processes"):
                     res = self._call_any_subproxy(
                         "_eval_trigger", trigger.__name__, entity
                     )
@@ -2651,6 +3467,7 @@ class Engine(AbstractEngine, gORM, Executor):
         def get_neighbors(
             entity: Union[place_cls, thing_cls, portal_cls],
             neighborhood: Optional[int],
+            btt: Tuple[str, int, int] = None,
         ) -> Optional[List[Union[Tuple[Key], Tuple[Key, Key]]]]:
             """Get a list of neighbors within the neighborhood
 
@@ -2658,9 +3475,12 @@ class Engine(AbstractEngine, gORM, Executor):
             if they are Places or Things, or their origin's and destination's
             names, if they are Portals.
 
+            Looks at the time ``btt``, or the present if it's ``None``.
+
             """
             charn = entity.character.name
-            btt = self._btt()
+            if btt is None:
+                btt = self._btt()
 
             def get_place_neighbors(name: Key) -> Set[Key]:
                 seen: Set[Key] = set()
@@ -2709,9 +3529,10 @@ class Engine(AbstractEngine, gORM, Executor):
                 return self._neighbors_cache[cache_key]
             if hasattr(entity, "name"):
                 neighbors = [(entity.name,)]
-                while hasattr(entity, "location"):
-                    entity = entity.location
-                    neighbors.append((entity.name,))
+                loc = get_thing_location_tup(entity.name)
+                while loc:
+                    neighbors.append(loc)
+                    loc = get_thing_location_tup(*loc)
             else:
                 neighbors = [(entity.origin.name, entity.destination.name)]
             seen = set(neighbors)
@@ -2778,11 +3599,12 @@ class Engine(AbstractEngine, gORM, Executor):
                 return None
             with self.world_lock:
                 self._load_at(branch_now, turn_now - 1, 0)
-                self._oturn -= 1
-                self._otick = 0
-                last_turn_neighbors = get_neighbors(entity, neighborhood)
-                self._set_btt(branch_now, turn_now, tick_now)
-                this_turn_neighbors = get_neighbors(entity, neighborhood)
+            last_turn_neighbors = get_neighbors(
+                entity, neighborhood, (branch_now, turn_now - 1, 0)
+            )
+            this_turn_neighbors = get_neighbors(
+                entity, neighborhood, (branch_now, turn_now, tick_now)
+            )
             if set(last_turn_neighbors) != set(this_turn_neighbors):
                 return None
             return this_turn_neighbors
@@ -3158,6 +3980,10 @@ class Engine(AbstractEngine, gORM, Executor):
         for thing in list(graph.thing):
             del graph.thing[thing]
         super().del_graph(name)
+        for cache in (self._pathfinders, self._adjacencies):
+            for key in list(cache):
+                if key[0] == name:
+                    del cache[key]
         if hasattr(self, "_worker_processes"):
             self._call_every_subproxy("_del_character", name)
 
@@ -3428,6 +4254,27 @@ class Engine(AbstractEngine, gORM, Executor):
     def _node_contents(self, character: Key, node: Key) -> Set:
         return self._node_contents_cache.retrieve(character, node, *self._btt())
 
+    def view(self, branch: str = None, turn: int = None, tick: int = None) -> View:
+        """Return a read-only view of the world at the given time
+
+        Omitted arguments default to the present. The view reads the
+        caches at its own time, so it doesn't move ``engine.time``, and
+        may be used from other threads without holding the world lock.
+
+        """
+        if branch is None:
+            branch = self.branch
+        if turn is None:
+            turn = self.turn
+        if tick is None:
+            if (branch, turn) == (self.branch, self.turn):
+                tick = self.tick
+            else:
+                tick = self._turn_end[branch, turn]
+        with self.world_lock:
+            self._load_at(branch, turn, tick)
+        return View(self, branch, turn, tick)
+
     def apply_choices(
         self, choices: List[dict], dry_run=False, perfectionist=False
     ) -> Tuple[List[Tuple[Any, Any]], List[Tuple[Any, Any]]]:
@@ -36,7 +36,7 @@ def two_way(orig, dest):
     dest.new_portal(orig.name)
 
 
-def install(eng):
+def install(eng, dorms=3):
     phys = eng.new_character("physical")
     phys.stat["hour"] = 0
 
@@ -165,11 +165,11 @@ def install(eng):
     catch_up.prereq(in_class)
     catch_up.prereq(class_in_session)
 
-    # 3 dorms of 12 students each.
+    # 3 dorms of 12 students each, unless you ask for a different number.
     # Each dorm has 6 rooms.
     # Modeling the teachers would be a logical way to extend this.
     student_body.stat["characters"] = []
-    for n in range(0, 3):
+    for n in range(0, dorms):
         dorm = eng.new_character("dorm{}".format(n))
         common = phys.new_place(
             "common{}".format(n)
@@ -3,10 +3,10 @@ import random
 import networkx as nx
 
 
-def install(eng, seed=None):
+def install(eng, seed=None, size=100):
     if seed is not None:
         random.seed(seed)
-    grid: nx.Graph = nx.grid_2d_graph(100, 100)
+    grid: nx.Graph = nx.grid_2d_graph(size, size)
 
     for node in list(grid):
         if random.random() < 0.1:
@@ -15,6 +15,7 @@ def install(eng, seed=None):
             grid.add_node(f"{node}_inhabitant", location=node)
 
     phys = eng.new_character("physical", grid)
+    phys.stat["size"] = size
 
     @eng.function
     def find_path_somewhere(node):
@@ -22,13 +23,14 @@ def install(eng, seed=None):
 
         from networkx.algorithms import astar_path
 
+        size = node.character.stat.get("size", 100)
         x, y = node.location.name
-        destx = 100 - int(x)
-        desty = 100 - int(y)
+        destx = size - int(x)
+        desty = size - int(y)
         while (destx, desty) not in node.character.place:
-            if destx < 99:
+            if destx < size - 1:
                 destx += 1
-            elif desty < 99:
+            elif desty < size - 1:
                 destx = 0
                 desty += 1
             else:
@@ -18,7 +18,7 @@
 from LiSE.character import grid_2d_8graph
 
 
-def install(eng):
+def install(eng, size=20, polys=30):
     @eng.function
     def cmp_neighbor_shapes(poly, cmp, stat):
         """Compare the proportion of neighboring polys with the same shape as this one
@@ -83,7 +83,7 @@ def install(eng):
             "min_sameness": {"control": "slider", "min": 0.0, "max": 1.0},
             "max_sameness": {"control": "slider", "min": 0.0, "max": 1.0},
         },
-        data=grid_2d_8graph(20, 20),
+        data=grid_2d_8graph(size, size),
     )
     square = eng.new_character("square")
     triangle = eng.new_character("triangle")
@@ -92,13 +92,13 @@ def install(eng):
     empty = list(physical.place.values())
     eng.shuffle(empty)
     # distribute 30 of each shape randomly among the empty places
-    for i in range(1, 31):
+    for i in range(1, polys + 1):
         square.add_unit(
             empty.pop().new_thing(
                 "square%i" % i, _image_paths=["atlas://polygons/meh_square"]
             )
         )
-    for i in range(1, 31):
+    for i in range(1, polys + 1):
         triangle.add_unit(
             empty.pop().new_thing(
                 "triangle%i" % i,
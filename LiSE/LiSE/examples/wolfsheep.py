@@ -51,7 +51,7 @@ def install(eng: Engine, map_size=(25, 25), wolves=10, sheep=25, seed=None):
         shep.engine.character["physical"].stat["bare_places"].append(shep["location"])
         shep.location["_image_paths"] = ["atlas://rltiles/floor/floor-normal"]
 
-    @graze.trigger
+    @graze.trigger(pure=True)
     def grass_here(shep):
         return not shep.location["bare"]
 
@@ -25,20 +25,7 @@ from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 import msgpack
 
 from .allegedb import Key, OutOfTimelineError
-from .engine import (
-    EDGE_VAL,
-    EDGES,
-    ETERNAL,
-    NODE_VAL,
-    NODES,
-    NONE,
-    RULEBOOK,
-    RULEBOOKS,
-    RULES,
-    UNITS,
-    UNIVERSAL,
-    Engine,
-)
+from .engine import NONE, UNITS, DeltaInterest, Engine
 from .node import Node
 from .portal import Portal
 from .util import AbstractCharacter, BadTimeException, timer
@@ -62,6 +49,15 @@ FormerAndCurrentType = Tuple[Dict[bytes, bytes], Dict[bytes, bytes]]
 EMPTY_MAPPING = msgpack.packb({})
 
 
+def map_header(n: int) -> bytes:
+    """Return the msgpack header for a map of ``n`` items"""
+    if n < 16:
+        return bytes((0x80 | n,))
+    elif n < 0x10000:
+        return b"\xde" + n.to_bytes(2, "big")
+    return b"\xdf" + n.to_bytes(4, "big")
+
+
 def concat_d(r: Dict[bytes, bytes]) -> bytes:
     """Pack a dictionary of msgpack-encoded keys and values into msgpack bytes"""
     resp = msgpack.Packer().pack_map_header(len(r))
@@ -70,6 +66,21 @@ def concat_d(r: Dict[bytes, bytes]) -> bytes:
     return resp
 
 
+def concat_into(buf: bytearray, r: dict) -> None:
+    """Write a dictionary of msgpack-encoded keys and values into ``buf``
+
+    Values may be further such dictionaries.
+
+    """
+    buf += map_header(len(r))
+    for k, v in r.items():
+        buf += k
+        if isinstance(v, dict):
+            concat_into(buf, v)
+        else:
+            buf += v
+
+
 def prepacked(fun: Callable) -> Callable:
     fun.prepacked = True
     return fun
@@ -112,6 +123,7 @@ class EngineHandle:
         self.unpack = self._real.unpack
 
         self._cache_arranger_started = False
+        self._interest: Optional[DeltaInterest] = None
         if do_game_start:
             self.do_game_start()
 
@@ -148,130 +160,75 @@ class EngineHandle:
         """Return whether the sim-time has been prevented from advancing"""
         return hasattr(self._real, "locktime")
 
+    def set_interest(
+        self,
+        characters: Iterable[Key] = None,
+        stats: Iterable[Key] = None,
+        kinds: Iterable[str] = None,
+    ) -> None:
+        """Only put some parts of the world in the deltas I return
+
+        Affects ``next_turn`` and ``time_travel``. Arguments are as for
+        :class:`LiSE.engine.DeltaInterest`. Leave them all ``None`` to get
+        everything again.
+
+        Deltas made by comparing keyframes skip the unwanted parts
+        entirely. Others are read from the changes recorded during the
+        turns in question, and the unwanted parts dropped before packing.
+
+        This is for a handle with only one client.
+        :class:`LiSE.server.aio.AsyncEngineServer` keeps an interest for
+        each connection instead.
+
+        """
+        if characters is None and stats is None and kinds is None:
+            self._interest = None
+        else:
+            self._interest = DeltaInterest(self.pack, characters, stats, kinds)
+
     def snap_keyframe(self, silent=False):
         return self._real.snap_keyframe(silent=silent)
 
-    def _pack_delta(self, delta) -> Tuple[SlightlyPackedDeltaType, bytes]:
+    def _pack_delta(self, delta) -> bytes:
+        """Pack a delta into msgpack bytes in a single pass
+
+        Writes straight into one buffer, rather than building dictionaries
+        of packed keys and values to concatenate later.
+
+        """
         pack = self.pack
-        slightly_packed_delta = {}
-        mostly_packed_delta = {}
+        pack_key = self._real.query.pack_key
+        buf = bytearray(map_header(len(delta)))
         for char, chardelta in delta.items():
+            buf += pack_key(char)
             if chardelta is None or chardelta == {"name": None}:
-                pchar = pack(char)
-                slightly_packed_delta[pchar] = mostly_packed_delta[pchar] = None
-                continue
-            chardelta = chardelta.copy()
-            pchar = pack(char)
-            chard = slightly_packed_delta[pchar] = {}
-            packd = mostly_packed_delta[pchar] = {}
-            if "nodes" in chardelta:
-                nd = chard[NODES] = {
-                    pack(node): pack(ex) for node, ex in chardelta.pop("nodes").items()
-                }
-                packd[NODES] = concat_d(nd)
-            if "node_val" in chardelta:
-                slightnoded = chard[NODE_VAL] = {}
-                packnodevd = {}
-                for node, vals in chardelta.pop("node_val").items():
-                    pnode = pack(node)
-                    pvals = dict(map(self.pack_pair, vals.items()))
-                    slightnoded[pnode] = pvals
-                    packnodevd[pnode] = concat_d(pvals)
-                packd[NODE_VAL] = concat_d(packnodevd)
-            if "edges" in chardelta:
-                ed = chard[EDGES] = {
-                    pack(origdest): pack(ex)
-                    for origdest, ex in chardelta.pop("edges").items()
-                }
-                packd[EDGES] = concat_d(ed)
-            if "edge_val" in chardelta:
-                slightorigd = chard[EDGE_VAL] = {}
-                packorigd = {}
-                for orig, dests in chardelta.pop("edge_val").items():
-                    porig = pack(orig)
-                    slightdestd = slightorigd[porig] = {}
-                    packdestd = {}
-                    for dest, port in dests.items():
-                        pdest = pack(dest)
-                        slightportd = slightdestd[pdest] = dict(
-                            map(self.pack_pair, port.items())
-                        )
-                        packdestd[pdest] = concat_d(slightportd)
-                    packorigd[porig] = concat_d(packdestd)
-                packd[EDGE_VAL] = concat_d(packorigd)
-            if "units" in chardelta:
-                slightgraphd = chard[UNITS] = {}
-                packunitd = {}
-                for graph, unitss in chardelta.pop("units").items():
-                    pgraph = pack(graph)
-                    slightunitd = slightgraphd[pgraph] = dict(
-                        map(self.pack_pair, unitss.items())
-                    )
-                    packunitd[pgraph] = concat_d(slightunitd)
-                packd[UNITS] = concat_d(packunitd)
-            if "rulebooks" in chardelta:
-                chard[RULEBOOKS] = slightrbd = dict(
-                    map(self.pack_pair, chardelta.pop("rulebooks").items())
-                )
-                packd[RULEBOOKS] = concat_d(slightrbd)
-            todo = dict(map(self.pack_pair, chardelta.items()))
-            chard.update(todo)
-            packd.update(todo)
-        return slightly_packed_delta, concat_d(
-            {
-                charn: (concat_d(stuff) if stuff is not None else NONE)
-                for charn, stuff in mostly_packed_delta.items()
-            }
-        )
+                buf += NONE
+            else:
+                buf += pack(chardelta)
+        return bytes(buf)
 
     @staticmethod
-    def _concat_char_delta(delta: SlightlyPackedDeltaType) -> bytes:
-        delta = delta.copy()
-        mostly_packed_delta = packd = {}
-        eternal = delta.pop(ETERNAL, None)
-        if eternal:
-            mostly_packed_delta[ETERNAL] = eternal
-        universal = delta.pop(UNIVERSAL, None)
-        if universal:
-            mostly_packed_delta[UNIVERSAL] = universal
-        if RULEBOOK in delta:
-            mostly_packed_delta[RULEBOOK] = delta.pop(RULEBOOK)
-        if RULES in delta:
-            rules = delta.pop(RULES)
-            mostly_packed_delta[RULES] = concat_d(
-                {rule: concat_d(funcls) for (rule, funcls) in rules.items()}
-            )
-        if NODES in delta:
-            charnodes = delta.pop(NODES)
-            packd[NODES] = concat_d(charnodes)
-        if NODE_VAL in delta:
-            slightnoded = {}
-            packnodevd = {}
-            for node, vals in delta.pop(NODE_VAL).items():
-                slightnoded[node] = vals
-                packnodevd[node] = concat_d(vals)
-            packd[NODE_VAL] = concat_d(packnodevd)
-        if EDGES in delta:
-            es = delta.pop(EDGES)
-            packd[EDGES] = concat_d(es)
-        if EDGE_VAL in delta:
-            packorigd = {}
-            for orig, dests in delta.pop(EDGE_VAL).items():
-                slightdestd = {}
-                packdestd = {}
-                for dest, port in dests.items():
-                    slightdestd[dest] = port
-                    packdestd[dest] = concat_d(port)
-                packorigd[orig] = concat_d(packdestd)
-            packd[EDGE_VAL] = concat_d(packorigd)
-        if UNITS in delta:
-            if delta[UNITS] == NONE:
-                packd[UNITS] = concat_d({})
-                del delta[UNITS]
+    def _concat_delta(delta: SlightlyPackedDeltaType) -> bytes:
+        """Concatenate a delta with packed keys and values into msgpack bytes"""
+        buf = bytearray(map_header(len(delta)))
+        for k, v in delta.items():
+            buf += k
+            if not isinstance(v, dict):
+                buf += v
+                continue
+            if UNITS in v and v[UNITS] == NONE:
+                buf += map_header(len(v))
+                for kk, vv in v.items():
+                    buf += kk
+                    if kk == UNITS:
+                        buf += EMPTY_MAPPING
+                    elif isinstance(vv, dict):
+                        concat_into(buf, vv)
+                    else:
+                        buf += vv
             else:
-                packd[UNITS] = delta.pop(UNITS)
-        mostly_packed_delta.update(delta)
-        return concat_d(mostly_packed_delta)
+                concat_into(buf, v)
+        return bytes(buf)
 
     @prepacked
     def next_turn(self) -> Tuple[bytes, bytes]:
@@ -279,8 +236,9 @@ class EngineHandle:
         pack = self.pack
         self.debug("calling next_turn at {}, {}, {}".format(*self._real._btt()))
         ret, delta = self._real.next_turn()
-        slightly_packed_delta, packed_delta = self._pack_delta(delta)
-        return pack(ret), packed_delta
+        if self._interest is not None:
+            delta = self._interest.filter(delta)
+        return pack(ret), self._pack_delta(delta)
 
     def _get_slow_delta(
         self,
@@ -350,34 +308,17 @@ class EngineHandle:
         ):
             # This branch avoids unpacking and re-packing the delta
             slightly: SlightlyPackedDeltaType = self._real._get_slow_delta(
-                (branch_from, turn_from, tick_from), self._real._btt()
+                (branch_from, turn_from, tick_from),
+                self._real._btt(),
+                self._interest,
             )
-            mostly = {}
-            if UNIVERSAL in slightly:
-                mostly[UNIVERSAL] = concat_d(slightly.pop(UNIVERSAL))
-            if RULES in slightly:
-                mostly[RULES] = concat_d(
-                    {
-                        rule: concat_d(rule_d)
-                        for (rule, rule_d) in slightly.pop(RULES).items()
-                    }
-                )
-            if RULEBOOK in slightly:
-                mostly[RULEBOOK] = concat_d(slightly.pop(RULEBOOK))
-            for char, chardeltapacked in slightly.items():
-                if chardeltapacked == b"\xc0":
-                    mostly[char] = b"\xc0"
-                    continue
-                mostly[char] = self._concat_char_delta(chardeltapacked)
-            return NONE, concat_d(mostly)
-        return (
-            NONE,
-            self._pack_delta(
-                self._real.get_delta(
-                    (branch_from, turn_from, tick_from), self._real._btt()
-                )
-            )[1],
+            return NONE, self._concat_delta(slightly)
+        delta = self._real.get_delta(
+            (branch_from, turn_from, tick_from),
+            self._real._btt(),
+            interest=self._interest,
         )
+        return NONE, self._pack_delta(delta)
 
     @prepacked
     def increment_branch(self) -> bytes:
@@ -718,19 +659,19 @@ class EngineHandle:
         eng = self._real
         # assume the caches are all sync'd
         return {
-            "character": eng._character_rules_handled_cache.handled_deep[branch][turn],
-            "unit": eng._unit_rules_handled_cache.handled_deep[branch][turn],
-            "character_thing": eng._character_thing_rules_handled_cache.handled_deep[
-                branch
-            ][turn],
-            "character_place": eng._character_place_rules_handled_cache.handled_deep[
-                branch
-            ][turn],
-            "character_portal": eng._character_portal_rules_handled_cache.handled_deep[
-                branch
-            ][turn],
-            "node": eng._node_rules_handled_cache.handled_deep[branch][turn],
-            "portal": eng._portal_rules_handled_cache.handled_deep[branch][turn],
+            "character": eng._character_rules_handled_cache.handled_turn(branch, turn),
+            "unit": eng._unit_rules_handled_cache.handled_turn(branch, turn),
+            "character_thing": eng._character_thing_rules_handled_cache.handled_turn(
+                branch, turn
+            ),
+            "character_place": eng._character_place_rules_handled_cache.handled_turn(
+                branch, turn
+            ),
+            "character_portal": eng._character_portal_rules_handled_cache.handled_turn(
+                branch, turn
+            ),
+            "node": eng._node_rules_handled_cache.handled_turn(branch, turn),
+            "portal": eng._portal_rules_handled_cache.handled_turn(branch, turn),
         }
 
     def branches(self) -> Dict[str, Tuple[str, int, int, int, int]]:
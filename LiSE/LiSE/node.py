@@ -25,7 +25,6 @@ from collections.abc import Mapping, Set, ValuesView
 from typing import Iterator, List, Optional, Union
 
 import networkx as nx
-from networkx import shortest_path, shortest_path_length
 
 from . import rule
 from .allegedb import HistoricKeyError, Key, graph
@@ -505,8 +504,8 @@ class Node(graph.Node, rule.RuleFollower):
 
         """
 
-        return shortest_path_length(
-            self.character, self.name, self._plain_dest_name(dest), weight
+        return self.character.pathfinder(weight).shortest_path_length(
+            self.name, self._plain_dest_name(dest)
         )
 
     def shortest_path(self, dest: Union[Key, "Node"], weight: Key = None) -> List[Key]:
@@ -516,8 +515,8 @@ class Node(graph.Node, rule.RuleFollower):
         or the name of one.
 
         """
-        return shortest_path(
-            self.character, self.name, self._plain_dest_name(dest), weight
+        return self.character.pathfinder(weight).shortest_path(
+            self.name, self._plain_dest_name(dest)
         )
 
     def path_exists(self, dest: Union[Key, "Node"], weight: Key = None) -> bool:
@@ -798,54 +797,51 @@ class Thing(Node):
             raise ValueError("Paths need at least 2 nodes")
         eng = self.character.engine
         with eng.world_lock:
+            myname = self.name
+            charn = self.character.name
+            branch, turn, tick = eng._btt()
+            subpath = list(path)
             if check:
-                prevplace = path.pop(0)
-                if prevplace != self["location"]:
+                if subpath[0] != self["location"]:
                     raise ValueError("Path does not start at my present location")
-                subpath = [prevplace]
-                for place in path:
-                    if (
-                        prevplace not in self.character.portal
-                        or place not in self.character.portal[prevplace]
-                    ):
+                has_successor = eng._edges_cache.has_successor
+                for i, (orig, dest) in enumerate(zip(subpath, subpath[1:]), 1):
+                    if not has_successor(charn, orig, dest, branch, turn, tick):
                         raise TravelException(
-                            "Couldn't follow portal from {} to {}".format(
-                                prevplace, place
-                            ),
-                            path=subpath,
+                            "Couldn't follow portal from {} to {}".format(orig, dest),
+                            path=subpath[:i],
                             traveller=self,
                         )
-                    subpath.append(place)
-                    prevplace = place
-            else:
-                subpath = path.copy()
-            turns_total = 0
             prevsubplace = subpath.pop(0)
             turn_incs = []
-            myname = self.name
-            charn = self.character.name
-            branch, turn, tick = eng._btt()
-            for subplace in subpath:
-                if weight is not None:
+            if weight is None:
+                turn_incs = [1] * len(subpath)
+            else:
+                retrieve = eng._edge_val_cache.retrieve
+                for subplace in subpath:
                     turn_incs.append(
-                        self.engine._edge_val_cache.retrieve(
+                        retrieve(
                             charn,
                             prevsubplace,
                             subplace,
                             0,
+                            weight,
                             branch,
                             turn,
                             tick,
                         )
                     )
-                else:
-                    turn_incs.append(1)
-                turns_total += turn_incs[-1]
-                turn += turn_incs[-1]
-                tick = eng._turn_end_plan.get(turn, 0)
+                    prevsubplace = subplace
+            turns_total = sum(turn_incs)
+            # Make sure the caches have everything already planned for
+            # the turns I'll be moving in
+            _, start_turn, start_tick, end_turn, end_tick = eng._branches[branch]
+            turn_end_plan = eng._turn_end_plan
+            for subplace, turn_inc in zip(subpath, turn_incs):
+                turn += turn_inc
+                tick = turn_end_plan.get((branch, turn), 0)
                 if check:
                     eng._nodes_cache.retrieve(charn, subplace, branch, turn, tick)
-                _, start_turn, start_tick, end_turn, end_tick = eng._branches[branch]
                 if (
                     (start_turn < turn < end_turn)
                     or (
@@ -855,12 +851,19 @@ class Thing(Node):
                     or (end_turn == turn and tick < end_tick)
                 ):
                     eng._load_at(branch, turn, tick)
+            # Now schedule all the moves at once, skipping the time signals
+            # that ``eng.turn += turn_inc`` would send for every step
+            store = eng._things_cache.store
+            locs = []
+            turn = eng.turn  # back to the present
             with eng.plan():
                 for subplace, turn_inc in zip(subpath, turn_incs):
-                    eng.turn += turn_inc
+                    turn += turn_inc
+                    eng._set_btt(branch, turn, turn_end_plan[branch, turn])
                     branch, turn, tick = eng._nbtt()
-                    eng._things_cache.store(charn, myname, branch, turn, tick, subplace)
-                    eng.query.set_thing_loc(charn, myname, branch, turn, tick, subplace)
+                    store(charn, myname, branch, turn, tick, subplace)
+                    locs.append((charn, myname, branch, turn, tick, subplace))
+            eng.query.set_thing_locs(locs)
             return turns_total
 
     def travel_to(
@@ -892,6 +895,10 @@ class Thing(Node):
         destn = dest.name if hasattr(dest, "name") else dest
         if destn == self.location.name:
             raise ValueError("I'm already at {}".format(destn))
-        graph = self.character if graph is None else graph
-        path = nx.shortest_path(graph, self["location"], destn, weight)
+        if graph is None:
+            path = self.character.pathfinder(weight).shortest_path(
+                self["location"], destn
+            )
+        else:
+            path = nx.shortest_path(graph, self["location"], destn, weight)
         return self.follow_path(path, weight)
@@ -0,0 +1,186 @@
+# This file is part of LiSE, a framework for life simulation games.
+# Copyright (c) Zachary Spector, public@zacharyspector.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Shortest paths through a character, sped up with landmarks
+
+Searching a :class:`LiSE.character.Character` with NetworkX looks up every
+neighbor in the versioned caches, at the current time. A
+:class:`PathFinder` keeps its own copy of a character's portals instead,
+and catches it up with the changes that have happened since, whenever
+it's asked for a path.
+
+Searches are A*, with lower bounds on the remaining distance from the
+triangle inequality, given the distances to and from a few landmark
+nodes. This is the "ALT" technique of Goldberg and Harrelson.
+
+"""
+
+from heapq import heappop, heappush
+from math import inf
+from typing import Dict, List, Optional, Tuple
+
+from networkx import NetworkXNoPath, NodeNotFound
+
+from .adjacency import PortalIndex
+from .allegedb import Key
+
+
+class PathFinder(PortalIndex):
+    """Answers shortest path queries about one character
+
+    :param character: the :class:`LiSE.character.Character` to search.
+    :param weight: name of the portal stat to use as the length of each
+        portal, or ``None`` to count portals. Portals without the stat
+        have length 1, as in NetworkX.
+    :param landmarks: how many landmarks to use. More make for tighter
+        bounds, but cost more to compute when the portals change.
+
+    Getting a path at some other time than the last in the same branch
+    only applies the changes to portals made in between. If a portal
+    got added, or lighter, the landmarks' distances get computed again;
+    portals getting heavier, or deleted, can only make paths longer, so
+    the old lower bounds still hold. Anywhere else, it starts over.
+
+    """
+
+    def __init__(self, character, weight: Key = None, landmarks: int = 4):
+        super().__init__(character, weight)
+        self.landmarks = landmarks
+        self.stats["landmark_rebuilds"] = 0
+        self._from_landmarks: List[List[float]] = []
+        self._to_landmarks: List[List[float]] = []
+        self._landmarks_stale = True
+
+    def _length(self, portal) -> float:
+        length = super()._length(portal)
+        if length < 0:
+            raise ValueError(
+                f"Negative {self.weight} on portal {portal.origin.name}->"
+                f"{portal.destination.name}"
+            )
+        return length
+
+    def _portal_changed(
+        self, i: int, j: int, old: Optional[float], new: Optional[float]
+    ) -> None:
+        if new is not None and (old is None or new < old):
+            self._landmarks_stale = True
+
+    def _rebuild(self) -> None:
+        super()._rebuild()
+        self._landmarks_stale = True
+
+    def _dijkstra(self, source: int, adjacency: List[Dict[int, float]]) -> List[float]:
+        dist = [inf] * len(adjacency)
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, i = heappop(heap)
+            if d > dist[i]:
+                continue
+            for j, length in adjacency[i].items():
+                dj = d + length
+                if dj < dist[j]:
+                    dist[j] = dj
+                    heappush(heap, (dj, j))
+        return dist
+
+    def _compute_landmarks(self) -> None:
+        self.stats["landmark_rebuilds"] += 1
+        self._from_landmarks = []
+        self._to_landmarks = []
+        self._landmarks_stale = False
+        extant = [i for (i, name) in enumerate(self._names) if name is not None]
+        if not extant:
+            return
+        # farthest-first: each landmark is the node farthest from the others
+        nearest = self._dijkstra(extant[0], self._succ)
+        for _ in range(min((self.landmarks, len(extant)))):
+            landmark = max(
+                extant, key=lambda i: nearest[i] if nearest[i] < inf else -1
+            )
+            from_landmark = self._dijkstra(landmark, self._succ)
+            self._from_landmarks.append(from_landmark)
+            self._to_landmarks.append(self._dijkstra(landmark, self._pred))
+            nearest = [
+                min((a, b)) if a < inf else b for (a, b) in zip(from_landmark, nearest)
+            ]
+            nearest[landmark] = -1
+
+    def _bound(self, i: int, goal: int) -> float:
+        """A lower bound on the distance from ``i`` to ``goal``"""
+        best = 0
+        for dist in self._from_landmarks:
+            if i < len(dist) and goal < len(dist):
+                # d(L, goal) <= d(L, i) + d(i, goal)
+                if dist[goal] < inf and dist[i] < inf and dist[goal] - dist[i] > best:
+                    best = dist[goal] - dist[i]
+        for dist in self._to_landmarks:
+            if i < len(dist) and goal < len(dist):
+                # d(i, L) <= d(i, goal) + d(goal, L)
+                if dist[i] < inf and dist[goal] < inf and dist[i] - dist[goal] > best:
+                    best = dist[i] - dist[goal]
+        return best
+
+    def _search(self, orig: Key, dest: Key) -> Tuple[float, List[Key]]:
+        self._catch_up()
+        index = self._index
+        for node in (orig, dest):
+            if node not in index:
+                raise NodeNotFound(f"{node} not in {self.character.name}")
+        if self._landmarks_stale:
+            self._compute_landmarks()
+        start = index[orig]
+        goal = index[dest]
+        succ = self._succ
+        bound = self._bound
+        dist = {start: 0}
+        came_from = {}
+        closed = set()
+        heap = [(bound(start, goal), 0, start)]
+        while heap:
+            _, d, i = heappop(heap)
+            if i == goal:
+                path = [self._names[i]]
+                while i in came_from:
+                    i = came_from[i]
+                    path.append(self._names[i])
+                path.reverse()
+                return d, path
+            if i in closed:
+                continue
+            closed.add(i)
+            for j, length in succ[i].items():
+                dj = d + length
+                if j not in dist or dj < dist[j]:
+                    dist[j] = dj
+                    came_from[j] = i
+                    heappush(heap, (dj + bound(j, goal), dj, j))
+        raise NetworkXNoPath(f"No path from {orig} to {dest}")
+
+    def shortest_path(self, orig: Key, dest: Key) -> List[Key]:
+        """Return a list of node names leading from ``orig`` to ``dest``
+
+        Raise ``networkx.NetworkXNoPath`` if there isn't one.
+
+        """
+        return self._search(orig, dest)[1]
+
+    def shortest_path_length(self, orig: Key, dest: Key) -> float:
+        """Return the length of the shortest path from ``orig`` to ``dest``
+
+        Raise ``networkx.NetworkXNoPath`` if there isn't one.
+
+        """
+        return self._search(orig, dest)[0]
@@ -376,8 +376,8 @@ class PlaceProxy(NodeProxy):
     def _apply_delta(self, delta):
         for k, v in delta.items():
             if k == "rulebook":
-                if k != self.rulebook.name:
-                    self._set_rulebook_proxy(k)
+                if v != self.rulebook.name:
+                    self._set_rulebook_proxy(v)
                     self.send(self, key="rulebook", value=v)
                     self.character.place.send(self, key="rulebook", value=v)
                     self.character.node.send(self, key="rulebook", value=v)
@@ -444,7 +444,7 @@ class ThingProxy(NodeProxy):
         for k, v in delta.items():
             if k == "rulebook":
                 if v != self.rulebook.name:
-                    self._set_rulebook_proxy(k)
+                    self._set_rulebook_proxy(v)
                     self.send(self, key="rulebook", value=v)
                     self.character.thing.send(self, key="rulebook", value=v)
                     self.character.node.send(self, key="rulebook", value=v)
@@ -500,7 +500,7 @@ class ThingProxy(NodeProxy):
             raise WorkerProcessReadOnlyError(
                 "Tried to change the world state in a worker process"
             )
-        self.engine.handle(
+        return self.engine.handle(
             command="thing_follow_path",
             char=self._charname,
             thing=self.name,
@@ -570,8 +570,8 @@ class PortalProxy(CachingEntityProxy):
     def _apply_delta(self, delta):
         for k, v in delta.items():
             if k == "rulebook":
-                if k != self.rulebook.name:
-                    self._set_rulebook_proxy(k)
+                if v != self.rulebook.name:
+                    self._set_rulebook_proxy(v)
                 continue
             if v is None:
                 if k in self._cache:
@@ -1210,8 +1210,8 @@ class CharStatProxy(CachingEntityProxy):
     def _apply_delta(self, delta):
         for k, v in delta.items():
             if k == "rulebook":
-                if k != self.rulebook.name:
-                    self._set_rulebook_proxy(k)
+                if v != self.rulebook.name:
+                    self._set_rulebook_proxy(v)
                 continue
             if v is None:
                 if k in self._cache:
@@ -1611,6 +1611,7 @@ class CharacterProxy(AbstractCharacter):
         for node, nodedelta in delta.pop("node_val", {}).items():
             if node not in nodemap or node not in node_stat_cache[name]:
                 rulebook = nodedelta.pop("rulebook", None)
+                nodedelta.pop("location", None)
                 node_stat_cache[name][node] = nodedelta
                 if rulebook:
                     nodemap[node]._set_rulebook_proxy(rulebook)
@@ -2404,6 +2405,19 @@ class EngineProxy(AbstractEngine):
     place_cls = PlaceProxy
     portal_cls = PortalProxy
     time = TimeDescriptor()
+    # Commands that only read the world. Their answers get remembered
+    # until the time changes, or anything else gets sent to the core.
+    _query_commands = frozenset(
+        {
+            "branches",
+            "get_language",
+            "get_source",
+            "get_string_lang_items",
+            "main_branch",
+            "node_exists",
+            "rules_handled_turn",
+        }
+    )
 
     @property
     def main_branch(self) -> str:
@@ -2416,6 +2430,25 @@ class EngineProxy(AbstractEngine):
             )
         return self.handle("snap_keyframe")
 
+    def set_interest(self, characters=None, stats=None, kinds=None) -> None:
+        """Only receive some parts of the world in deltas from the core
+
+        Arguments are as for :class:`LiSE.engine.DeltaInterest`. Leave them
+        all ``None`` to receive everything again. Proxies for the parts
+        left out won't update when the time changes.
+
+        """
+        if self._worker:
+            raise WorkerProcessReadOnlyError(
+                "Workers get their interests set by the core"
+            )
+        self.handle(
+            "set_interest",
+            characters=None if characters is None else list(characters),
+            stats=None if stats is None else list(stats),
+            kinds=None if kinds is None else list(kinds),
+        )
+
     def game_init(self) -> None:
         if self._worker:
             raise WorkerProcessReadOnlyError(
@@ -2458,167 +2491,191 @@ class EngineProxy(AbstractEngine):
         self._replace_state_with_kf(kf)
 
     def _replace_state_with_kf(self, result, **kwargs):
-        things = self._things_cache
-        places = self._character_places_cache
+        """Make my caches match a keyframe
+
+        Only what's different from what I have gets changed, so existing
+        proxy objects are kept, and signals only go out for real changes.
 
-        portals = self._character_portals_cache
+        """
         if result is None:
             self._char_cache = {}
             self._universal_cache = {}
             return
-        self._universal_cache = result["universal"]
-        rc = self._rules_cache = {}
-        for rule, triggers in result["triggers"].items():
-            if rule in rc:
-                rc[rule]["triggers"] = list(triggers)
-            else:
-                rc[rule] = {
-                    "triggers": list(triggers),
-                    "prereqs": [],
-                    "actions": [],
-                }
-        for rule, prereqs in result["prereqs"].items():
-            if rule in rc:
-                rc[rule]["prereqs"] = list(prereqs)
-            else:
-                rc[rule] = {
-                    "triggers": [],
-                    "prereqs": list(prereqs),
-                    "actions": [],
-                }
-        for rule, actions in result["actions"].items():
-            if rule in rc:
-                rc[rule]["actions"] = list(actions)
-            else:
-                rc[rule] = {
-                    "triggers": [],
-                    "prereqs": [],
-                    "actions": list(actions),
-                }
-        self._char_cache = chars = {
-            graph: (
-                CharacterProxy(self, graph)
-                if (graph not in self._char_cache)
-                else self._char_cache[graph]
-            )
-            for graph in (
-                result["graph_val"].keys()
-                | result["nodes"].keys()
-                | result["node_val"].keys()
-                | result["edges"].keys()
-                | result["edge_val"].keys()
-                | self._char_cache.keys()
-            )
+        delta = {}
+        universal = result["universal"]
+        old_universal = self._universal_cache
+        delta["universal"] = univ_delta = {
+            k: None for k in old_universal.keys() - universal.keys()
         }
-        for graph, stats in result["graph_val"].items():
-            if "character_rulebook" in stats:
-                chars[graph]._set_rulebook_proxy(stats.pop("character_rulebook"))
-            if "unit_rulebook" in stats:
-                chars[graph].unit._set_rulebook_proxy(stats.pop("unit_rulebook"))
-            if "character_thing_rulebook" in stats:
-                chars[graph].thing._set_rulebook_proxy(
-                    stats.pop("character_thing_rulebook")
-                )
-            if "character_place_rulebook" in stats:
-                chars[graph].place._set_rulebook_proxy(
-                    stats.pop("character_place_rulebook")
+        for k, v in universal.items():
+            if k not in old_universal or old_universal[k] != v:
+                univ_delta[k] = v
+        rules = {}
+        for field in ("triggers", "prereqs", "actions"):
+            for rule, funcs in result[field].items():
+                if rule not in rules:
+                    rules[rule] = {"triggers": [], "prereqs": [], "actions": []}
+                rules[rule][field] = list(funcs)
+        rules_cache = self._rules_cache
+        for rule in rules_cache.keys() - rules.keys():
+            del rules_cache[rule]
+        delta["rules"] = {
+            rule: funcs
+            for (rule, funcs) in rules.items()
+            if rules_cache.get(rule) != funcs
+        }
+        rulebooks = result["rulebook"]
+        rulebooks_cache = self._rulebooks_cache
+        for rulebook in rulebooks_cache.keys() - rulebooks.keys():
+            del rulebooks_cache[rulebook]
+        delta["rulebooks"] = {
+            rulebook: content
+            for (rulebook, content) in rulebooks.items()
+            if rulebooks_cache.get(rulebook) != content
+        }
+        kf_chars = (
+            result["graph_val"].keys()
+            | result["nodes"].keys()
+            | result["node_val"].keys()
+            | result["edges"].keys()
+            | result["edge_val"].keys()
+        )
+        for char in self._char_cache.keys() - kf_chars:
+            delta[char] = None
+        for char in kf_chars:
+            delta[char] = self._get_kf_char_delta(char, result)
+        self._upd_caches(None, None, None, None, (None, delta))
+
+    _kf_rulebook_kinds = {
+        "character_rulebook": "character",
+        "unit_rulebook": "unit",
+        "character_thing_rulebook": "thing",
+        "character_place_rulebook": "place",
+        "character_portal_rulebook": "portal",
+    }
+
+    @staticmethod
+    def _get_stats_delta(old: dict, new: dict, fixed=()) -> dict:
+        ret = {k: None for k in old.keys() - new.keys() if k not in fixed}
+        for k, v in new.items():
+            if k not in old or old[k] != v:
+                ret[k] = v
+        return ret
+
+    def _get_kf_char_delta(self, char, result) -> dict:
+        """Return a delta that makes one character match a keyframe
+
+        Things that turned into places, or the other way, get deleted here
+        so that the delta can make them again.
+
+        """
+        get_stats_delta = self._get_stats_delta
+        stats = dict(result["graph_val"].get(char, {}))
+        self._character_units_cache[char] = stats.pop("units", {})
+        rulebooks = {
+            kind: stats.pop(key)
+            for (key, kind) in self._kf_rulebook_kinds.items()
+            if key in stats
+        }
+        if char in self._char_stat_cache:
+            chardelta = get_stats_delta(self._char_stat_cache[char], stats)
+        else:
+            chardelta = stats
+        if rulebooks:
+            chardelta["rulebooks"] = rulebooks
+        things = self._things_cache.get(char, {})
+        places = self._character_places_cache.get(char, {})
+        node_stat_cache = self._node_stat_cache[char]
+        kf_nodes = result["nodes"].get(char, {})
+        kf_node_val = result["node_val"].get(char, {})
+        nodes_delta = {}
+        node_val_delta = {}
+        for node in (things.keys() | places.keys()) - kf_nodes.keys():
+            nodes_delta[node] = False
+        for node, ex in kf_nodes.items():
+            if not ex:
+                if node in things or node in places:
+                    nodes_delta[node] = False
+                continue
+            nodestats = kf_node_val.get(node, {})
+            thing = things.get(node)
+            if thing is not None and "location" in nodestats:
+                nodestats = dict(nodestats)
+                location = nodestats.pop("location")
+                nodedelta = get_stats_delta(
+                    node_stat_cache[node], nodestats, ("location", "rulebook")
                 )
-            if "character_portal_rulebook" in stats:
-                chars[graph].portal._set_rulebook_proxy(
-                    stats.pop("character_portal_rulebook")
+                if location != thing._location:
+                    nodedelta["location"] = location
+                if "rulebook" in nodedelta and (
+                    nodedelta["rulebook"] is None
+                    or nodedelta["rulebook"] == thing.rulebook.name
+                ):
+                    del nodedelta["rulebook"]
+            elif node in places and "location" not in nodestats:
+                nodedelta = get_stats_delta(
+                    node_stat_cache[node], nodestats, ("rulebook",)
                 )
-            if "units" in stats:
-                self._character_units_cache[graph] = stats.pop("units")
+                if "rulebook" in nodedelta and (
+                    nodedelta["rulebook"] is None
+                    or nodedelta["rulebook"] == places[node].rulebook.name
+                ):
+                    del nodedelta["rulebook"]
             else:
-                self._character_units_cache[graph] = {}
-            for key in list(stats):
-                if key in chars[graph].stat and stats[key] == chars[graph].stat[key]:
-                    del stats[key]
-            chars[graph].stat._apply_delta(stats)
-        for char, nodestats in result["node_val"].items():
-            for node, stats in nodestats.items():
-                if "location" in stats:
-                    if char not in things or node not in things[char]:
-                        that = things[char][node] = ThingProxy(
-                            chars[char], node, stats.pop("location")
-                        )
-                    else:
-                        that = things[char][node]
-                        that._location = stats.pop("location")
-                        that.send(that, key="location", value=that._location)
-                        chars[char].thing.send(
-                            that, key="location", value=that._location
-                        )
-                        chars[char].node.send(
-                            that, key="location", value=that._location
-                        )
-                    if char in places and node in places[char]:
-                        del places[char][node]
-                else:
-                    if char not in places or node not in places[char]:
-                        that = PlaceProxy(chars[char], node)
-                        places[char][node] = that
-                    else:
-                        that = places[char][node]
-                    if char in things and node in things[char]:
-                        del things[char][node]
-                for key in list(stats):
-                    if key in that and stats[key] == that[key]:
-                        del stats[key]
-                that._apply_delta(stats)
-        for char, nodes in result["nodes"].items():
-            for node, ex in nodes.items():
-                if ex:
-                    if not (
-                        (char in things and node in things[char])
-                        or (char in places and node in places[char])
+                if thing is not None or node in places:
+                    self._char_cache[char]._apply_delta({"nodes": {node: False}})
+                nodes_delta[node] = True
+                node_stat_cache.pop(node, None)
+                nodedelta = dict(nodestats)
+            if nodedelta:
+                node_val_delta[node] = nodedelta
+        for node, ex in nodes_delta.items():
+            if not ex:
+                node_stat_cache.pop(node, None)
+        portals = self._character_portals_cache.successors.get(char, {})
+        portal_stat_cache = self._portal_stat_cache[char]
+        kf_edges = result["edges"].get(char, {})
+        kf_edge_val = result["edge_val"].get(char, {})
+        edges_delta = {}
+        edge_val_delta = {}
+        for orig, dests in portals.items():
+            kf_dests = kf_edges.get(orig, {})
+            for dest in dests:
+                if not kf_dests.get(dest):
+                    edges_delta.setdefault(orig, {})[dest] = False
+                    if orig in portal_stat_cache:
+                        portal_stat_cache[orig].pop(dest, None)
+        for orig, dests in kf_edges.items():
+            kf_dests = kf_edge_val.get(orig, {})
+            old_dests = portals.get(orig, {})
+            for dest, ex in dests.items():
+                if not ex:
+                    continue
+                portstats = kf_dests.get(dest, {})
+                if dest in old_dests:
+                    portdelta = get_stats_delta(
+                        portal_stat_cache[orig][dest], portstats, ("rulebook",)
+                    )
+                    if "rulebook" in portdelta and (
+                        portdelta["rulebook"] is None
+                        or portdelta["rulebook"] == old_dests[dest].rulebook.name
                     ):
-                        places[char][node] = PlaceProxy(chars[char], node)
-                        chars[char].place.send(
-                            chars[char], key=node, value=places[char][node]
-                        )
+                        del portdelta["rulebook"]
                 else:
-                    if char in things and node in things[char]:
-                        del things[char][node]
-                        chars[char].thing.send(chars[char], key=node, value=None)
-                        chars[char].node.send(chars[char], key=node, value=None)
-                    if char in places and node in places[char]:
-                        del places[char][node]
-                        chars[char].place.send(chars[char], key=node, value=None)
-                        chars[char].node.send(chars[char], key=node, value=None)
-        for char, origs in result["edges"].items():
-            for orig, dests in origs.items():
-                for dest, exists in dests.items():
-                    if (
-                        char in portals.successors
-                        and orig in portals.successors[char]
-                        and dest in portals.successors[char][orig]
-                    ):
-                        if not exists:
-                            del portals.successors[char][orig][dest]
-                            del portals.predecessors[char][dest][orig]
-                            chars[char].adj.send(
-                                chars[char], orig=orig, dest=dest, value=None
-                            )
-                            chars[char].pred.send(
-                                chars[char], orig=orig, dest=dest, value=None
-                            )
-                        continue
-                    if not exists:
-                        continue
-                    that = PortalProxy(chars[char], orig, dest)
-                    portals.store(char, orig, dest, that)
-                    chars[char].adj.send(chars[char], orig=orig, dest=dest, value=that)
-                    chars[char].pred.send(chars[char], orig=orig, dest=dest, value=that)
-        for char, origs in result["edge_val"].items():
-            for orig, dests in origs.items():
-                for dest, stats in dests.items():
-                    portal = portals.successors[char][orig][dest]
-                    for stat in list(stats):
-                        if stat in portal and stats[stat] == portal[stat]:
-                            del stats[stat]
-                    portal._apply_delta(stats)
-        self._rulebooks_cache = result["rulebook"]
+                    edges_delta.setdefault(orig, {})[dest] = True
+                    portal_stat_cache[orig].pop(dest, None)
+                    portdelta = dict(portstats)
+                if portdelta:
+                    edge_val_delta.setdefault(orig, {})[dest] = portdelta
+        if nodes_delta:
+            chardelta["nodes"] = nodes_delta
+        if node_val_delta:
+            chardelta["node_val"] = node_val_delta
+        if edges_delta:
+            chardelta["edges"] = edges_delta
+        if edge_val_delta:
+            chardelta["edge_val"] = edge_val_delta
+        return chardelta
 
     def _pull_kf_now(self, *args, **kwargs):
         self._replace_state_with_kf(self.handle("snap_keyframe"))
@@ -2728,6 +2785,12 @@ class EngineProxy(AbstractEngine):
         self._rule_obj_cache = {}
         self._rulebook_obj_cache = {}
         self._char_cache = {}
+        self._universal_cache = {}
+        self._rules_cache = {}
+        self._rulebooks_cache = {}
+        self._changes = 0
+        self._query_memo = {}
+        self._query_memo_version = None
         if prefix is None:
             self.send_bytes(self.pack({"command": "get_btt"}))
             received = self.unpack(self.recv_bytes())
@@ -2818,6 +2881,10 @@ class EngineProxy(AbstractEngine):
         ``turn``, and ``tick``, possibly different than when you called
         ``handle``.`.
 
+        Commands that only read the world, without a ``cb``, are answered
+        from memory if I've asked the same thing since I last changed the
+        world or the time.
+
         """
         if self._worker:
             return
@@ -2830,11 +2897,27 @@ class EngineProxy(AbstractEngine):
         else:
             raise TypeError("No command")
         assert not kwargs.get("silent")
+        memo_key = None
+        if cb is None and cmd in self._query_commands:
+            memo_key = frozenset(kwargs.items())
+            try:
+                hash(memo_key)
+            except TypeError:
+                memo_key = None
+            else:
+                if (
+                    memo_key in self._query_memo
+                    and self._query_memo_version == self._version()
+                ):
+                    return self._query_memo[memo_key]
         self.debug(f"EngineProxy: sending {cmd}")
         start_ts = monotonic()
         with self._round_trip_lock:
+            version = self._version()
             self.send_bytes(self.pack(kwargs))
             received = self.recv_bytes()
+            if memo_key is None:
+                self._changes += 1
         command, branch, turn, tick, r = self.unpack(received)
         self.debug(
             "EngineProxy: received {} in {:,.2f} seconds".format(
@@ -2854,6 +2937,11 @@ class EngineProxy(AbstractEngine):
             )
         if cb:
             cb(command=command, branch=branch, turn=turn, tick=tick, result=r)
+        if memo_key is not None and self._version() == version:
+            if self._query_memo_version != version:
+                self._query_memo = {}
+                self._query_memo_version = version
+            self._query_memo[memo_key] = r
         return r
 
     def _unpack_recv(self):
@@ -2927,6 +3015,7 @@ class EngineProxy(AbstractEngine):
         return received
 
     def _upd_caches(self, command, branch, turn, tick, result):
+        self._changes += 1
         result, deltas = result
         self.eternal._update_cache(deltas.pop("eternal", {}))
         self.universal._update_cache(deltas.pop("universal", {}))
@@ -2964,10 +3053,28 @@ class EngineProxy(AbstractEngine):
             chara._apply_delta(chardelta)
         for char in to_delete & self._char_cache.keys():
             del self._char_cache[char]
+            for cache in (
+                self._char_stat_cache,
+                self._character_places_cache,
+                self._things_cache,
+                self._node_stat_cache,
+                self._portal_stat_cache,
+            ):
+                cache.pop(char, None)
+            self._character_portals_cache.delete_char(char)
 
     def _btt(self):
         return self._branch, self._turn, self._tick
 
+    def _version(self) -> Tuple[str, int, int, int]:
+        """Return the time, and how many changes I've made to the world
+
+        Answers to queries are only good for the version they were
+        asked in.
+
+        """
+        return self._branch, self._turn, self._tick, self._changes
+
     def _set_time(self, command, branch, turn, tick, result, **kwargs):
         self._branch = branch
         self._turn = turn
@@ -3181,6 +3288,32 @@ class EngineProxy(AbstractEngine):
                 yield thing.name
 
 
+def pack_result(engine_handle, cmd: str, r) -> bytes:
+    """Pack the value returned by a method of :class:`EngineHandle`
+
+    Methods marked ``prepacked`` return bytes, or containers of bytes,
+    which only need concatenating.
+
+    """
+    if not hasattr(getattr(engine_handle, cmd), "prepacked"):
+        return engine_handle.pack(r)
+    if isinstance(r, dict):
+        resp = msgpack.Packer().pack_map_header(len(r))
+        for k, v in r.items():
+            resp += k + v
+        return resp
+    elif isinstance(r, tuple):
+        pacr = msgpack.Packer()
+        pacr.pack_ext_type(
+            MsgpackExtensionType.tuple.value,
+            msgpack.Packer().pack_array_header(len(r)) + b"".join(r),
+        )
+        return pacr.bytes()
+    elif isinstance(r, list):
+        return msgpack.Packer().pack_array_header(len(r)) + b"".join(r)
+    return r
+
+
 def engine_subprocess(args, kwargs, input_pipe, output_pipe, logq, loglevel):
     """Loop to handle one command at a time and pipe results back"""
     from .handle import EngineHandle
@@ -3242,24 +3375,7 @@ def engine_subprocess(args, kwargs, input_pipe, output_pipe, logq, loglevel):
             + pack(engine_handle._real.turn)
             + pack(engine_handle._real.tick)
         )
-        if hasattr(getattr(engine_handle, cmd), "prepacked"):
-            if isinstance(r, dict):
-                resp += msgpack.Packer().pack_map_header(len(r))
-                for k, v in r.items():
-                    resp += k + v
-            elif isinstance(r, tuple):
-                pacr = msgpack.Packer()
-                pacr.pack_ext_type(
-                    MsgpackExtensionType.tuple.value,
-                    msgpack.Packer().pack_array_header(len(r)) + b"".join(r),
-                )
-                resp += pacr.bytes()
-            elif isinstance(r, list):
-                resp += msgpack.Packer().pack_array_header(len(r)) + b"".join(r)
-            else:
-                resp += r
-        else:
-            resp += pack(r)
+        resp += pack_result(engine_handle, cmd, r)
         output_pipe.send_bytes(compress(resp))
         if hasattr(engine_handle, "_after_ret"):
             engine_handle._after_ret()
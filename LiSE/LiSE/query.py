@@ -36,6 +36,7 @@ Other comparison operators like ``>`` and ``<`` work as well.
 """
 
 import operator
+import zlib
 from collections import defaultdict
 from collections.abc import Sequence, Set
 from functools import partialmethod
@@ -1077,6 +1078,7 @@ class ConnectionHolder(query.ConnectionHolder):
             "character_portal_rules_handled",
             "node_rules_handled",
             "portal_rules_handled",
+            "rules_handled",
             "rule_triggers",
             "rule_prereqs",
             "rule_actions",
@@ -1140,6 +1142,7 @@ class QueryEngine(query.QueryEngine):
         "character_thing_rules_handled",
         "character_place_rules_handled",
         "character_portal_rules_handled",
+        "rules_handled",
         "turns_completed",
     )
     kf_interval_override: callable
@@ -1151,13 +1154,7 @@ class QueryEngine(query.QueryEngine):
         self.keyframe_interval = None
         self.snap_keyframe = lambda: None
         self._new_keyframe_extensions = []
-        self._char_rules_handled = []
-        self._unit_rules_handled = []
-        self._char_thing_rules_handled = []
-        self._char_place_rules_handled = []
-        self._char_portal_rules_handled = []
-        self._node_rules_handled = []
-        self._portal_rules_handled = []
+        self._rules_handled = {}
         self._unitness = []
         self._location = []
 
@@ -1561,14 +1558,16 @@ class QueryEngine(query.QueryEngine):
             (branch, turn, tick, pack(universal), pack(rules), pack(rulebooks))
         )
 
-    def _increc(self):
-        self._records += 1
-        override = self.kf_interval_override()
+    def _increc(self, n: int = 1):
+        records_before = self._records
+        self._records += n
+        override = self.kf_interval_override(n)
         if override is True:
             return
         if override is False or (
             self.keyframe_interval is not None
-            and self._records % self.keyframe_interval == 0
+            and self._records // self.keyframe_interval
+            != records_before // self.keyframe_interval
         ):
             self.snap_keyframe()
 
@@ -1640,27 +1639,19 @@ class QueryEngine(query.QueryEngine):
             )
             put(("silent", "many", "things_insert", self._location))
             self._location = []
-        for attr, cmd in [
-            ("_char_rules_handled", "character_rules_handled_insert"),
-            ("_unit_rules_handled", "unit_rules_handled_insert"),
-            (
-                "_char_thing_rules_handled",
-                "character_thing_rules_handled_insert",
-            ),
-            (
-                "_char_place_rules_handled",
-                "character_place_rules_handled_insert",
-            ),
-            (
-                "_char_portal_rules_handled",
-                "character_portal_rules_handled_insert",
-            ),
-            ("_node_rules_handled", "_node_rules_handled_insert"),
-            ("_portal_rules_handled", "portal_rules_handled_insert"),
-        ]:
-            if getattr(self, attr):
-                put(("silent", "many", cmd, getattr(self, attr)))
-            setattr(self, attr, [])
+        if self._rules_handled:
+            put(
+                (
+                    "silent",
+                    "many",
+                    "rules_handled_insert",
+                    [
+                        self._pack_rules_handled(*key, *handled)
+                        for (key, handled) in self._rules_handled.items()
+                    ],
+                )
+            )
+            self._rules_handled = {}
 
     def keyframe_extensions_dump(self):
         unpack = self.unpack
@@ -2320,119 +2311,139 @@ class QueryEngine(query.QueryEngine):
         )
         self._increc()
 
-    def handled_character_rule(self, character, rulebook, rule, branch, turn, tick):
-        (character, rulebook) = map(self.pack, (character, rulebook))
-        self._char_rules_handled.append((character, rulebook, rule, branch, turn, tick))
+    def handled_rule(self, kind, entity, rulebook, rule, branch, turn, tick):
+        """Record that ``rule`` was handled for ``entity`` at the given time
+
+        ``kind`` is the type of rulebook, such as ``'character'`` or
+        ``'node'``. ``entity`` is a tuple identifying whatever followed
+        the rulebook.
+
+        Rules handled in the same rulebook during the same turn get
+        written together, as one row of the ``rules_handled`` table.
+
+        """
+        key = (kind, rulebook, branch, turn)
+        if key in self._rules_handled:
+            entities, rules, ticks = self._rules_handled[key]
+        else:
+            entities, rules, ticks = self._rules_handled[key] = ([], [], [])
+        entities.append(entity)
+        rules.append(rule)
+        ticks.append(tick)
         self._increc()
 
-    def _flush_char_rules_handled(self):
-        if not self._char_rules_handled:
-            return
-        self.call_many("character_rules_handled_insert", self._char_rules_handled)
-        self._char_rules_handled = []
+    def handled_character_rule(self, character, rulebook, rule, branch, turn, tick):
+        self.handled_rule(
+            "character", (character,), rulebook, rule, branch, turn, tick
+        )
 
     def handled_unit_rule(
         self, character, rulebook, rule, graph, unit, branch, turn, tick
     ):
-        character, graph, unit, rulebook = map(
-            self.pack, (character, graph, unit, rulebook)
-        )
-        self._unit_rules_handled.append(
-            (character, graph, unit, rulebook, rule, branch, turn, tick)
+        self.handled_rule(
+            "unit", (character, graph, unit), rulebook, rule, branch, turn, tick
         )
-        self._increc()
-
-    def _flush_unit_rules_handled(self):
-        if not self._unit_rules_handled:
-            return
-        self.call_many("unit_rules_handled_insert", self._unit_rules_handled)
-        self._unit_rules_handled = []
 
     def handled_character_thing_rule(
         self, character, rulebook, rule, thing, branch, turn, tick
     ):
-        character, thing, rulebook = map(self.pack, (character, thing, rulebook))
-        self._char_thing_rules_handled.append(
-            (character, thing, rulebook, rule, branch, turn, tick)
-        )
-        self._increc()
-
-    def _flush_char_thing_rules_handled(self):
-        if not self._char_thing_rules_handled:
-            return
-        self.call_many(
-            "character_thing_rules_handled_insert",
-            self._char_thing_rules_handled,
+        self.handled_rule(
+            "character_thing",
+            (character, thing),
+            rulebook,
+            rule,
+            branch,
+            turn,
+            tick,
         )
-        self._char_thing_rules_handled = []
 
     def handled_character_place_rule(
         self, character, rulebook, rule, place, branch, turn, tick
     ):
-        character, rulebook, place = map(self.pack, (character, rulebook, place))
-        self._char_place_rules_handled.append(
-            (character, place, rulebook, rule, branch, turn, tick)
-        )
-        self._increc()
-
-    def _flush_char_place_rules_handled(self):
-        if not self._char_place_rules_handled:
-            return
-        self.call_many(
-            "character_place_rules_handled_insert",
-            self._char_place_rules_handled,
+        self.handled_rule(
+            "character_place",
+            (character, place),
+            rulebook,
+            rule,
+            branch,
+            turn,
+            tick,
         )
-        self._char_place_rules_handled = []
 
     def handled_character_portal_rule(
-        self, character, rulebook, rule, orig, dest, branch, turn, tick
+        self, character, orig, dest, rulebook, rule, branch, turn, tick
     ):
-        character, rulebook, orig, dest = map(
-            self.pack, (character, rulebook, orig, dest)
-        )
-        self._char_portal_rules_handled.append(
-            (character, orig, dest, rulebook, rule, branch, turn, tick)
-        )
-        self._increc()
-
-    def _flush_char_portal_rules_handled(self):
-        if not self._char_portal_rules_handled:
-            return
-        self.call_many(
-            "character_portal_rules_handled_insert",
-            self._char_portal_rules_handled,
+        self.handled_rule(
+            "character_portal",
+            (character, orig, dest),
+            rulebook,
+            rule,
+            branch,
+            turn,
+            tick,
         )
-        self._char_portal_rules_handled = []
 
     def handled_node_rule(self, character, node, rulebook, rule, branch, turn, tick):
-        (character, node, rulebook) = map(self.pack, (character, node, rulebook))
-        self._node_rules_handled.append(
-            (character, node, rulebook, rule, branch, turn, tick)
+        self.handled_rule(
+            "node", (character, node), rulebook, rule, branch, turn, tick
         )
-        self._increc()
-
-    def _flush_node_rules_handled(self):
-        if not self._node_rules_handled:
-            return
-        self.call_many("node_rules_handled_insert", self._node_rules_handled)
-        self._node_rules_handled = []
 
     def handled_portal_rule(
         self, character, orig, dest, rulebook, rule, branch, turn, tick
     ):
-        (character, orig, dest, rulebook) = map(
-            self.pack, (character, orig, dest, rulebook)
+        self.handled_rule(
+            "portal", (character, orig, dest), rulebook, rule, branch, turn, tick
         )
-        self._portal_rules_handled.append(
-            (character, orig, dest, rulebook, rule, branch, turn, tick)
+
+    def _pack_rules_handled(self, kind, rulebook, branch, turn, entities, rules, ticks):
+        order = sorted(range(len(ticks)), key=ticks.__getitem__)
+        rule_names = list(dict.fromkeys(rules))
+        rule_ids = {rule: i for (i, rule) in enumerate(rule_names)}
+        start = prev = ticks[order[0]]
+        tick_deltas = []
+        for i in order:
+            tick_deltas.append(ticks[i] - prev)
+            prev = ticks[i]
+        handled = zlib.compress(
+            self.pack(
+                [
+                    rule_names,
+                    [list(entities[i]) for i in order],
+                    [rule_ids[rules[i]] for i in order],
+                    tick_deltas,
+                ]
+            )
         )
-        self._increc()
+        return kind, self.pack(rulebook), branch, turn, start, handled
 
-    def _flush_portal_rules_handled(self):
-        if not self._portal_rules_handled:
-            return
-        self.call_many("portal_rules_handled_insert", self._portal_rules_handled)
-        self._portal_rules_handled = []
+    def rules_handled_dump(self):
+        """Iterate over ``(kind, row)`` pairs, one for each rule handled
+
+        Each ``row`` is like those from :meth:`node_rules_handled_dump`
+        and its ilk: the entity's key, then the rulebook, rule, branch,
+        turn, and tick.
+
+        """
+        return self.unpack_rules_handled(self.call_one("rules_handled_dump"))
+
+    def unpack_rules_handled(self, rows):
+        """Decode rows of the ``rules_handled`` table
+
+        Yields ``(kind, row)`` pairs, like :meth:`rules_handled_dump`.
+
+        """
+        unpack = self.unpack
+        for kind, rulebook, branch, turn, tick, handled in rows:
+            rulebook = unpack(rulebook)
+            rule_names, entities, rule_ids, tick_deltas = unpack(
+                zlib.decompress(handled)
+            )
+            for entity, rule_id, delta in zip(entities, rule_ids, tick_deltas):
+                tick += delta
+                yield (
+                    kind,
+                    (*entity, rulebook, rule_names[rule_id], branch, turn, tick),
+                )
 
     def get_rulebook_char(self, rulemap, character):
         character = self.pack(character)
@@ -2441,13 +2452,21 @@ class QueryEngine(query.QueryEngine):
         raise KeyError("No rulebook")
 
     def set_thing_loc(self, character, thing, branch, turn, tick, loc):
-        (character, thing) = map(self.pack, (character, thing))
-        loc = self.pack(loc)
+        (character, thing, loc) = map(self.pack_key, (character, thing, loc))
         self._location.append((character, thing, branch, turn, tick, loc))
         self._increc()
 
+    def set_thing_locs(self, locs: List[Tuple[Key, Key, str, int, int, Key]]):
+        """Like ``set_thing_loc``, for many rows at once"""
+        pack_key = self.pack_key
+        self._location.extend(
+            (pack_key(character), pack_key(thing), branch, turn, tick, pack_key(loc))
+            for (character, thing, branch, turn, tick, loc) in locs
+        )
+        self._increc(len(locs))
+
     def unit_set(self, character, graph, node, branch, turn, tick, isav):
-        (character, graph, node) = map(self.pack, (character, graph, node))
+        (character, graph, node) = map(self.pack_key, (character, graph, node))
         self._unitness.append((character, graph, node, branch, turn, tick, isav))
         self._increc()
 
@@ -2488,10 +2507,4 @@ class QueryEngine(query.QueryEngine):
             self.call_one("turns_completed_update", turn, branch)
         self._increc()
         if discard_rules:
-            self._char_rules_handled = []
-            self._unit_rules_handled = []
-            self._char_thing_rules_handled = []
-            self._char_place_rules_handled = []
-            self._char_portal_rules_handled = []
-            self._node_rules_handled = []
-            self._portal_rules_handled = []
+            self._rules_handled = {}
@@ -413,9 +413,19 @@ class Rule:
     def __repr__(self):
         return "Rule({})".format(self.name)
 
-    def trigger(self, fun):
-        """Decorator to append the function to my triggers list."""
+    def trigger(self, fun=None, *, pure=False):
+        """Decorator to append the function to my triggers list.
+
+        Use it as ``@rule.trigger(pure=True)`` to declare that the trigger
+        depends only on the stats it looks up, so its result may be reused.
+        See :meth:`LiSE.Engine.set_trigger_pure`.
+
+        """
+        if fun is None:
+            return partial(self.trigger, pure=pure)
         self.triggers.append(fun)
+        if pure:
+            self.engine.set_trigger_pure(fun)
         return fun
 
     def prereq(self, fun):
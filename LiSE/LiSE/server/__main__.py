@@ -26,25 +26,53 @@ accepted by that method.
 Refer to :class:`LiSE.handle.EngineHandle` for documentation on those
 methods.
 
+Run it with ``--async`` instead to serve length-prefixed msgpack over TCP,
+or with ``--async --websocket`` to serve msgpack over WebSocket. See
+:mod:`LiSE.server.aio` for the protocol.
+
 """
 
 from argparse import ArgumentParser
 
-import cherrypy
-
-from . import LiSEHandleWebService
-
 parser = ArgumentParser()
 parser.add_argument("--prefix", action="store", default=".")
+parser.add_argument("--async", action="store_true", dest="use_async")
+parser.add_argument("--websocket", action="store_true")
+parser.add_argument("--host", action="store", default="localhost")
+parser.add_argument("--port", action="store", type=int, default=None)
 args = parser.parse_args()
-conf = {
-    "/": {
-        "request.dispatch": cherrypy.dispatch.MethodDispatcher(),
-        "tools.sessions.on": True,
-        "tools.response_headers.on": True,
-        "tools.response_headers.headers": [("Content-Type", "application/json")],
-        "tools.encode.on": True,
-        "tools.encode.encoding": "utf-8",
+if args.use_async:
+    import asyncio
+
+    from .aio import serve_forever
+
+    asyncio.run(
+        serve_forever(
+            args.prefix,
+            host=args.host,
+            port=args.port or (8788 if args.websocket else 8787),
+            websocket=args.websocket,
+        )
+    )
+else:
+    import cherrypy
+
+    from .web import LiSEHandleWebService
+
+    conf = {
+        "/": {
+            "request.dispatch": cherrypy.dispatch.MethodDispatcher(),
+            "tools.sessions.on": True,
+            "tools.response_headers.on": True,
+            "tools.response_headers.headers": [
+                ("Content-Type", "application/json")
+            ],
+            "tools.encode.on": True,
+            "tools.encode.encoding": "utf-8",
+        }
     }
-}
-cherrypy.quickstart(LiSEHandleWebService(args.prefix), "/", conf)
+    if args.port:
+        cherrypy.config.update(
+            {"server.socket_host": args.host, "server.socket_port": args.port}
+        )
+    cherrypy.quickstart(LiSEHandleWebService(args.prefix), "/", conf)
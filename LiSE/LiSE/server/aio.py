@@ -0,0 +1,348 @@
+# This file is part of LiSE, a framework for life simulation games.
+# Copyright (c) Zachary Spector, public@zacharyspector.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""An asyncio server sharing one LiSE core among many clients
+
+Every message, in either direction, is a msgpack object prefixed with its
+length, as a four-byte big-endian unsigned integer. Over WebSocket, each
+binary message is one msgpack object, with no prefix.
+
+Requests are mappings like those accepted by
+:func:`LiSE.proxy.engine_subprocess`: the key ``'command'`` names a method
+of :class:`LiSE.handle.EngineHandle`, and the other keys are its arguments.
+Put an ``'id'`` in the request to have it echoed back in the response, so
+you can send many requests without waiting for each response. Commands
+run one at a time, in the order received.
+
+Responses are arrays of ``[id, command, branch, turn, tick, result]``.
+If the request couldn't be decoded, or the command failed, the result
+is the exception.
+
+Send ``{'command': 'subscribe'}`` to have the deltas from other clients'
+``next_turn`` and ``time_travel`` commands pushed to you. They arrive
+with the ``id`` of ``None``. ``{'command': 'unsubscribe'}`` stops that.
+
+``{'command': 'set_interest'}``, with the arguments of
+:meth:`LiSE.handle.EngineHandle.set_interest`, cuts down the deltas sent
+to the connection it came from, whether in responses or pushed. Other
+clients still get whatever they asked for.
+
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from struct import Struct
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import msgpack
+
+from ..engine import NONE, DeltaInterest
+from ..handle import EngineHandle
+from ..proxy import pack_result
+
+LENGTH = Struct(">I")
+
+PUSHED_COMMANDS = {"next_turn", "time_travel"}
+
+WEBSOCKET_DRAIN_TIMEOUT = 5.0
+
+
+class AsyncEngineServer:
+    """Serve an :class:`EngineHandle` to any number of asyncio clients
+
+    Arguments are passed to :class:`EngineHandle`. The engine itself
+    runs in a single thread of its own, so the event loop stays responsive
+    while it's simulating.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._handle_args = args
+        self._handle_kwargs = kwargs
+        self._handle = None
+        self._subscribers: Set[Callable[[bytes], None]] = set()
+        self._interests: Dict[Callable[[bytes], None], DeltaInterest] = {}
+        self._servers = []
+        self._connections = set()
+
+    async def _call(self, fun, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, lambda: fun(*args, **kwargs)
+        )
+
+    async def start(self) -> EngineHandle:
+        """Start the engine, if it's not already running, and return its handle"""
+        if self._handle is None:
+            self._handle = await self._call(
+                EngineHandle, *self._handle_args, **self._handle_kwargs
+            )
+        return self._handle
+
+    def _pack_response(self, reqid, cmd: str, packed_result: bytes) -> bytes:
+        engine_handle = self._handle
+        real = engine_handle._real
+        return (
+            msgpack.Packer().pack_array_header(6)
+            + b"".join(
+                map(
+                    engine_handle.pack,
+                    (reqid, cmd, real.branch, real.turn, real.tick),
+                )
+            )
+            + packed_result
+        )
+
+    def _pack_error(self, reqid, cmd: Optional[str], exc: Exception) -> bytes:
+        pack = self._handle.pack
+        try:
+            packed = pack(exc)
+        except Exception:
+            # its arguments are something msgpack can't handle
+            packed = pack(Exception(repr(exc)))
+        return self._pack_response(reqid, cmd, packed)
+
+    def _run_command(
+        self,
+        instruction: dict,
+        interest: Optional[DeltaInterest],
+        subscribers: Dict[Callable[[bytes], None], Optional[DeltaInterest]],
+    ) -> Tuple[bytes, Dict[Callable[[bytes], None], bytes]]:
+        """Run a command, and pack the response, and what to push to whom
+
+        The handle is shared, so deltas come from it whole, and get cut
+        down here for each connection's ``interest``.
+
+        """
+        engine_handle = self._handle
+        cmd = instruction.pop("command")
+        reqid = instruction.pop("id", None)
+        try:
+            r = getattr(engine_handle, cmd)(**instruction)
+        except Exception as e:
+            return self._pack_error(reqid, cmd, e), {}
+        if cmd not in PUSHED_COMMANDS:
+            resp = self._pack_response(reqid, cmd, pack_result(engine_handle, cmd, r))
+            pushed = {}
+        else:
+            ret, delta = r
+            deltas = {None: delta}
+            unpacked = []
+
+            def delta_for(intrst: Optional[DeltaInterest]) -> bytes:
+                if intrst not in deltas:
+                    if not unpacked:
+                        unpacked.append(engine_handle.unpack(delta))
+                    deltas[intrst] = engine_handle._pack_delta(
+                        intrst.filter(unpacked[0])
+                    )
+                return deltas[intrst]
+
+            resp = self._pack_response(
+                reqid,
+                cmd,
+                pack_result(engine_handle, cmd, (ret, delta_for(interest))),
+            )
+            pushed = {
+                subscriber: self._pack_response(None, cmd, delta_for(intrst))
+                for (subscriber, intrst) in subscribers.items()
+            }
+        if hasattr(engine_handle, "_after_ret"):
+            engine_handle._after_ret()
+            del engine_handle._after_ret
+        return resp, pushed
+
+    def _set_interest(
+        self,
+        send: Callable[[bytes], None],
+        characters=None,
+        stats=None,
+        kinds=None,
+    ) -> None:
+        if characters is None and stats is None and kinds is None:
+            self._interests.pop(send, None)
+        else:
+            self._interests[send] = DeltaInterest(
+                self._handle.pack, characters, stats, kinds
+            )
+
+    async def handle_message(self, data: bytes, send: Callable[[bytes], None]):
+        """Run the command in ``data``, then ``send`` the response"""
+        engine_handle = await self.start()
+        reqid = cmd = None
+        try:
+            instruction = engine_handle.unpack(data)
+            if not isinstance(instruction, dict):
+                raise TypeError(
+                    f"Requests must be mappings, not {type(instruction).__name__}"
+                )
+            reqid = instruction.get("id")
+            cmd = instruction["command"]
+            if not isinstance(cmd, str):
+                raise TypeError(f"Commands must be strings, not {cmd!r}")
+        except Exception as e:
+            # Say what was wrong with it, rather than leave the client waiting
+            send(self._pack_error(reqid, cmd, e))
+            return
+        silent = instruction.pop("silent", False)
+        pushed = {}
+        if cmd in ("subscribe", "unsubscribe", "set_interest"):
+            reqid = instruction.pop("id", None)
+            del instruction["command"]
+            result = NONE
+            if cmd == "subscribe":
+                self._subscribers.add(send)
+            elif cmd == "unsubscribe":
+                self._subscribers.discard(send)
+            else:
+                # Not the handle's own, which every connection shares
+                try:
+                    self._set_interest(send, **instruction)
+                except Exception as e:
+                    result = engine_handle.pack(e)
+            resp = self._pack_response(reqid, cmd, result)
+        else:
+            subscribers = {
+                subscriber: self._interests.get(subscriber)
+                for subscriber in self._subscribers
+                if subscriber is not send
+            }
+            try:
+                resp, pushed = await self._call(
+                    self._run_command,
+                    instruction,
+                    self._interests.get(send),
+                    subscribers,
+                )
+            except Exception as e:
+                resp = self._pack_error(reqid, cmd, e)
+        if not silent:
+            send(resp)
+        for subscriber, data in pushed.items():
+            if subscriber in self._subscribers:
+                subscriber(data)
+
+    async def _serve_stream(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        def send(data: bytes) -> None:
+            if not writer.is_closing():
+                writer.write(LENGTH.pack(len(data)) + data)
+
+        self._connections.add(asyncio.current_task())
+        pending = []
+        try:
+            while True:
+                try:
+                    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                    data = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    break
+                # Don't wait for the response before reading the next request,
+                # but do keep them in order.
+                prev = pending[-1] if pending else None
+                pending = [fut for fut in pending if not fut.done()]
+                pending.append(
+                    asyncio.ensure_future(self._after(prev, data, send, writer))
+                )
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            self._subscribers.discard(send)
+            self._interests.pop(send, None)
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _after(self, prev, data, send, writer):
+        if prev is not None:
+            await asyncio.gather(prev, return_exceptions=True)
+        await self.handle_message(data, send)
+        await writer.drain()
+
+    async def serve_tcp(self, host="localhost", port=8787) -> asyncio.AbstractServer:
+        """Listen for length-prefixed msgpack on a TCP port"""
+        await self.start()
+        server = await asyncio.start_server(self._serve_stream, host, port)
+        self._servers.append(server)
+        return server
+
+    async def _serve_websocket(self, websocket, path=None):
+        queue = asyncio.Queue()
+
+        def send(data: bytes) -> None:
+            queue.put_nowait(data)
+
+        async def write():
+            while True:
+                data = await queue.get()
+                if data is None:
+                    return
+                await websocket.send(data)
+
+        self._connections.add(asyncio.current_task())
+        writing = asyncio.ensure_future(write())
+        try:
+            async for message in websocket:
+                await self.handle_message(message, send)
+        finally:
+            self._subscribers.discard(send)
+            self._interests.pop(send, None)
+            self._connections.discard(asyncio.current_task())
+            queue.put_nowait(None)
+            # Let the responses already queued go out, unless the socket's
+            # closed, or too slow.
+            try:
+                await asyncio.wait_for(writing, WEBSOCKET_DRAIN_TIMEOUT)
+            except Exception:
+                pass
+
+    async def serve_websocket(self, host="localhost", port=8788):
+        """Listen for msgpack in binary WebSocket messages
+
+        Requires the ``websockets`` package.
+
+        """
+        import websockets
+
+        await self.start()
+        server = await websockets.serve(self._serve_websocket, host, port)
+        self._servers.append(server)
+        return server
+
+    async def close(self) -> None:
+        """Stop listening, and close the engine"""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        for connection in list(self._connections):
+            connection.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._handle is not None:
+            await self._call(self._handle.close)
+            self._handle = None
+        self._executor.shutdown()
+
+
+async def serve_forever(*args, host="localhost", port=8787, websocket=False, **kwargs):
+    """Run an :class:`AsyncEngineServer` until cancelled"""
+    server = AsyncEngineServer(*args, **kwargs)
+    if websocket:
+        await server.serve_websocket(host, port)
+    else:
+        await server.serve_tcp(host, port)
+    try:
+        await asyncio.Future()
+    finally:
+        await server.close()
@@ -0,0 +1,65 @@
+import networkx as nx
+import pytest
+
+from LiSE import Engine
+
+
+def check(phys, weight=None):
+    snap = phys.adjacency_snapshot(weight)
+    assert snap.time == phys.engine._btt()
+    assert set(snap.nodes) == set(phys.node)
+    assert all(snap.nodes[row] == name for (name, row) in snap.index.items())
+    got = {}
+    for row, name in enumerate(snap.nodes):
+        start, end = snap.indptr[row], snap.indptr[row + 1]
+        assert list(snap.indices[start:end]) == sorted(snap.indices[start:end])
+        for pos in range(start, end):
+            dest = snap.nodes[snap.indices[pos]]
+            got[name, dest] = None if weight is None else snap.weights[pos]
+    expected = {
+        (orig, dest): None if weight is None else portal.get(weight, 1)
+        for (orig, dests) in phys.adj.items()
+        for (dest, portal) in dests.items()
+    }
+    assert got == expected
+    return snap
+
+
+def test_adjacency_snapshot(tmp_path):
+    with Engine(tmp_path, workers=0) as eng:
+        phys = eng.new_character("physical")
+        grid = nx.grid_2d_graph(4, 4).to_directed()
+        for orig, dest in grid.edges:
+            grid.edges[orig, dest]["cost"] = 1 + (orig[0] * dest[1]) % 3
+        phys.become(grid)
+        snap = check(phys, "cost")
+        assert check(phys) is phys.adjacency_snapshot()
+        assert snap.weights is not None
+        with pytest.raises(ValueError):
+            snap.weights[0] = 100
+        adj = eng._adjacencies["physical", "cost"]
+        eng.next_turn()
+        phys.portal[0, 0][0, 1]["cost"] = 10
+        phys.portal[0, 0][1, 0]["other"] = 10
+        reweighed = check(phys, "cost")
+        assert adj.stats["reweighs"] == 1 and adj.stats["snapshots"] == 1
+        assert reweighed.indices is snap.indices
+        assert snap.weights[snap.indptr[snap.index[0, 0]]] != 10
+        eng.next_turn()
+        del phys.place[1, 1]
+        phys.add_portal((0, 0), (3, 3), cost=3)
+        check(phys, "cost")
+        check(phys)
+        assert adj.stats["snapshots"] == 2
+        eng.turn = 0
+        check(phys, "cost")
+        eng.turn = 2
+        check(phys, "cost")
+        assert adj.stats["rebuilds"] == 1
+        eng.next_turn()
+        assert check(phys, "cost").indices is adj._snapshot.indices
+        eng.branch = "other"
+        phys.add_place("island")
+        check(phys, "cost")
+        del eng.character["physical"]
+        assert not eng._adjacencies
@@ -0,0 +1,51 @@
+import sys
+
+from LiSE.bench import METRICS, compare, peak_rss, run_scenario
+
+
+def test_run_scenario():
+    result = run_scenario("kobold", 4, 2, workers=0)
+    assert result["size"] == 4
+    assert result["turns"] == 2
+    assert result["turns_per_second"] > 0
+    assert result["db_bytes_per_turn"] >= 0
+    assert set(METRICS) <= set(result)
+
+
+def test_compare():
+    baseline = {
+        "results": {
+            "kobold": {
+                "size": 10,
+                "turns": 10,
+                "turns_per_second": 100.0,
+                "cold_start_seconds": 1.0,
+            },
+            "college": {"size": 3, "turns": 10, "turns_per_second": 10.0},
+        }
+    }
+    current = {
+        "results": {
+            "kobold": {
+                "size": 10,
+                "turns": 10,
+                "turns_per_second": 95.0,
+                "cold_start_seconds": 1.5,
+            },
+            "college": {"size": 4, "turns": 10, "turns_per_second": 1.0},
+        }
+    }
+    assert compare(current, baseline) == [
+        "kobold: cold_start_seconds went from 1 to 1.5"
+    ]
+    assert len(compare(current, baseline, tolerance=0.01)) == 2
+
+
+def test_without_resource(monkeypatch):
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert peak_rss() is None
+    result = run_scenario("kobold", 4, 1, workers=0)
+    assert result["peak_rss_bytes"] is None
+    baseline = {"results": {"kobold": dict(result, peak_rss_bytes=1)}}
+    assert compare({"results": {"kobold": result}}, baseline) == []
+    assert compare(baseline, {"results": {"kobold": result}}) == []
@@ -270,6 +270,54 @@ def test_facade(character_updates):
     assert start_edge == end_edge
 
 
+def test_facade_overlay(engy):
+    """Facades read their character when they were made, and copy on write"""
+    char = engy.new_character("physical")
+    char.new_place("here").new_thing("it", bag=["thing"])
+    char.add_portal("here", "there", cost=1)
+    char.stat["mood"] = "calm"
+    engy.next_turn()
+    fac = char.facade()
+    char.stat["mood"] = "angry"
+    char.place["here"]["lit"] = True
+    char.add_place("elsewhere")
+    char.portal["here"]["there"]["cost"] = 5
+    assert fac.stat["mood"] == "calm"
+    assert dict(fac.place["here"]) == {"name": "here"}
+    assert set(fac.place) == {"here", "there"}
+    assert set(fac.thing) == {"it"}
+    assert fac.portal["here"]["there"]["cost"] == 1
+    fac.thing["it"]["bag"].append("other thing")
+    assert char.thing["it"]["bag"] == ["thing"]
+    fac.preportal["there"]["here"]["cost"] = 3
+    assert fac.portal["here"]["there"]["cost"] == 3
+    del fac.portal["here"]["there"]
+    assert "here" not in fac.preportal["there"]
+    assert char.portal["here"]["there"]["cost"] == 5
+    assert engy.turn == 1
+
+
+def test_facade_keeps_engine_time(engy, monkeypatch):
+    """Facades read their character's past without moving the engine"""
+    char = engy.new_character("physical")
+    char.new_place("here").new_thing("it", bag=["thing"])
+    char.stat["mood"] = "calm"
+    fac = char.facade()
+    engy.next_turn()
+    char.stat["mood"] = "angry"
+    char.thing["it"].location = char.new_place("there")
+
+    def no_time_travel(*args):
+        raise AssertionError("Facade moved the engine's time")
+
+    monkeypatch.setattr(engy, "_set_btt", no_time_travel)
+    assert fac.stat["mood"] == "calm"
+    assert fac.thing["it"]["location"] == "here"
+    assert set(fac.place) == {"here"}
+    fac.thing["it"]["bag"].append("other thing")
+    assert char.thing["it"]["bag"] == ["thing"]
+
+
 def test_set_rulebook(engy):
     engy.universal["list"] = []
     ch = engy.new_character("physical")
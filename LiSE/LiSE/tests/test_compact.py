@@ -0,0 +1,62 @@
+import pytest
+
+from LiSE import Engine
+from LiSE.allegedb import OutOfTimelineError
+
+
+def test_compact(tmp_path):
+    with Engine(tmp_path, workers=0, keyframe_on_close=False) as eng:
+        phys = eng.new_character("physical")
+        phys.add_place("here")
+        for turn in range(1, 11):
+            eng.next_turn()
+            phys.stat["turn"] = turn
+            phys.place["here"]["turn"] = turn
+            if turn % 3 == 0:
+                eng.snap_keyframe()
+            if turn == 3:
+                eng.branch = "early"
+                eng.next_turn()
+                phys.stat["early"] = True
+                eng.branch = "doomed"
+                phys.stat["doomed"] = True
+                eng.branch = "trunk"
+                eng.turn = 3
+        eng.branch = "late"
+        eng.next_turn()
+        phys.stat["late"] = True
+        eng.branch = "trunk"
+        report = eng.compact(6, keep_branches=["early", "late"], vacuum=True)
+        assert report["deleted"] == ["doomed"]
+        assert report["rows"][1] < report["rows"][0]
+        assert report["db_bytes"][1] < report["db_bytes"][0]
+        assert set(eng._branches) == {"trunk", "early", "late"}
+        assert eng.branch_start("trunk") == (6, 0)
+        with pytest.raises(OutOfTimelineError):
+            eng.turn = 5
+        eng.turn = 7
+        assert phys.stat["turn"] == 7
+    with Engine(tmp_path, workers=0) as eng:
+        assert set(eng._branches) == {"trunk", "early", "late"}
+        for branch, turn, tick in eng.query.keyframes_dump():
+            assert branch != "doomed"
+            if branch == "trunk":
+                assert turn >= 6
+        for _, branch, turn, tick, *_ in eng.query.call_one("node_val_dump"):
+            if branch == "trunk":
+                assert turn >= 6
+        phys = eng.character["physical"]
+        for turn in range(6, 11):
+            eng.turn = turn
+            assert phys.stat["turn"] == turn
+            assert phys.place["here"]["turn"] == turn
+        eng.branch = "late"
+        eng.turn = 11
+        assert phys.stat["late"]
+        assert phys.stat["turn"] == 10
+        eng.branch = "early"
+        eng.turn = 4
+        assert phys.stat["early"]
+        assert phys.stat["turn"] == 3
+        eng.next_turn()
+        assert phys.place["here"]["turn"] == 3
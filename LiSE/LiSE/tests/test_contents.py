@@ -108,3 +108,87 @@ def test_contents_in_plan(chara):
         engine.next_turn()
     assert engine.turn == 10
     assert set(place.content) == {1, 2, 3, 4, 5, 6, 7, 8, 10, 11, 15}
+
+
+def test_crowd_under_plan(chara):
+    here = chara.new_place("here")
+    there = chara.new_place("there")
+    for i in range(20):
+        here.new_thing(i)
+    walker = here.new_thing("walker")
+    engine = chara.engine
+    engine.next_turn()
+    with engine.plan():
+        for turn in range(2, 12):
+            engine.turn = turn
+            walker.location = there if turn % 2 else here
+    engine.turn = 1
+    assert set(here.content) == set(range(20)) | {"walker"}
+    for i in range(0, 20, 2):
+        chara.thing[i].location = there
+    for turn in range(1, 12):
+        engine.turn = turn
+        walking = {"walker"} if turn % 2 and turn > 1 else set()
+        assert set(there.content) == set(range(0, 20, 2)) | walking
+        assert set(here.content) == set(range(1, 20, 2)) | ({"walker"} - walking)
+
+
+def test_move_forgets_only_its_places(chara):
+    engine = chara.engine
+    here = chara.new_place("here")
+    there = chara.new_place("there")
+    elsewhere = chara.new_place("elsewhere")
+    mover = here.new_thing("mover")
+    elsewhere.new_thing("stayer")
+    remembered = engine._node_contents_cache.shallowest
+    engine.branch = "other"
+    assert set(here.content) == {"mover"}
+    assert set(elsewhere.content) == {"stayer"}
+    here_then = ("chara", "here", *engine._btt())
+    elsewhere_then = ("chara", "elsewhere", *engine._btt())
+    assert here_then in remembered
+    assert elsewhere_then in remembered
+    engine.branch = "trunk"
+    mover.location = there
+    assert here_then not in remembered
+    assert elsewhere_then in remembered
+    assert set(here.content) == set()
+    assert set(there.content) == {"mover"}
+    assert set(elsewhere.content) == {"stayer"}
+
+
+def test_compact_prunes_visitors(chara):
+    engine = chara.engine
+    here = chara.new_place("here")
+    there = chara.new_place("there")
+    thing = here.new_thing("thing")
+    engine.next_turn()
+    engine.branch = "other"
+    thing.location = there
+    assert set(there.content) == {"thing"}
+    engine.branch = "trunk"
+    assert set(there.content) == set()
+    engine.compact(0, keep_branches=[])
+    assert set(there.content) == set()
+    assert set(here.content) == {"thing"}
+    visitors = engine._things_cache.visitors
+    assert "thing" not in visitors.get(("chara", "there"), ())
+    assert "thing" in visitors[("chara", "here")]
+
+
+def test_move_keeps_earlier_contents(chara):
+    engine = chara.engine
+    here = chara.new_place("here")
+    there = chara.new_place("there")
+    mover = here.new_thing("mover")
+    assert set(here.content) == {"mover"}
+    before = ("chara", "here", *engine._btt())
+    engine.next_turn()
+    assert set(here.content) == {"mover"}
+    mover.location = there
+    remembered = engine._node_contents_cache.shallowest
+    assert before in remembered
+    assert set(here.content) == set()
+    assert remembered[("chara", "here", *engine._btt())] == frozenset()
+    engine.turn = 0
+    assert set(here.content) == {"mover"}
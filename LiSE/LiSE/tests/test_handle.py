@@ -1,5 +1,6 @@
 import pytest
 
+from LiSE.engine import DeltaInterest
 from LiSE.tests import data
 
 
@@ -105,3 +106,49 @@ def test_character(handle_initialized):
     kf2 = handle_initialized.snap_keyframe()
     del kf2["universal"]
     assert kf2 == kf0
+
+
+def test_interest(handle_initialized):
+    handle = handle_initialized
+    handle.add_character("other", {"node": {"nowhere": {}}}, {"foo": "bar"})
+    handle.set_interest(
+        characters=["physical"], stats=["destination"], kinds=["node_val"]
+    )
+    _, delta = handle.next_turn()
+    delta = handle.unpack(delta)
+    assert "other" not in delta
+    assert delta["physical"] == {"node_val": {"kobold": {"destination": (7, 4)}}}
+    handle.set_interest(characters=["physical"], stats=["location"], kinds=["node_val"])
+    _, delta = handle.time_travel("trunk", 0)
+    delta = handle.unpack(delta)
+    assert "other" not in delta
+    assert set(delta["physical"].keys()) <= {"node_val"}
+    handle.set_interest()
+    _, delta = handle.time_travel("trunk", 1)
+    delta = handle.unpack(delta)
+    assert any(
+        set(vals.keys()) - {"location"}
+        for vals in delta["physical"]["node_val"].values()
+    )
+
+
+@pytest.mark.parametrize(
+    "characters,stats,kinds",
+    [
+        (["physical"], ["location"], ["node_val"]),
+        (["physical"], None, ["nodes", "edges"]),
+        (None, ["rulebook"], None),
+        (["other"], None, ["stat"]),
+    ],
+)
+def test_slow_delta_interest(handle_initialized, characters, stats, kinds):
+    handle = handle_initialized
+    eng = handle._real
+    handle.add_character("other", {"node": {"nowhere": {}}}, {"foo": "bar"})
+    handle.next_turn()
+    interest = DeltaInterest(handle.pack, characters, stats, kinds)
+    btt_from = ("trunk", 0, 0)
+    btt_to = eng._btt()
+    assert eng._get_slow_delta(btt_from, btt_to, interest) == (
+        interest.filter_packed(eng._get_slow_delta(btt_from, btt_to))
+    )
@@ -150,3 +150,166 @@ def test_load_branch_to_end(some_state):
         assert "pointed" in eng.character
         assert phys.portal[0][1]["meaning"] == 42
         assert "omg" not in phys.portal[0][1]
+
+
+def test_memory_report(tmp_path):
+    with Engine(tmp_path, workers=0) as eng:
+        inittest(eng)
+        eng.new_character("empty")
+        before = eng.memory_report()
+        for _ in range(3):
+            eng.next_turn()
+        after = eng.memory_report()
+    assert "node_val_cache" in after["caches"]
+    assert "character_rules_handled_cache" in after["caches"]
+    assert after["caches"]["node_val_cache"]["structures"]["branches"]["entries"]
+    assert after["entries"] == sum(
+        cache["entries"] for cache in after["caches"].values()
+    )
+    assert after["bytes"] > before["bytes"]
+    assert after["characters"]["physical"]["entries"] > (
+        before["characters"]["physical"]["entries"]
+    )
+    assert "empty" not in after["characters"]
+
+
+def test_memory_report_samples_keys(tmp_path):
+    with Engine(tmp_path, workers=0) as eng:
+        phys = eng.new_character("physical", nx.grid_2d_graph(20, 20))
+        for node in phys.place.values():
+            node["visited"] = False
+        # 400 nodes, but only 16 keys per cache looked at
+        assert len(eng._node_val_cache.branches) > 4 * 4
+        full = eng.memory_report()
+        sampled = eng.memory_report(sample=4)
+    full_entries = full["characters"]["physical"]["entries"]
+    sampled_entries = sampled["characters"]["physical"]["entries"]
+    assert full_entries / 2 < sampled_entries < full_entries * 2
+
+
+def test_keyframe_deltas(tmp_path):
+    with Engine(
+        tmp_path, workers=0, keyframe_on_close=False, enforce_end_of_time=False
+    ) as eng:
+        eng.query.keyframe_base_interval = 4
+        phys = eng.new_character("physical", nx.grid_2d_graph(20, 20))
+        for turn in range(1, 7):
+            eng.turn = turn
+            phys.place[0, turn]["visited"] = turn
+            phys.stat["turn"] = turn
+            eng.snap_keyframe()
+        eng.commit()
+        rows = {
+            (turn, tick): nodes
+            for (graph, branch, turn, tick, nodes, *_) in eng.query.call_one(
+                "keyframes_graphs_dump"
+            )
+            if eng.unpack(graph) == "physical"
+        }
+    full = [time for (time, nodes) in rows.items() if nodes[:1] != b"\xc1"]
+    assert len(full) < len(rows) - 2
+    biggest_delta = max(len(nodes) for nodes in rows.values() if nodes[:1] == b"\xc1")
+    assert biggest_delta * 10 < min(len(rows[time]) for time in full)
+    with Engine(tmp_path, workers=0) as eng:
+        phys = eng.character["physical"]
+        for turn in range(6, 0, -1):
+            eng.turn = turn
+            assert phys.stat["turn"] == turn
+            for visited in range(1, 7):
+                if visited <= turn:
+                    assert phys.place[0, visited]["visited"] == visited
+                else:
+                    assert "visited" not in phys.place[0, visited]
+
+
+def test_keyframe_caches_bounded(tmp_path):
+    with Engine(
+        tmp_path, workers=0, keyframe_on_close=False, enforce_end_of_time=False
+    ) as eng:
+        eng.query.keyframe_base_interval = 4
+        eng.query.keyframe_cache_size = 2
+        chars = [eng.new_character(i, nx.grid_2d_graph(5, 5)) for i in range(5)]
+        for turn in range(1, 7):
+            eng.turn = turn
+            for char in chars:
+                char.stat["turn"] = turn
+            eng.snap_keyframe()
+            assert len(eng.query._kf_graph_latest) <= 2
+            assert len(eng.query._kf_graph_cache) <= 2
+        for turn in range(1, 7):
+            for char in chars:
+                kf = eng.query.get_keyframe_graph(
+                    char.name, "trunk", turn, eng._turn_end_plan["trunk", turn]
+                )
+                assert kf[2]["turn"] == turn
+
+
+def test_keyframe_scheduler_counts_batches(tmp_path):
+    with Engine(
+        tmp_path, workers=0, keyframe_interval=None, keyframe_latency=60
+    ) as eng:
+        phys = eng.new_character("physical", nx.path_graph(51))
+        thing = phys.place[0].new_thing("walker")
+        scheduler = eng._keyframe_scheduler
+        before = scheduler.records
+        thing.follow_path(list(range(51)), check=False)
+        # one record per step, though they're written in one batch
+        assert scheduler.records - before >= 50
+
+
+def test_keyframe_latency(tmp_path):
+    with Engine(
+        tmp_path, workers=0, keyframe_interval=None, keyframe_latency=0.01
+    ) as eng:
+        scheduler = eng._keyframe_scheduler
+        scheduler.seconds_per_record = 0.001
+        scheduler.smoothing = 0
+        phys = eng.new_character("physical")
+        eng.snap_keyframe()
+        n_keyframes = len(eng._keyframes_times)
+        for turn in range(1, 4):
+            eng.next_turn()
+            for i in range(5):
+                phys.stat[i] = turn
+        assert len(eng._keyframes_times) > n_keyframes
+        assert scheduler.predicted() <= scheduler.target
+        scheduler.smoothing = 1
+        eng._get_branch_delta("trunk", 0, 0, 3, 0)
+        assert scheduler.seconds_per_record != 0.001
+
+
+def test_collection_patches(tmp_path):
+    from LiSE.allegedb.wrap import Patch
+
+    with Engine(tmp_path, workers=0) as eng:
+        phys = eng.new_character("physical")
+        here = phys.new_place("here")
+        phys.stat["bare"] = list(range(100))
+        here["seen"] = {0}
+        eng.universal["counts"] = {"turns": 0}
+        for turn in range(1, 6):
+            eng.next_turn()
+            phys.stat["bare"].append(turn)
+            del phys.stat["bare"][0]
+            here["seen"].add(turn)
+            eng.universal["counts"]["turns"] = turn
+            if turn == 3:
+                eng.snap_keyframe()
+        eng.query.flush()
+        patches = [
+            row[-1]
+            for row in eng.query.call_one("graph_val_dump")
+            if isinstance(eng.unpack(row[-1]), Patch)
+        ]
+        assert len(patches) == 10
+        assert all(len(patch) < 20 for patch in patches)
+    with Engine(tmp_path, workers=0) as eng:
+        phys = eng.character["physical"]
+        for turn in (5, 1, 4, 2):
+            eng.turn = turn
+            assert phys.stat["bare"] == list(range(turn, 100)) + list(
+                range(1, turn + 1)
+            )
+            assert phys.place["here"]["seen"] == set(range(turn + 1))
+            assert eng.universal["counts"] == {"turns": turn}
+            eng.unload()
@@ -0,0 +1,64 @@
+import networkx as nx
+import pytest
+
+from LiSE import Engine
+
+
+def check(phys, pairs, weight=None):
+    finder = phys.pathfinder(weight)
+    snapshot = nx.DiGraph()
+    snapshot.add_nodes_from(phys.node)
+    for orig, dests in phys.adj.items():
+        for dest, portal in dests.items():
+            snapshot.add_edge(orig, dest, **dict(portal))
+    for orig, dest in pairs:
+        try:
+            expected = nx.shortest_path_length(snapshot, orig, dest, weight)
+        except nx.NetworkXNoPath:
+            with pytest.raises(nx.NetworkXNoPath):
+                finder.shortest_path(orig, dest)
+            continue
+        path = finder.shortest_path(orig, dest)
+        assert path[0] == orig and path[-1] == dest
+        assert finder.shortest_path_length(orig, dest) == expected
+        assert expected == sum(
+            snapshot.edges[a, b].get(weight, 1) if weight else 1
+            for (a, b) in zip(path, path[1:])
+        )
+
+
+def test_pathfinder(tmp_path):
+    with Engine(tmp_path, workers=0) as eng:
+        phys = eng.new_character("physical")
+        grid = nx.grid_2d_graph(5, 5).to_directed()
+        for orig, dest in grid.edges:
+            grid.edges[orig, dest]["cost"] = 1 + (orig[0] * dest[1]) % 3
+        phys.become(grid)
+        pairs = [((0, 0), (4, 4)), ((4, 0), (0, 4)), ((2, 2), (0, 0))]
+        check(phys, pairs)
+        check(phys, pairs, "cost")
+        finder = phys.pathfinder("cost")
+        assert finder.stats["rebuilds"] == 1
+        eng.next_turn()
+        del phys.portal[(0, 0)][(1, 0)]
+        phys.portal[(0, 0)][(0, 1)]["cost"] = 10
+        phys.add_portal((0, 0), (4, 4), cost=3)
+        check(phys, pairs, "cost")
+        check(phys, pairs)
+        eng.next_turn()
+        phys.portal[(0, 0)][(4, 4)]["cost"] = 30
+        del phys.place[(1, 1)]
+        check(phys, pairs, "cost")
+        eng.turn = 0
+        check(phys, pairs, "cost")
+        eng.turn = 2
+        check(phys, pairs, "cost")
+        assert finder.stats["rebuilds"] == 1
+        assert finder.stats["updates"] == 4
+        eng.branch = "other"
+        phys.add_place("island")
+        check(phys, pairs + [((0, 0), "island")], "cost")
+        assert finder.stats["rebuilds"] == 2
+        thing = phys.new_thing("pawn", (0, 0))
+        length = finder.shortest_path_length((0, 0), (4, 4))
+        assert thing.travel_to((4, 4), "cost") == length
@@ -1,24 +1,122 @@
+import os
+import shutil
 from time import monotonic
+from unittest.mock import patch
 
 import networkx as nx
 import pytest
 
 from LiSE import Engine
+from LiSE.examples import kobold
+from LiSE.handle import EngineHandle
 from LiSE.proxy import EngineProcessManager
 
 
-@pytest.mark.skip("I'll optimize later")
 def test_follow_path(tmp_path):
     big_grid = nx.grid_2d_graph(100, 100)
     big_grid.add_node("them", location=(0, 0))
     straightly = nx.shortest_path(big_grid, (0, 0), (99, 99))
     with Engine(tmp_path) as eng:
         eng.add_character("grid", big_grid)
+        them = eng.character["grid"].thing["them"]
+        query = eng.query
+        with patch.object(eng, "_load_at", wraps=eng._load_at) as load_at:
+            with patch.object(query, "set_thing_loc") as set_thing_loc:
+                with patch.object(
+                    query, "set_thing_locs", wraps=query.set_thing_locs
+                ) as set_thing_locs:
+                    turns = them.follow_path(straightly)
+        assert turns == len(straightly) - 1
+        # the whole path is written in one batch, without loading each step
+        assert not load_at.called
+        assert not set_thing_loc.called
+        set_thing_locs.assert_called_once()
+        (locs,) = set_thing_locs.call_args.args
+        assert len(locs) == turns
+        eng.turn = turns
+        assert them.location.name == (99, 99)
     with EngineProcessManager(tmp_path, workers=0) as prox:
         them = prox.character["grid"].thing["them"]
+        turns = them.follow_path(list(reversed(straightly)))
+        assert turns == len(straightly) - 1
+        prox.turn += turns
+        assert them.location.name == (0, 0)
+
+
+@pytest.mark.big
+def test_crowded_node_contents(tmp_path):
+    with Engine(tmp_path, workers=0) as eng:
+        phys = eng.new_character("physical")
+        hub = phys.new_place("hub")
+        rooms = [phys.new_place(f"room{i}") for i in range(10)]
+        things = [hub.new_thing(i) for i in range(500)]
+        for turn in range(1, 51):
+            eng.next_turn()
+            for i, thing in enumerate(things):
+                if (i + turn) % 10 == 0:
+                    thing.location = rooms[turn % 10]
+                elif thing.location != hub:
+                    thing.location = hub
+        visitors = eng._things_cache.visitors["physical", "hub"]
+        assert len(visitors) == 500
+        for turn in range(1, 51):
+            eng.turn = turn
+            expected = {i for i in range(500) if (i + turn) % 10}
+            eng._node_contents_cache.shallowest.clear()
+            start = monotonic()
+            contents = eng._node_contents_cache.retrieve("physical", "hub", *eng._btt())
+            elapsed = monotonic() - start
+            print(f"turn {turn}: {len(visitors)} visitors looked up in {elapsed:.4} s")
+            assert contents == expected
+            start = monotonic()
+            assert (
+                eng._node_contents_cache.retrieve("physical", "hub", *eng._btt())
+                is contents
+            )
+            print(f"turn {turn}: remembered in {monotonic() - start:.4} s")
+
+
+def _bench_pack_delta(handle, name, turns):
+    eng = handle._real
+    for turn in turns:
+        time_from = (eng.branch, turn, eng._turn_end_plan[eng.branch, turn])
+        time_to = (eng.branch, turn + 1, eng._turn_end_plan[eng.branch, turn + 1])
+        eng.turn = turn + 1  # make sure the caches are loaded
+        delta = eng.get_delta(time_from, time_to)
+        start = monotonic()
+        packed = handle._pack_delta(delta)
+        elapsed = monotonic() - start
+        print(f"{name} turn {turn}: {len(packed)} bytes packed in {elapsed:.4} seconds")
+        assert handle.unpack(packed) == {
+            char: (None if chardelta == {"name": None} else chardelta)
+            for (char, chardelta) in delta.items()
+        }
+        slow_delta = eng._get_slow_delta(time_from, time_to)
         start = monotonic()
-        them.follow_path(straightly)
+        concatenated = handle._concat_delta(slow_delta)
         elapsed = monotonic() - start
-        assert (
-            elapsed < 0.5
-        ), f"Took too long to follow a path of length {len(straightly)}: {elapsed:.2} seconds"
+        print(
+            f"{name} turn {turn}: {len(concatenated)} bytes concatenated in {elapsed:.4} seconds"
+        )
+        assert isinstance(handle.unpack(concatenated), dict)
+
+
+@pytest.mark.big
+def test_pack_delta_kobold(handle):
+    kobold.inittest(handle._real, shrubberies=20, kobold_sprint_chance=0.9)
+    for _ in range(4):
+        handle._real.next_turn()
+    _bench_pack_delta(handle, "kobold", range(3))
+
+
+@pytest.mark.big
+def test_pack_delta_college(tmp_path):
+    shutil.unpack_archive(
+        os.path.join(os.path.dirname(__file__), "college24_premade.tar.xz"),
+        tmp_path,
+    )
+    handle = EngineHandle(tmp_path, workers=0)
+    try:
+        _bench_pack_delta(handle, "college", range(8, 11))
+    finally:
+        handle.close()
@@ -159,6 +159,39 @@ class TestSwitchMainBranch(ProxyTest):
         assert phys.stat["hi"] == "hello"
 
 
+class TestReplaceStateWithKeyframe(ProxyTest):
+    def test_replace_state_with_kf(self):
+        eng = self.engine
+        phys = eng.new_character("physical")
+        here = phys.new_place("here")
+        phys.add_place("there")
+        phys.add_portal("here", "there", dist=1)
+        eng.universal["u"] = 0
+        kf = eng.handle("snap_keyframe")
+        there = phys.place["there"]
+        port = phys.portal["here"]["there"]
+        phys.add_place("elsewhere")
+        phys.add_portal("there", "here")
+        here["lit"] = True
+        port["dist"] = 2
+        here.new_thing("it")
+        eng.universal["u"] = 1
+        eng.add_character("other")
+        changed = []
+        there.connect(lambda *args, **kwargs: changed.append(kwargs))
+        eng._replace_state_with_kf(kf)
+        assert set(phys.place) == {"here", "there"}
+        assert "it" not in phys.thing
+        assert "here" not in phys.portal["there"]
+        assert "lit" not in here
+        assert phys.portal["here"]["there"] is port
+        assert port["dist"] == 1
+        assert phys.place["there"] is there
+        assert not changed
+        assert eng.universal["u"] == 0
+        assert "other" not in eng.character
+
+
 def test_updnoderb(handle):
     engine = handle._real
     char0 = engine.new_character("0")
@@ -310,3 +343,36 @@ def test_apply_delta(tmp_path, slow):
         assert "omg" not in phys.portal[0][1]
     finally:
         mang.shutdown()
+
+
+class TestQueryMemo(ProxyTest):
+    def test_query_memo(self):
+        eng = self.engine
+        phys = eng.new_character("physical")
+        phys.add_place("here")
+        sent = []
+        send_bytes = eng.send_bytes
+
+        def counting_send_bytes(obj, *args, **kwargs):
+            sent.append(obj)
+            return send_bytes(obj, *args, **kwargs)
+
+        eng.send_bytes = counting_send_bytes
+        assert eng._node_exists("physical", "here")
+        assert not eng._node_exists("physical", "there")
+        assert eng.main_branch == "trunk"
+        asked = len(sent)
+        assert eng._node_exists("physical", "here")
+        assert not eng._node_exists("physical", "there")
+        assert eng.main_branch == "trunk"
+        assert len(sent) == asked
+        phys.add_place("there")
+        assert eng._node_exists("physical", "there")
+        eng.next_turn()
+        asked = len(sent)
+        assert eng._node_exists("physical", "there")
+        assert len(sent) == asked + 1
+        del phys.place["there"]
+        assert not eng._node_exists("physical", "there")
+        eng.turn = 0
+        assert eng._node_exists("physical", "there")
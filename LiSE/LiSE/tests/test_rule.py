@@ -173,3 +173,78 @@ def test_rule_priority(engy):
     engy.next_turn()
 
     assert engy.universal["list"] == ["first", "second", "second", "first"]
+
+
+def test_rules_handled_journal(tmp_path):
+    """Test that the rules handled each turn are remembered after reloading"""
+    from LiSE import Engine
+
+    with Engine(tmp_path, random_seed=69105, workers=0) as eng:
+        char = eng.new_character("physical")
+        for i in range(5):
+            char.new_place(i)
+
+        @char.place.rule(always=True)
+        def touch(place):
+            place["touched"] = True
+
+        eng.next_turn()
+        handled = dict(
+            eng._character_place_rules_handled_cache.handled_turn("trunk", 1).items()
+        )
+        rulebook = char.place.rulebook.name
+    assert sorted(entity for (entity, _, _) in handled.values()) == [
+        ("physical", i) for i in range(5)
+    ]
+    with Engine(tmp_path, workers=0) as eng:
+        cache = eng._character_place_rules_handled_cache
+        assert dict(cache.handled_turn("trunk", 1).items()) == handled
+        for i in range(5):
+            assert cache.retrieve("physical", i, rulebook, "trunk", 1) == {"touch"}
+        assert not cache.get_handled_rules(("physical", 0), rulebook, "trunk", 2)
+
+
+def test_pure_trigger(tmp_path):
+    """Test that a pure trigger's result is reused until its inputs change"""
+    from LiSE import Engine
+
+    with Engine(
+        tmp_path, random_seed=69105, workers=0, threaded_triggers=False
+    ) as eng:
+        phys = eng.new_character("physical")
+        here = phys.new_place("here")
+        there = phys.new_place("there")
+        here["grassy"] = True
+        there["grassy"] = False
+        sheep = here.new_thing("sheep")
+
+        @sheep.rule
+        def graze(thing):
+            thing["grazed"] = thing.get("grazed", 0) + 1
+
+        @graze.trigger(pure=True)
+        def grassy(thing):
+            return thing.location["grassy"]
+
+        eng.next_turn()
+        eng.next_turn()
+        assert sheep["grazed"] == 2
+        assert eng.pure_trigger_stats() == {
+            "hits": 1,
+            "misses": 1,
+            "invalidations": 0,
+        }
+        sheep.location = there
+        eng.next_turn()
+        eng.next_turn()
+        assert sheep["grazed"] == 2
+        there["grassy"] = True
+        eng.next_turn()
+        assert sheep["grazed"] == 3
+        assert eng.pure_trigger_stats() == {
+            "hits": 2,
+            "misses": 3,
+            "invalidations": 2,
+        }
+    with Engine(tmp_path, workers=0) as eng:
+        assert eng._pure_triggers == {"grassy"}
@@ -0,0 +1,223 @@
+# This file is part of LiSE, a framework for life simulation games.
+# Copyright (c) Zachary Spector, public@zacharyspector.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import asyncio
+
+from LiSE.server.aio import LENGTH, AsyncEngineServer
+
+
+def test_async_server(tmp_path):
+    async def go():
+        server = AsyncEngineServer(
+            tmp_path,
+            connect_string="sqlite:///:memory:",
+            random_seed=69105,
+            workers=0,
+        )
+        tcp = await server.serve_tcp("localhost", 0)
+        port = tcp.sockets[0].getsockname()[1]
+        handle = server._handle
+        pack, unpack = handle.pack, handle.unpack
+
+        async def connect():
+            reader, writer = await asyncio.open_connection("localhost", port)
+
+            def send(**kwargs):
+                data = pack(kwargs)
+                writer.write(LENGTH.pack(len(data)) + data)
+
+            async def recv():
+                (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                return unpack(await reader.readexactly(length))
+
+            return send, recv, writer
+
+        send_a, recv_a, writer_a = await connect()
+        send_b, recv_b, writer_b = await connect()
+        send_b(command="subscribe", id="sub")
+        assert (await recv_b())[:2] == ["sub", "subscribe"]
+        # pipelined; responses come back in order
+        send_a(
+            command="add_character",
+            id=1,
+            char="physical",
+            data={"place": {"here": {}}},
+            attr={},
+        )
+        send_a(command="set_universal", id=2, k="foo", v="bar")
+        send_a(command="next_turn", id=3)
+        responses = [await recv_a() for _ in range(3)]
+        assert [resp[0] for resp in responses] == [1, 2, 3]
+        pushed = await recv_b()
+        assert pushed[:5] == [None, "next_turn", "trunk", 1, 0]
+        assert pushed[5] == responses[2][5][1]
+        for writer in (writer_a, writer_b):
+            writer.close()
+        await server.close()
+
+    asyncio.run(go())
+
+
+def test_interest_per_connection(tmp_path):
+    async def go():
+        server = AsyncEngineServer(
+            tmp_path,
+            connect_string="sqlite:///:memory:",
+            random_seed=69105,
+            workers=0,
+        )
+        tcp = await server.serve_tcp("localhost", 0)
+        port = tcp.sockets[0].getsockname()[1]
+        handle = server._handle
+        pack, unpack = handle.pack, handle.unpack
+
+        async def connect():
+            reader, writer = await asyncio.open_connection("localhost", port)
+
+            async def call(**kwargs):
+                data = pack(kwargs)
+                writer.write(LENGTH.pack(len(data)) + data)
+                return await recv()
+
+            async def recv():
+                (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                return unpack(await reader.readexactly(length))
+
+            return call, recv, writer
+
+        call_a, recv_a, writer_a = await connect()
+        call_b, recv_b, writer_b = await connect()
+        for char in ("physical", "other"):
+            await call_a(
+                command="add_character", char=char, data={"place": {0: {}}}, attr={}
+            )
+        await call_a(command="next_turn")
+        for char in ("physical", "other"):
+            await call_a(command="set_character_stat", char=char, k="a", v=1)
+        resp = await call_a(command="set_interest", characters=["physical"])
+        assert resp[:2] == [None, "set_interest"]
+        assert handle._interest is None
+        await call_b(command="subscribe")
+        resp = await call_a(command="time_travel", branch="trunk", turn=0)
+        assert "physical" in resp[5][1]
+        assert "other" not in resp[5][1]
+        pushed = await recv_b()
+        assert pushed[:2] == [None, "time_travel"]
+        assert {"physical", "other"} <= pushed[5].keys()
+        resp = await call_b(command="time_travel", branch="trunk", turn=1)
+        assert resp[5][1]["other"] == {"a": 1}
+        # set the interest aside again
+        await call_a(command="set_interest")
+        await call_a(command="subscribe")
+        await call_b(command="set_interest", characters=["other"])
+        resp = await call_b(command="time_travel", branch="trunk", turn=0)
+        assert "physical" not in resp[5][1]
+        pushed = await recv_a()
+        assert {"physical", "other"} <= pushed[5].keys()
+        for writer in (writer_a, writer_b):
+            writer.close()
+        await server.close()
+
+    asyncio.run(go())
+
+
+def test_malformed_requests(tmp_path):
+    async def go():
+        server = AsyncEngineServer(
+            tmp_path, connect_string="sqlite:///:memory:", workers=0
+        )
+        tcp = await server.serve_tcp("localhost", 0)
+        port = tcp.sockets[0].getsockname()[1]
+        handle = server._handle
+        pack, unpack = handle.pack, handle.unpack
+        malformed = [
+            b"\xc1",  # never valid msgpack
+            pack(["command", "next_turn"]),
+            pack({"id": 1, "k": "foo"}),
+            pack({"id": 2, "command": "no_such_command"}),
+            pack({"id": 3, "command": "set_universal", "x": "y"}),
+        ]
+        good = pack({"id": 4, "command": "set_universal", "k": "foo", "v": "bar"})
+        reader, writer = await asyncio.open_connection("localhost", port)
+        for data in malformed + [good]:
+            writer.write(LENGTH.pack(len(data)) + data)
+
+        async def recv():
+            (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+            return unpack(await reader.readexactly(length))
+
+        responses = [await asyncio.wait_for(recv(), 5) for _ in range(6)]
+        assert [resp[0] for resp in responses] == [None, None, 1, 2, 3, 4]
+        for resp in responses[:5]:
+            assert isinstance(resp[5], Exception)
+        assert isinstance(responses[2][5], KeyError)
+        assert responses[5][5] is None
+        writer.close()
+        ws = FakeWebSocket(*malformed, good, None)
+        await asyncio.wait_for(server._serve_websocket(ws), 5)
+        assert [unpack(data)[0] for data in ws.sent] == [None, None, 1, 2, 3, 4]
+        await server.close()
+
+    asyncio.run(go())
+
+
+class FakeWebSocket:
+    def __init__(self, *messages, broken=False):
+        self.incoming = asyncio.Queue()
+        for message in messages:
+            self.incoming.put_nowait(message)
+        self.sent = []
+        self.broken = broken
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def send(self, data):
+        if self.broken:
+            raise ConnectionError("Socket closed")
+        self.sent.append(data)
+
+
+def test_websocket_connections(tmp_path):
+    async def go():
+        server = AsyncEngineServer(
+            tmp_path, connect_string="sqlite:///:memory:", workers=0
+        )
+        handle = await server.start()
+        pack, unpack = handle.pack, handle.unpack
+        requests = [
+            pack({"command": "set_universal", "id": i, "k": "foo", "v": i})
+            for i in range(2)
+        ]
+        ok = FakeWebSocket(*requests, None)
+        await asyncio.wait_for(server._serve_websocket(ok), 5)
+        assert [unpack(data)[0] for data in ok.sent] == [0, 1]
+        # a dead socket mustn't keep the connection spinning
+        broken = FakeWebSocket(*requests, None, broken=True)
+        await asyncio.wait_for(server._serve_websocket(broken), 5)
+        assert not server._connections
+        idle = FakeWebSocket()
+        task = asyncio.ensure_future(server._serve_websocket(idle))
+        await asyncio.sleep(0)
+        assert task in server._connections
+        await asyncio.wait_for(server.close(), 5)
+        assert task.done()
+
+    asyncio.run(go())
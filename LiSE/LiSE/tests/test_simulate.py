@@ -0,0 +1,37 @@
+from LiSE import Engine
+
+
+def test_simulate_branches(tmp_path):
+    with Engine(tmp_path, random_seed=69105, workers=0) as eng:
+        phys = eng.new_character("physical")
+        phys.add_place("here")
+
+        @phys.rule(always=True)
+        def roll(char):
+            char.stat["roll"] = char.engine.randint(0, 2**31)
+
+        eng.next_turn()
+        start = eng._btt()
+        branches = eng.simulate_branches(3, 2, lambda i: (0, 1, 0)[i], processes=2)
+        assert branches == ["trunk_sim0", "trunk_sim1", "trunk_sim2"]
+        assert eng._btt() == start
+        rolls = {}
+        for branch in branches:
+            assert eng.branch_parent(branch) == "trunk"
+            eng.branch = branch
+            eng.turn = 3
+            assert eng.character["physical"].place["here"]
+            rolls[branch] = [eng.character["physical"].stat["roll"]]
+            eng.turn = 2
+            rolls[branch].append(eng.character["physical"].stat["roll"])
+        assert rolls["trunk_sim0"] == rolls["trunk_sim2"]
+        assert rolls["trunk_sim0"] != rolls["trunk_sim1"]
+        eng.branch = "trunk_sim1"
+        eng.turn = 3
+        eng.next_turn()
+        assert eng.turn == 4
+    with Engine(tmp_path, workers=0) as eng:
+        assert {"trunk_sim0", "trunk_sim1", "trunk_sim2"} <= set(eng._branches)
+        eng.branch = "trunk_sim2"
+        eng.turn = 3
+        assert eng.character["physical"].stat["roll"] == rolls["trunk_sim2"][0]
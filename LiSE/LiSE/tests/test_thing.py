@@ -77,3 +77,21 @@ def test_travel(engy):
     engy.next_turn()
     assert thing1.location == phys.place[6, 7]
     assert thing2.location == phys.place[1, 7]
+
+
+def test_follow_path(engy):
+    from LiSE.exc import TravelException
+
+    phys = engy.new_character("physical", data=nx.path_graph(5))
+    for orig, dest in zip(range(4), range(1, 5)):
+        phys.portal[orig][dest]["cost"] = orig + 1
+    walker = phys.place[0].new_thing("walker")
+    with pytest.raises(TravelException) as excinfo:
+        walker.follow_path([0, 1, 3])
+    assert excinfo.value.path == [0, 1]
+    path = [0, 1, 2, 3, 4]
+    assert walker.follow_path(path, weight="cost") == 10
+    assert path == [0, 1, 2, 3, 4]
+    for turn, place in [(0, 0), (1, 1), (2, 1), (3, 2), (6, 3), (9, 3), (10, 4)]:
+        engy.turn = turn
+        assert walker.location == phys.place[place]
@@ -0,0 +1,89 @@
+# This file is part of LiSE, a framework for life simulation games.
+# Copyright (c) Zachary Spector, public@zacharyspector.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from threading import Thread
+
+import pytest
+
+
+@pytest.fixture(scope="function")
+def history(serial_engine):
+    eng = serial_engine
+    phys = eng.new_character("physical", color="red")
+    phys.new_place("here", size=1)
+    phys.new_place("there")
+    phys.add_portal("here", "there", distance=3)
+    thing = phys.new_thing("it", "here", weight=5)
+    eng.universal["foo"] = "bar"
+    eng.next_turn()
+    phys.stat["color"] = "blue"
+    phys.place["here"]["size"] = 2
+    phys.portal["here"]["there"]["distance"] = 4
+    thing.location = phys.place["there"]
+    del eng.universal["foo"]
+    eng.next_turn()
+    phys.new_place("elsewhere")
+    eng.next_turn()
+    yield eng
+
+
+def test_view_reads_past(history):
+    eng = history
+    now = eng._btt()
+    then = eng.view(eng.branch, 0)
+    assert eng._btt() == now
+    phys = then.character["physical"]
+    assert phys.stat["color"] == "red"
+    assert phys.place["here"]["size"] == 1
+    assert phys.portal["here"]["there"]["distance"] == 3
+    assert phys.thing["it"].location == "here"
+    assert phys.place["here"].contents == {"it"}
+    assert "elsewhere" not in phys.node
+    assert set(phys.thing) == {"it"}
+    assert set(phys.place) == {"here", "there"}
+    assert then.universal["foo"] == "bar"
+    later = eng.view(eng.branch, 1)
+    phys = later.character["physical"]
+    assert phys.stat["color"] == "blue"
+    assert phys.place["here"]["size"] == 2
+    assert phys.portal["here"]["there"]["distance"] == 4
+    assert phys.thing["it"].location == "there"
+    assert "foo" not in later.universal
+    assert "elsewhere" in eng.view().character["physical"].node
+    assert eng._btt() == now
+
+
+def test_view_threads(history):
+    eng = history
+    views = [eng.view(eng.branch, turn) for turn in range(3)]
+    results = {}
+
+    def read(view):
+        phys = view.character["physical"]
+        results[view.turn] = (
+            phys.stat["color"],
+            phys.thing["it"].location,
+            frozenset(phys.node),
+        )
+
+    threads = [Thread(target=read, args=(view,)) for view in views]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {
+        0: ("red", "here", frozenset({"here", "there", "it"})),
+        1: ("blue", "there", frozenset({"here", "there", "it"})),
+        2: ("blue", "there", frozenset({"here", "there", "it", "elsewhere"})),
+    }
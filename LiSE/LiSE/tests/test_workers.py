@@ -0,0 +1,62 @@
+from threading import Thread
+from time import sleep
+
+from LiSE import Engine
+
+
+def install_functions(eng):
+    @eng.function
+    def slow(path):
+        import os
+        from time import sleep
+
+        # wait for the test to say we're done
+        while not os.path.exists(path):
+            sleep(0.01)
+        return "slow"
+
+    @eng.function
+    def quick(n):
+        return n
+
+
+def test_idle_worker_takes_next_task(tmp_path):
+    done = tmp_path / "done"
+    with Engine(tmp_path / "game", workers=2, random_seed=69105) as eng:
+        install_functions(eng)
+        slowfut = eng.submit(eng.function.slow, str(done))
+        quickfuts = [eng.submit(eng.function.quick, i) for i in range(10)]
+        # they'd all wait for the slow one, if they were assigned round-robin
+        assert [fut.result(timeout=60) for fut in quickfuts] == list(range(10))
+        assert not slowfut.done()
+        stats = eng.worker_stats()
+        assert stats["queue_depth"] == 0
+        assert sorted(worker["tasks"] for worker in stats["workers"]) == [0, 10]
+        assert sorted(worker["running"] for worker in stats["workers"]) == [
+            False,
+            True,
+        ]
+        done.touch()
+        assert slowfut.result(timeout=60) == "slow"
+        assert all(
+            0.0 < worker["utilization"] <= 1.0 for worker in eng.worker_stats()["workers"]
+        )
+
+
+def test_shutdown_without_waiting(tmp_path):
+    done = tmp_path / "done"
+    with Engine(tmp_path / "game", workers=2, random_seed=69105) as eng:
+        install_functions(eng)
+        running = [eng.submit(eng.function.slow, str(done)) for _ in range(2)]
+        while not all(fut.running() for fut in running):
+            sleep(0.01)
+        queued = [eng.submit(eng.function.quick, i) for i in range(10)]
+        shutdown = Thread(target=eng.shutdown, kwargs={"wait": False})
+        shutdown.start()
+        # the queue gets cancelled while the running tasks are still running
+        while not all(fut.cancelled() for fut in queued):
+            sleep(0.01)
+        assert not any(fut.done() for fut in running)
+        done.touch()
+        shutdown.join()
+        assert [fut.result() for fut in running] == ["slow", "slow"]
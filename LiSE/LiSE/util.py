@@ -46,6 +46,7 @@ from networkx.exception import NetworkXException
 from tblib import Traceback
 
 from . import allegedb, exc
+from .allegedb.wrap import Patch
 
 
 class BadTimeException(Exception):
@@ -77,6 +78,7 @@ class MsgpackExtensionType(Enum):
     set = 0x02
     exception = 0x03
     graph = 0x04
+    patch = 0x05
     character = 0x7F
     place = 0x7E
     thing = 0x7D
@@ -436,6 +438,9 @@ class AbstractEngine(ABC):
             set: lambda s: msgpack.ExtType(
                 MsgpackExtensionType.set.value, packer(list(s))
             ),
+            Patch: lambda patch: msgpack.ExtType(
+                MsgpackExtensionType.patch.value, packer(list(patch.ops))
+            ),
             FinalRule: lambda obj: msgpack.ExtType(
                 MsgpackExtensionType.final_rule.value, b""
             ),
@@ -631,6 +636,7 @@ class AbstractEngine(ABC):
             MsgpackExtensionType.tuple.value: lambda ext: tuple(unpacker(ext)),
             MsgpackExtensionType.frozenset.value: lambda ext: frozenset(unpacker(ext)),
             MsgpackExtensionType.set.value: lambda ext: set(unpacker(ext)),
+            MsgpackExtensionType.patch.value: lambda ext: Patch(*unpacker(ext)),
             MsgpackExtensionType.function.value: lambda ext: getattr(
                 function, unpacker(ext)
             ),
@@ -0,0 +1,462 @@
+# This file is part of LiSE, a framework for life simulation games.
+# Copyright (c) Zachary Spector, public@zacharyspector.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Read-only views on the world at a fixed moment
+
+Get one with :meth:`LiSE.Engine.view`. Views read the caches directly
+with their own ``(branch, turn, tick)``, so they never move the engine's
+time, and never take the world lock. Several threads may use
+independent views at once.
+
+"""
+
+from collections.abc import Mapping
+from typing import Iterator, Tuple
+
+from .allegedb import Key
+
+
+class ViewStats(Mapping):
+    """Base class for read-only mappings of stats at a fixed time"""
+
+    __slots__ = ("view",)
+
+    def _entity(self) -> tuple:
+        raise NotImplementedError
+
+    def _cache(self):
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator[Key]:
+        return self._cache().iter_keys(*self._entity(), *self.view.btt, forward=False)
+
+    def __len__(self) -> int:
+        return self._cache().count_keys(*self._entity(), *self.view.btt, forward=False)
+
+    def __contains__(self, k) -> bool:
+        return self._cache().contains_key(*self._entity(), k, *self.view.btt)
+
+    def __getitem__(self, k):
+        return self._cache().retrieve(*self._entity(), k, *self.view.btt)
+
+    def __repr__(self):
+        return "<{} at {}: {}>".format(type(self).__name__, self.view.btt, dict(self))
+
+
+class UniversalView(ViewStats):
+    """Universal variables at the time of a view"""
+
+    def __init__(self, view: "View"):
+        self.view = view
+
+    def _entity(self) -> tuple:
+        return ()
+
+    def _cache(self):
+        return self.view.engine._universal_cache
+
+
+class NodeView(ViewStats):
+    """A node's stats at the time of a view
+
+    ``location`` is the name of the node this one is in, if it's a thing,
+    or ``None``, if it's a place.
+
+    """
+
+    __slots__ = ("character", "name")
+
+    def __init__(self, character: "CharacterView", name: Key):
+        self.view = character.view
+        self.character = character
+        self.name = name
+
+    def _entity(self) -> tuple:
+        return self.character.name, self.name
+
+    def _cache(self):
+        return self.view.engine._node_val_cache
+
+    def __repr__(self):
+        return "<NodeView {}.{} at {}>".format(
+            self.character.name, self.name, self.view.btt
+        )
+
+    @property
+    def location(self) -> Key:
+        try:
+            return self.view.engine._things_cache.retrieve(
+                self.character.name, self.name, *self.view.btt
+            )
+        except KeyError:
+            return None
+
+    @property
+    def contents(self) -> frozenset:
+        """Names of the things located here"""
+        try:
+            return self.view.engine._node_contents_cache.retrieve(
+                self.character.name, self.name, *self.view.btt
+            )
+        except KeyError:
+            return frozenset()
+
+    @property
+    def portal(self) -> "PortalSuccessorsView":
+        return self.character.portal[self.name]
+
+    @property
+    def preportal(self) -> "PortalPredecessorsView":
+        return self.character.preportal[self.name]
+
+
+class ThingView(NodeView):
+    """A thing's stats at the time of a view, ``location`` among them"""
+
+    __slots__ = ()
+
+    def __iter__(self) -> Iterator[Key]:
+        yield "location"
+        yield from super().__iter__()
+
+    def __len__(self) -> int:
+        return super().__len__() + 1
+
+    def __contains__(self, k) -> bool:
+        return k == "location" or super().__contains__(k)
+
+    def __getitem__(self, k):
+        if k == "location":
+            return self.location
+        return super().__getitem__(k)
+
+
+class PortalView(ViewStats):
+    """A portal's stats at the time of a view"""
+
+    __slots__ = ("character", "orig", "dest")
+
+    def __init__(self, character: "CharacterView", orig: Key, dest: Key):
+        self.view = character.view
+        self.character = character
+        self.orig = orig
+        self.dest = dest
+
+    def _entity(self) -> tuple:
+        return self.character.name, self.orig, self.dest, 0
+
+    def _cache(self):
+        return self.view.engine._edge_val_cache
+
+    def __repr__(self):
+        return "<PortalView {}.{}->{} at {}>".format(
+            self.character.name, self.orig, self.dest, self.view.btt
+        )
+
+    @property
+    def origin(self) -> NodeView:
+        return self.character.node[self.orig]
+
+    @property
+    def destination(self) -> NodeView:
+        return self.character.node[self.dest]
+
+
+class CharacterStatView(ViewStats):
+    """A character's own stats at the time of a view, ``name`` among them"""
+
+    __slots__ = ("character",)
+
+    def __init__(self, character: "CharacterView"):
+        self.view = character.view
+        self.character = character
+
+    def _entity(self) -> tuple:
+        return (self.character.name,)
+
+    def _cache(self):
+        return self.view.engine._graph_val_cache
+
+    def __iter__(self) -> Iterator[Key]:
+        yield "name"
+        yield from super().__iter__()
+
+    def __len__(self) -> int:
+        return super().__len__() + 1
+
+    def __contains__(self, k) -> bool:
+        return k == "name" or super().__contains__(k)
+
+    def __getitem__(self, k):
+        if k == "name":
+            return self.character.name
+        return super().__getitem__(k)
+
+
+class NodeMappingView(Mapping):
+    """All the nodes in a character at the time of a view"""
+
+    __slots__ = ("view", "character")
+
+    def __init__(self, character: "CharacterView"):
+        self.view = character.view
+        self.character = character
+
+    def _is_right_type(self, name: Key) -> bool:
+        return True
+
+    def __iter__(self) -> Iterator[Key]:
+        for name in self.view.engine._nodes_cache.iter_entities(
+            self.character.name, *self.view.btt, forward=False
+        ):
+            if self._is_right_type(name):
+                yield name
+
+    def __len__(self) -> int:
+        n = 0
+        for _ in self:
+            n += 1
+        return n
+
+    def __contains__(self, name) -> bool:
+        return self.view.engine._nodes_cache.contains_entity(
+            self.character.name, name, *self.view.btt
+        ) and self._is_right_type(name)
+
+    def __getitem__(self, name) -> NodeView:
+        if name not in self:
+            raise KeyError("No such node at this time", name, self.view.btt)
+        if ThingMappingView._is_right_type(self, name):
+            return ThingView(self.character, name)
+        return NodeView(self.character, name)
+
+
+class ThingMappingView(NodeMappingView):
+    """The things in a character at the time of a view"""
+
+    __slots__ = ()
+
+    def _is_right_type(self, name: Key) -> bool:
+        try:
+            self.view.engine._things_cache.retrieve(
+                self.character.name, name, *self.view.btt
+            )
+            return True
+        except KeyError:
+            return False
+
+
+class PlaceMappingView(ThingMappingView):
+    """The places in a character at the time of a view"""
+
+    __slots__ = ()
+
+    def _is_right_type(self, name: Key) -> bool:
+        return not super()._is_right_type(name)
+
+
+class PortalSuccessorsView(Mapping):
+    """Portals leading out of one node at the time of a view"""
+
+    __slots__ = ("view", "character", "orig")
+
+    def __init__(self, character: "CharacterView", orig: Key):
+        self.view = character.view
+        self.character = character
+        self.orig = orig
+
+    def __iter__(self) -> Iterator[Key]:
+        return self.view.engine._edges_cache.iter_successors(
+            self.character.name, self.orig, *self.view.btt, forward=False
+        )
+
+    def __len__(self) -> int:
+        return self.view.engine._edges_cache.count_successors(
+            self.character.name, self.orig, *self.view.btt, forward=False
+        )
+
+    def __contains__(self, dest) -> bool:
+        return self.view.engine._edges_cache.has_successor(
+            self.character.name, self.orig, dest, *self.view.btt, forward=False
+        )
+
+    def __getitem__(self, dest) -> PortalView:
+        if dest not in self:
+            raise KeyError("No such portal at this time", self.orig, dest)
+        return PortalView(self.character, self.orig, dest)
+
+
+class PortalPredecessorsView(Mapping):
+    """Portals leading into one node at the time of a view"""
+
+    __slots__ = ("view", "character", "dest")
+
+    def __init__(self, character: "CharacterView", dest: Key):
+        self.view = character.view
+        self.character = character
+        self.dest = dest
+
+    def __iter__(self) -> Iterator[Key]:
+        return self.view.engine._edges_cache.iter_predecessors(
+            self.character.name, self.dest, *self.view.btt, forward=False
+        )
+
+    def __len__(self) -> int:
+        return self.view.engine._edges_cache.count_predecessors(
+            self.character.name, self.dest, *self.view.btt, forward=False
+        )
+
+    def __contains__(self, orig) -> bool:
+        return self.view.engine._edges_cache.has_predecessor(
+            self.character.name, self.dest, orig, *self.view.btt, forward=False
+        )
+
+    def __getitem__(self, orig) -> PortalView:
+        if orig not in self:
+            raise KeyError("No such portal at this time", orig, self.dest)
+        return PortalView(self.character, orig, self.dest)
+
+
+class PortalMappingView(Mapping):
+    """Nodes with portals leading out of them, at the time of a view
+
+    Also serves for portals leading in, with ``pred=True``.
+
+    """
+
+    __slots__ = ("view", "character", "pred")
+
+    def __init__(self, character: "CharacterView", pred=False):
+        self.view = character.view
+        self.character = character
+        self.pred = pred
+
+    def __iter__(self) -> Iterator[Key]:
+        for node in self.character.node:
+            if node in self:
+                yield node
+
+    def __len__(self) -> int:
+        n = 0
+        for _ in self:
+            n += 1
+        return n
+
+    def __contains__(self, node) -> bool:
+        edges_cache = self.view.engine._edges_cache
+        count = (
+            edges_cache.count_predecessors
+            if self.pred
+            else edges_cache.count_successors
+        )
+        return bool(count(self.character.name, node, *self.view.btt, forward=False))
+
+    def __getitem__(self, node):
+        if node not in self.character.node:
+            raise KeyError("No such node at this time", node, self.view.btt)
+        if self.pred:
+            return PortalPredecessorsView(self.character, node)
+        return PortalSuccessorsView(self.character, node)
+
+
+class CharacterView:
+    """A character at the time of a view
+
+    Has the same collections as :class:`LiSE.character.Character`,
+    but they're all read-only.
+
+    """
+
+    __slots__ = (
+        "view",
+        "name",
+        "stat",
+        "node",
+        "thing",
+        "place",
+        "portal",
+        "preportal",
+    )
+
+    def __init__(self, view: "View", name: Key):
+        self.view = view
+        self.name = name
+        self.stat = CharacterStatView(self)
+        self.node = NodeMappingView(self)
+        self.thing = ThingMappingView(self)
+        self.place = PlaceMappingView(self)
+        self.portal = PortalMappingView(self)
+        self.preportal = PortalMappingView(self, pred=True)
+
+    adj = succ = property(lambda self: self.portal)
+    pred = property(lambda self: self.preportal)
+    graph = property(lambda self: self.stat)
+
+    def __repr__(self):
+        return "<CharacterView {} at {}>".format(self.name, self.view.btt)
+
+
+class CharacterMappingView(Mapping):
+    """All the characters at the time of a view"""
+
+    __slots__ = ("view",)
+
+    def __init__(self, view: "View"):
+        self.view = view
+
+    def __iter__(self) -> Iterator[Key]:
+        graph_cache = self.view.engine._graph_cache
+        btt = self.view.btt
+        for name in graph_cache.iter_keys(*btt, forward=False):
+            if name in self:
+                yield name
+
+    def __len__(self) -> int:
+        n = 0
+        for _ in self:
+            n += 1
+        return n
+
+    def __contains__(self, name) -> bool:
+        try:
+            return (
+                self.view.engine._graph_cache.retrieve(name, *self.view.btt)
+                != "Deleted"
+            )
+        except KeyError:
+            return False
+
+    def __getitem__(self, name) -> CharacterView:
+        if name not in self:
+            raise KeyError("No such character at this time", name, self.view.btt)
+        return CharacterView(self.view, name)
+
+
+class View:
+    """The whole world, read-only, at one ``(branch, turn, tick)``"""
+
+    __slots__ = ("engine", "btt", "character", "universal")
+
+    def __init__(self, engine, branch: str, turn: int, tick: int):
+        self.engine = engine
+        self.btt: Tuple[str, int, int] = (branch, turn, tick)
+        self.character = CharacterMappingView(self)
+        self.universal = UniversalView(self)
+
+    branch = property(lambda self: self.btt[0])
+    turn = property(lambda self: self.btt[1])
+    tick = property(lambda self: self.btt[2])
+
+    def __repr__(self):
+        return "<View of {} at {}>".format(self.engine, self.btt)
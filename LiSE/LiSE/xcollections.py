@@ -29,6 +29,7 @@ import sys
 from ast import Expr, Module, parse
 from collections.abc import MutableMapping
 from copy import deepcopy
+from functools import partial
 from inspect import getsource
 from io import StringIO
 from types import MethodType
@@ -37,6 +38,7 @@ from astunparse import Unparser
 from blinker import Signal
 
 from .allegedb.graph import GraphsMapping
+from .allegedb.wrap import DictWrapper, ListWrapper, SetWrapper
 from .util import dedent_source, getatt
 
 
@@ -309,10 +311,42 @@ class UniversalMapping(MutableMapping, Signal):
 
     def __getitem__(self, k):
         """Get the current value of this key"""
+        ret = self._get_now(k)
+        if isinstance(ret, list):
+            return ListWrapper(
+                partial(self._get_now, k), partial(self._set_cache_now, k), self, k
+            )
+        elif isinstance(ret, dict):
+            return DictWrapper(
+                partial(self._get_now, k), partial(self._set_cache_now, k), self, k
+            )
+        elif isinstance(ret, set):
+            return SetWrapper(
+                partial(self._get_now, k), partial(self._set_cache_now, k), self, k
+            )
+        return ret
+
+    def _get_now(self, k):
         return self.engine._universal_cache.retrieve(k, *self.engine._btt())
 
+    def _set_cache_now(self, k, v):
+        branch, turn, tick = self.engine._nbtt()
+        self.engine._universal_cache.store(k, branch, turn, tick, v)
+
+    def _patch_key(self, k, patch):
+        """Change the collection at ``k``, and save only the change"""
+        branch, turn, tick = self.engine._nbtt()
+        v = patch.apply(self.engine._universal_cache.retrieve(k, branch, turn, tick))
+        self.engine._universal_cache.store(k, branch, turn, tick, v)
+        self.engine.query.universal_set(
+            k, branch, turn, tick, patch if self.engine.patch_collections else v
+        )
+        self.send(self, key=k, val=v)
+
     def __setitem__(self, k, v):
         """Set k=v at the current branch and tick"""
+        if hasattr(v, "unwrap"):
+            v = v.unwrap()
         branch, turn, tick = self.engine._nbtt()
         self.engine._universal_cache.store(k, branch, turn, tick, v)
         self.engine.query.universal_set(k, branch, turn, tick, v)